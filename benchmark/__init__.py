@@ -0,0 +1,12 @@
+"""
+    Mistune Benchmark
+    ~~~~~~~~~~~~~~~~~
+
+    A fixed corpus of documents and a runner to measure the throughput of
+    ``Markdown.parse``. Run it with::
+
+        $ python -m benchmark.bench
+
+    Use ``--save`` to store a JSON baseline and ``--compare`` to check the
+    current tree against a stored baseline.
+"""
@@ -0,0 +1,227 @@
+"""
+    Benchmark Runner
+    ~~~~~~~~~~~~~~~~
+
+    Time ``Markdown.parse`` of every corpus case with every configuration.
+    Each phase of ``Markdown.parse`` is timed on its own::
+
+        $ python -m benchmark.bench
+        $ python -m benchmark.bench --case readme --config html
+        $ python -m benchmark.bench --save benchmark/baseline.json
+        $ python -m benchmark.bench --compare benchmark/baseline.json
+
+    With ``--compare``, the exit status is 1 if any measurement is slower
+    than the baseline by more than ``--tolerance``.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import mistune
+from mistune import create_markdown, PLUGINS
+from mistune import Markdown, HTMLRenderer, InlineParser, BlockParser
+from mistune import LineBlockParser
+from mistune import AstRenderer
+from mistune import LRUCache
+from mistune.directives import Admonition, DirectiveToc, DirectiveInclude
+from benchmark.cases import CASES
+
+try:
+    timer = time.perf_counter
+except AttributeError:  # pragma: no cover
+    timer = time.time
+
+PHASES = (
+    'before_parse', 'block', 'before_render', 'render', 'after_render',
+)
+
+
+def _create_directives():
+    return create_markdown(
+        escape=False,
+        plugins=[Admonition(), DirectiveToc(), DirectiveInclude()],
+    )
+
+
+def _create_delimiter():
+    renderer = HTMLRenderer(escape=False)
+    inline = InlineParser(renderer, delimiter_emphasis=True)
+    return Markdown(renderer, inline=inline)
+
+
+def _create_brackets():
+    renderer = HTMLRenderer(escape=False)
+    inline = InlineParser(renderer, bracket_links=True)
+    return Markdown(renderer, inline=inline)
+
+
+def _create_render_cache():
+    # the best of the repeats renders every block from the cache
+    block = BlockParser(render_cache=LRUCache(maxsize=4096))
+    return Markdown(HTMLRenderer(escape=False), block=block)
+
+
+def _create_line_parser():
+    block = LineBlockParser()
+    return Markdown(HTMLRenderer(escape=False), block=block)
+
+
+def _create_all():
+    return create_markdown(escape=False, plugins=list(PLUGINS))
+
+
+CONFIGS = {
+    'html': lambda: create_markdown(escape=False),
+    'ast': lambda: create_markdown(renderer='ast'),
+    'compact_ast': lambda: create_markdown(renderer=AstRenderer(compact=True)),
+    'directives': _create_directives,
+    'delimiter': _create_delimiter,
+    'brackets': _create_brackets,
+    'render_cache': _create_render_cache,
+    'line_parser': _create_line_parser,
+    'all': _create_all,
+}
+for _name in PLUGINS:
+    CONFIGS['plugin_' + _name] = (
+        lambda name=_name: create_markdown(escape=False, plugins=[name])
+    )
+
+
+def parse_phases(md, s, timings):
+    """The same steps as ``Markdown.parse``, each one timed into
+    the given ``timings`` dict.
+    """
+    state = {}
+
+    t0 = timer()
+    s, state = md.before_parse(s, state)
+    t1 = timer()
+    tokens = md.block.parse(s, state)
+    t2 = timer()
+    tokens = md.before_render(tokens, state)
+    t3 = timer()
+    result = md.block.render(tokens, md.inline, state)
+    t4 = timer()
+    result = md.after_render(result, state)
+    t5 = timer()
+
+    for name, value in zip(PHASES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+        timings[name] += value
+    return result
+
+
+def run_case(md, docs, repeat):
+    size = sum(len(s.encode('utf-8')) for s in docs)
+    best = None
+    for _ in range(repeat):
+        timings = dict((k, 0.0) for k in PHASES)
+        t0 = timer()
+        for s in docs:
+            parse_phases(md, s, timings)
+        total = timer() - t0
+        if best is None or total < best[0]:
+            best = (total, timings)
+
+    total, timings = best
+    total = max(total, 1e-9)
+    return {
+        'seconds': total,
+        'docs': len(docs),
+        'bytes': size,
+        'docs_per_sec': len(docs) / total,
+        'mb_per_sec': size / total / 1024 / 1024,
+        'phases': timings,
+    }
+
+
+def run(cases, configs, repeat):
+    results = {}
+    for case_name in cases:
+        docs = CASES[case_name]()
+        for config_name in configs:
+            md = CONFIGS[config_name]()
+            key = case_name + '/' + config_name
+            results[key] = data = run_case(md, docs, repeat)
+            _print_result(key, data)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Compare results with a baseline, return the list of regressions."""
+    regressions = []
+    print('')
+    print('{:<36} {:>10} {:>10} {:>8}'.format('case', 'base', 'now', 'ratio'))
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        old = baseline[key]['seconds']
+        new = results[key]['seconds']
+        ratio = new / max(old, 1e-9)
+        mark = ''
+        if ratio > 1 + tolerance:
+            mark = ' SLOWER'
+            regressions.append(key)
+        elif ratio < 1 - tolerance:
+            mark = ' faster'
+        print('{:<36} {:>9.2f}ms {:>9.2f}ms {:>7.2f}x{}'.format(
+            key, old * 1000, new * 1000, ratio, mark))
+    return regressions
+
+
+def _print_result(key, data):
+    phases = ' '.join(
+        '{}={:.1f}'.format(k, data['phases'][k] * 1000) for k in PHASES
+    )
+    print('{:<36} {:>10.1f} docs/s {:>8.2f} MB/s  ms: {}'.format(
+        key, data['docs_per_sec'], data['mb_per_sec'], phases))
+
+
+def _select(names, available):
+    if not names:
+        return sorted(available)
+    for name in names:
+        if name not in available:
+            raise SystemExit('Unknown name: {!r}, choose from {}'.format(
+                name, ', '.join(sorted(available))))
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark of mistune')
+    parser.add_argument('--case', action='append', help='corpus case')
+    parser.add_argument('--config', action='append', help='markdown config')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', metavar='PATH', help='save JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    cases = _select(args.case, CASES)
+    configs = _select(args.config, CONFIGS)
+    results = run(cases, configs, args.repeat)
+
+    if args.save:
+        data = {
+            'meta': {
+                'mistune': mistune.__version__,
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'created': int(time.time()),
+            },
+            'results': results,
+        }
+        with open(args.save, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+    Benchmark Corpus
+    ~~~~~~~~~~~~~~~~
+
+    Every case is a function returning a list of markdown documents. The
+    documents are generated deterministically, so timings of different
+    trees are comparable.
+"""
+
+import os
+from tests.fixtures import ROOT, load_examples
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do '
+    'eiusmod tempor incididunt ut labore et dolore magna aliqua'
+).split()
+
+
+def _sentence(i, n=12):
+    words = [WORDS[(i + k * 7) % len(WORDS)] for k in range(n)]
+    return ' '.join(words).capitalize() + '.'
+
+
+def _paragraph(i, inline=True):
+    lines = []
+    for k in range(4):
+        s = _sentence(i + k)
+        if inline and k == 1:
+            s += ' Some *emphasis*, **strong**, `code` and a [link](/p/{}).'.format(i)
+        if inline and k == 2:
+            s += ' Visit <https://example.com/{}> or see [ref{}][].'.format(i, i % 5)
+        lines.append(s)
+    return '\n'.join(lines)
+
+
+def commonmark():
+    """All examples of the CommonMark spec, one document each."""
+    return [text for _, text, _ in load_examples('commonmark.txt')]
+
+
+def readme(sections=60):
+    """A large README style document."""
+    parts = []
+    for i in range(sections):
+        parts.append('## Section {}'.format(i))
+        parts.append(_paragraph(i))
+        parts.append('* item one of {}\n* item **two**\n* item `three`'.format(i))
+        parts.append('```python\ndef f{}(x):\n    return x * {}\n```'.format(i, i))
+        parts.append('> ' + _sentence(i) + '\n> ' + _sentence(i + 1))
+        parts.append(_paragraph(i + 3))
+        parts.append('---')
+    for i in range(5):
+        parts.append('[ref{}]: https://example.com/ref/{} "Ref {}"'.format(i, i, i))
+    return ['\n\n'.join(parts) + '\n']
+
+
+def tables(count=40, rows=30):
+    """Document of many GFM tables."""
+    parts = []
+    for i in range(count):
+        lines = ['| Name | Value | Note |', '| :--- | ---: | :---: |']
+        for r in range(rows):
+            lines.append('| row {} | {} | *{}* |'.format(r, r * i, WORDS[r % 19]))
+        parts.append('\n'.join(lines))
+        parts.append('Name | Value\n--- | ---\n' + '\n'.join(
+            'a{} | b{}'.format(r, r) for r in range(rows // 3)))
+    return ['\n\n'.join(parts) + '\n']
+
+
+def lists(count=40, items=25):
+    """Document of flat, nested, ordered and loose lists."""
+    parts = []
+    for i in range(count):
+        lines = []
+        for k in range(items):
+            lines.append('- item {} {}'.format(k, _sentence(i + k, 6)))
+            if k % 5 == 0:
+                lines.append('  - nested {}'.format(k))
+                lines.append('    1. deep *{}*'.format(k))
+        parts.append('\n'.join(lines))
+        parts.append('\n\n'.join(
+            '{}. loose {}'.format(k + 1, _sentence(k, 5)) for k in range(items // 2)))
+    return ['\n\n'.join(parts) + '\n']
+
+
+def long_list(items=50000):
+    """A changelog style list of many items."""
+    lines = []
+    for i in range(items):
+        lines.append('- Fix `issue {}`: {}'.format(i, _sentence(i, 6)))
+        if i % 10 == 0:
+            lines.append('  continued {}'.format(i))
+    return ['\n'.join(lines) + '\n']
+
+
+def deep_lists(count=200, depth=12):
+    """Lists nested deeper than the max depth, with loose items."""
+    parts = []
+    for i in range(count):
+        lines = []
+        for k in range(depth):
+            lines.append('  ' * k + '- level {} {}'.format(k, _sentence(i + k, 4)))
+        for k in range(depth - 1, -1, -1):
+            lines.append('')
+            lines.append('  ' * k + '1. back {}'.format(k))
+        parts.append('\n'.join(lines))
+    return ['\n\n'.join(parts) + '\n']
+
+
+def deep_quotes(count=200, depth=5, lines=20):
+    """Paragraphs in nested block quotes, every line repeats the markers."""
+    parts = []
+    for i in range(count):
+        prefix = '> ' * (i % depth + 1)
+        parts.append('\n'.join(
+            prefix + _sentence(i + k, 6) for k in range(lines)
+        ))
+    return ['\n\n'.join(parts) + '\n']
+
+
+def footnotes(count=200):
+    """Document with many footnote references and definitions."""
+    parts = []
+    for i in range(count):
+        parts.append(_sentence(i) + ' See note[^n{}] and[^n{}].'.format(i, (i + 1) % count))
+    for i in range(count):
+        parts.append('[^n{}]: {}\n    {}'.format(i, _sentence(i, 8), _sentence(i + 1, 8)))
+    return ['\n\n'.join(parts) + '\n']
+
+
+def pathological():
+    """Generated inputs which are known to be expensive."""
+    n = 2000
+    return [
+        # nested block quotes
+        ''.join('>' * (i % 6 + 1) + ' q\n' for i in range(n)),
+        # nested lists
+        ''.join('  ' * (i % 6) + '- l\n' for i in range(n)),
+        # unclosed emphasis
+        '*a _b ' * n + '\n',
+        # brackets without links
+        '[' * n + 'a' + ']' * n + '\n',
+        '[1][2][3] ' * n + '\n',
+        # unclosed code spans
+        '`a ``b ' * n + '\n',
+        # many html-like tags
+        '<a <b <c ' * n + '\n',
+    ]
+
+
+def include_readme():
+    """The README of mistune itself."""
+    with open(os.path.join(ROOT, '..', '..', 'README.md'), 'rb') as f:
+        return [f.read().decode('utf-8')]
+
+
+CASES = {
+    'commonmark': commonmark,
+    'readme': readme,
+    'mistune_readme': include_readme,
+    'tables': tables,
+    'lists': lists,
+    'long_list': long_list,
+    'deep_lists': deep_lists,
+    'deep_quotes': deep_quotes,
+    'footnotes': footnotes,
+    'pathological': pathological,
+}
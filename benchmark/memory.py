@@ -0,0 +1,64 @@
+"""
+    Memory Benchmark
+    ~~~~~~~~~~~~~~~~
+
+    Measure the memory of the results kept after parsing every corpus
+    case, and the peak memory while parsing, with ``tracemalloc``::
+
+        $ python -m benchmark.memory
+        $ python -m benchmark.memory --case lists --config ast
+        $ python -m benchmark.memory --config ast --config compact_ast
+"""
+
+import gc
+import argparse
+import tracemalloc
+from benchmark.bench import CONFIGS, _select
+from benchmark.cases import CASES
+
+
+def measure(md, docs):
+    """Return ``(kept, peak)`` bytes of parsing the documents."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        results = [md(s) for s in docs]
+        gc.collect()
+        kept, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del results
+    return kept, peak
+
+
+def run(cases, configs):
+    for case_name in cases:
+        docs = CASES[case_name]()
+        base = None
+        for config_name in configs:
+            md = CONFIGS[config_name]()
+            # create the shared scanners and classes before measuring
+            md(docs[0])
+            kept, peak = measure(md, docs)
+            ratio = ''
+            if base:
+                ratio = '{:.2f}x'.format(kept / float(base))
+            else:
+                base = kept
+            print('{:<36} kept {:>9.2f}MB peak {:>9.2f}MB {:>7}'.format(
+                case_name + '/' + config_name,
+                kept / 1024.0 / 1024, peak / 1024.0 / 1024, ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Memory of mistune')
+    parser.add_argument('--case', action='append', help='corpus case')
+    parser.add_argument('--config', action='append', help='markdown config')
+    args = parser.parse_args(argv)
+
+    configs = args.config or ['ast', 'compact_ast']
+    run(_select(args.case, CASES), _select(configs, CONFIGS))
+
+
+if __name__ == '__main__':
+    main()
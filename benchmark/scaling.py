@@ -0,0 +1,75 @@
+"""
+    Scaling Benchmark
+    ~~~~~~~~~~~~~~~~~
+
+    Time pathological inputs of doubling sizes. For a linear parser the
+    time of every row is about twice the time of the row above it::
+
+        $ python -m benchmark.scaling
+        $ python -m benchmark.scaling --config delimiter --size 2000
+        $ python -m benchmark.scaling --config brackets --input titles
+"""
+
+import sys
+import argparse
+from benchmark.bench import CONFIGS, timer, _select
+
+#: repeated units of hostile inputs
+INPUTS = {
+    'emphasis': '*a _b ',
+    'strong': '**a *b ',
+    'underscore': '_a *b_ ',
+    'brackets': '[a ',
+    'citations': '[1][2][3] ',
+    'destinations': '[a](b',
+    'escaped_brackets': '[a\\]',
+    'titles': '[a](b (',
+    'codespan': '`a ``b ',
+}
+
+
+def measure(md, text, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = timer()
+        md(text)
+        elapsed = timer() - t0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run(configs, inputs, size, steps, repeat):
+    for config_name in configs:
+        md = CONFIGS[config_name]()
+        for name in inputs:
+            previous = None
+            for i in range(steps):
+                n = size * 2 ** i
+                seconds = measure(md, INPUTS[name] * n + '\n', repeat)
+                ratio = ''
+                if previous:
+                    ratio = '{:.2f}x'.format(seconds / max(previous, 1e-9))
+                print('{:<28} {:>8} {:>10.2f}ms {:>7}'.format(
+                    config_name + '/' + name, n, seconds * 1000, ratio))
+                previous = seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scaling of mistune')
+    parser.add_argument('--config', action='append', help='markdown config')
+    parser.add_argument('--input', action='append', help='hostile input')
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--steps', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    default = ['html', 'delimiter', 'brackets']
+    configs = _select(args.config or default, CONFIGS)
+    inputs = _select(args.input, INPUTS)
+    run(configs, inputs, args.size, args.steps, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+    Threads Benchmark
+    ~~~~~~~~~~~~~~~~~
+
+    Render the documents of every corpus case with one frozen Markdown
+    instance shared by a pool of threads, and compare the outputs with
+    the outputs of one thread. On a free-threaded build of CPython the
+    throughput grows with the count of threads::
+
+        $ python -m benchmark.threads
+        $ python -m benchmark.threads --case readme --config all
+        $ python -m benchmark.threads --threads 1 --threads 4 --threads 16
+"""
+
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from benchmark.bench import CONFIGS, timer, _select
+from benchmark.cases import CASES
+
+
+def measure(md, docs, threads, repeat):
+    """Return the best ``(seconds, outputs)`` of rendering the documents
+    with the count of threads.
+    """
+    best = None
+    with ThreadPoolExecutor(threads) as executor:
+        for _ in range(repeat):
+            t0 = timer()
+            outputs = list(executor.map(md, docs))
+            elapsed = timer() - t0
+            if best is None or elapsed < best[0]:
+                best = (elapsed, outputs)
+    return best
+
+
+def run(cases, configs, counts, repeat):
+    failures = 0
+    for case_name in cases:
+        # enough documents to keep every thread busy
+        docs = CASES[case_name]() * 4
+        for config_name in configs:
+            md = CONFIGS[config_name]().freeze()
+            expected = [md(s) for s in docs]
+            base = None
+            for count in counts:
+                seconds, outputs = measure(md, docs, count, repeat)
+                mark = ''
+                if outputs != expected:
+                    mark = ' DIFFERENT'
+                    failures += 1
+                if base is None:
+                    base = seconds
+                line = '{:<36} {:>3} threads {:>10.1f} docs/s {:>7.2f}x{}'
+                print(line.format(
+                    case_name + '/' + config_name, count,
+                    len(docs) / max(seconds, 1e-9),
+                    base / max(seconds, 1e-9), mark))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Threads of mistune')
+    parser.add_argument('--case', action='append', help='corpus case')
+    parser.add_argument('--config', action='append', help='markdown config')
+    parser.add_argument('--threads', action='append', type=int,
+                        help='count of threads')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    gil = is_gil_enabled() if is_gil_enabled else True
+    print('GIL {}'.format('enabled' if gil else 'disabled'))
+
+    configs = _select(args.config or ['html', 'all'], CONFIGS)
+    counts = args.threads or [1, 2, 4, 8]
+    if run(_select(args.case, CASES), configs, counts, args.repeat):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
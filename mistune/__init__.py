@@ -1,17 +1,29 @@
 from .markdown import Markdown
 from .block_parser import BlockParser
+from .line_parser import LineBlockParser
 from .inline_parser import InlineParser
 from .renderers import AstRenderer, HTMLRenderer
 from .scanner import escape, escape_url, escape_html, unikey
 from .plugins import PLUGINS
+from .cache import LRUCache, SQLiteCache
+from .limits import Limits, LimitExceeded
+from .streaming import StreamingMarkdown
+from .config import MarkdownConfig, render_many
+from .sharding import render_sharded
 
+#: Markdown instances shared by :func:`get_markdown` and :func:`markdown`,
+#: use ``markdown_cache.clear()`` to drop them, and ``maxsize`` to limit
+#: the count of kept instances.
+markdown_cache = LRUCache(maxsize=32)
 
-def create_markdown(escape=True, renderer=None, plugins=None):
+
+def create_markdown(escape=True, renderer=None, plugins=None, cache=None):
     """Create a Markdown instance based on the given condition.
 
     :param escape: Boolean. If using html renderer, escape html.
     :param renderer: renderer instance or string of ``html`` and ``ast``.
     :param plugins: List of plugins, string or callable.
+    :param cache: cache of the rendered documents, e.g. ``LRUCache``.
 
     This method is used when you want to re-use a Markdown instance::
 
@@ -36,7 +48,7 @@ def create_markdown(escape=True, renderer=None, plugins=None):
             else:
                 _plugins.append(p)
         plugins = _plugins
-    return Markdown(renderer, plugins=plugins)
+    return Markdown(renderer, plugins=plugins, cache=cache)
 
 
 html = create_markdown(
@@ -46,16 +58,53 @@ html = create_markdown(
 )
 
 
-def markdown(text, escape=True, renderer=None, plugins=None):
-    md = create_markdown(escape, renderer, plugins)
-    return md(text)
+def get_markdown(escape=True, renderer=None, plugins=None):
+    """Get a shared Markdown instance of the given condition, the
+    parameters are the same as :func:`create_markdown`. Instances are
+    kept in ``markdown_cache`` and re-used by later calls with the same
+    condition, DO NOT modify the returned instance.
+
+    A renderer instance can not be shared, in this case a new Markdown
+    instance is created every time.
+    """
+    key = _markdown_key(escape, renderer, plugins)
+    if key is None:
+        return create_markdown(escape, renderer, plugins)
+
+    md = markdown_cache.get(key)
+    if md is None:
+        md = create_markdown(escape, renderer, plugins)
+        markdown_cache.set(key, md)
+    return md
+
+
+def _markdown_key(escape, renderer, plugins):
+    if renderer is None:
+        renderer = 'html'
+    elif renderer not in ('html', 'ast'):
+        return None
+
+    key = (renderer, bool(escape), tuple(plugins or ()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def markdown(text, escape=True, renderer=None, plugins=None, limits=None):
+    md = get_markdown(escape, renderer, plugins)
+    return md.parse(text, limits=limits)
 
 
 __all__ = [
     'Markdown', 'AstRenderer', 'HTMLRenderer',
-    'BlockParser', 'InlineParser',
+    'BlockParser', 'LineBlockParser', 'InlineParser',
+    'Limits', 'LimitExceeded', 'StreamingMarkdown',
+    'LRUCache', 'SQLiteCache',
+    'MarkdownConfig', 'render_many', 'render_sharded',
     'escape', 'escape_url', 'escape_html', 'unikey',
-    'html', 'create_markdown', 'markdown',
+    'html', 'create_markdown', 'get_markdown', 'markdown',
 ]
 
 __version__ = '2.0.0a6'
@@ -0,0 +1,101 @@
+"""
+    Asyncio
+    ~~~~~~~
+
+    Parse and render a document in a coroutine, which gives the control
+    back to the event loop between top level blocks::
+
+        async def handle(request):
+            html = await md.parse_async(text)
+
+    This module needs Python 3.5, it is not imported on Python 2.
+"""
+
+import os
+import asyncio
+import functools
+from time import perf_counter as timer
+from .markdown import preprocess
+from .directives.include import find_includes, read_include
+
+#: seconds of work between two yields to the event loop
+TIME_SLICE = 0.005
+
+_MARKDOWN_EXTS = {'.md', '.markdown', '.mkd'}
+
+
+async def parse_async(md, s, state=None, limits=None,
+                      time_slice=TIME_SLICE):
+    """Parse and render the text of a document like
+    :meth:`~mistune.markdown.Markdown.parse`, and yield to the event loop
+    when a top level block is parsed or rendered after ``time_slice``
+    seconds of work. Files of the include directive are read in the
+    default executor of the loop before parsing.
+
+    When the task is cancelled, the work stops at the next yield. A block
+    is not interrupted, e.g. a long paragraph is rendered at once.
+    """
+    if state is None:
+        state = {}
+    if limits is not None:
+        state['_budget'] = limits.start()
+    loop = asyncio.get_running_loop()
+    clock = _Clock(time_slice)
+
+    s, state = md.before_parse(s, state)
+    if _has_include(md) and state.get('__file__'):
+        await _read_includes(loop, s, state)
+
+    tokens = []
+    for _, _, toks in md.block.parse_spans(s, state):
+        tokens.extend(toks)
+        await clock.tick()
+
+    tokens = md.before_render(tokens, state)
+    await clock.tick()
+
+    outputs = []
+    for tok in tokens:
+        outputs.append(md.block.render([tok], md.inline, state))
+        await clock.tick()
+
+    if md.renderer.IS_TREE:
+        result = [tok for output in outputs for tok in output]
+    else:
+        result = ''.join(outputs)
+    return md.after_render(result, state)
+
+
+class _Clock(object):
+    def __init__(self, time_slice):
+        self.time_slice = time_slice
+        self.start = timer()
+
+    async def tick(self):
+        if timer() - self.start >= self.time_slice:
+            await asyncio.sleep(0)
+            self.start = timer()
+
+
+def _has_include(md):
+    plugin = getattr(md, '_directive', None)
+    return plugin is not None and 'include' in plugin._directives
+
+
+async def _read_includes(loop, s, state):
+    """Read the files which the document may include, and the files
+    included by them, into the ``_include_files`` dict of the state.
+    """
+    files = state.setdefault('_include_files', {})
+    pending = [(s, state['__file__'])]
+    while pending:
+        text, source_file = pending.pop()
+        for dest in find_includes(text, source_file):
+            if dest in files:
+                continue
+            read = functools.partial(read_include, dest)
+            content = files[dest] = await loop.run_in_executor(None, read)
+            ext = os.path.splitext(dest)[1]
+            if content is not None and ext in _MARKDOWN_EXTS:
+                text, _ = preprocess(content.decode('utf-8'), {})
+                pending.append((text, dest))
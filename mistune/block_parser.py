@@ -1,8 +1,11 @@
 import re
+import hashlib
 from .scanner import ScannerParser, Matcher, unikey
 from .inline_parser import ESCAPE_CHAR, LINK_LABEL
+from .cache import fingerprint, _shape
 
-_TRIM_4 = re.compile(r'^ {1,4}')
+_NEWLINE = re.compile(r'\r\n|\r')
+_BLANK_LINES = re.compile(r'^ +$', re.M)
 _EXPAND_TAB = re.compile(r'^( {0,3})\t', flags=re.M)
 _INDENT_CODE_TRIM = re.compile(r'^ {1,4}', flags=re.M)
 _BLOCK_QUOTE_TRIM = re.compile(r'^ {0,1}', flags=re.M)
@@ -34,7 +37,14 @@ _BLOCK_HTML_RULE7 = (
 )
 
 _PARAGRAPH_SPLIT = re.compile(r'\n{2,}')
-_LIST_BULLET = re.compile(r'^ *([\*\+-]|\d+[.)])')
+_REF_LABEL = re.compile(r'\[(' + LINK_LABEL + r')\]')
+_LIST_BULLET = re.compile(r' *(?:[\*\+-]|\d+[.)])')
+_LIST_ITEM = re.compile(
+    r'( *)(?:([\*\+-])|\d{0,9}([.)]))(?:[ \t][^\n]*)?\n'
+)
+_CONTINUATION_CHARS = ('\n', ' ', '\t')
+_INDENTED_LINES = re.compile(r'(?:[ \t][^\n]*\n|\n)*')
+_LIST_HR = re.compile(r' *(?:(?:-[ \t]*){3,}|(?:\*[ \t]*){3,})$')
 
 
 class BlockParser(ScannerParser):
@@ -92,10 +102,24 @@ class BlockParser(ScannerParser):
         'def_link',
     )
 
-    def __init__(self):
+    #: the line starts of rules which can interrupt a paragraph, the end
+    #: of a paragraph is found with the triggers of the active rules
+    RULE_TRIGGERS = {
+        'axt_heading': r' {0,3}#{1,6}',
+        'fenced_code': r' {0,3}(?:`{3,}|~{3,})',
+        'block_quote': r' {0,3}>',
+        'list_start': r' {0,3}(?:[\*\+-]|1[.)])',
+        'block_html': r' {0,3}<',
+    }
+
+    def __init__(self, render_cache=None):
         super(BlockParser, self).__init__()
         self.block_quote_rules = list(self.RULE_NAMES)
         self.list_rules = list(self.RULE_NAMES)
+        #: an :class:`~mistune.cache.LRUCache` of the HTML of top level
+        #: blocks, it can be shared by parsers
+        self.render_cache = render_cache
+        self._cached_render_fingerprint = None
 
     def parse_newline(self, m, state):
         return {'type': 'newline', 'blank': True}
@@ -162,6 +186,24 @@ class BlockParser(ScannerParser):
         state['block_quote_depth'] = depth - 1
         return {'type': 'block_quote', 'children': children}
 
+    def get_rule_lists(self):
+        lists = [self.rules]
+        for depth in (1, self.BLOCK_QUOTE_MAX_DEPTH):
+            lists.append(self.get_block_quote_rules(depth))
+        for depth in (1, self.LIST_MAX_DEPTH):
+            lists.append(self.get_list_rules(depth))
+        # directives parse their content without the directive rule
+        lists.extend([
+            [n for n in rules if n != 'directive']
+            for rules in lists if 'directive' in rules
+        ])
+        return lists
+
+    def freeze(self):
+        self.block_quote_rules = tuple(self.block_quote_rules)
+        self.list_rules = tuple(self.list_rules)
+        super(BlockParser, self).freeze()
+
     def get_list_rules(self, depth):
         if depth > self.LIST_MAX_DEPTH - 1:
             rules = list(self.list_rules)
@@ -173,8 +215,8 @@ class BlockParser(ScannerParser):
         items = []
         spaces = m.group(1)
         marker = m.group(2)
-        items, pos = _find_list_items(string, m.start(), spaces, marker)
-        tight = '\n\n' not in ''.join(items).strip()
+        items, pos, tight = _find_list_items(
+            string, m.start(), spaces, marker)
 
         ordered = len(marker) != 1
         if ordered:
@@ -213,26 +255,34 @@ class BlockParser(ScannerParser):
 
     @staticmethod
     def normalize_list_item_text(text):
-        text_length = len(text)
-        text = _LIST_BULLET.sub('', text)
+        m = _LIST_BULLET.match(text)
+        if m:
+            space = m.end()
+            text = text[space:]
+        else:
+            space = 0
 
         if not text.strip():
             return ''
 
-        space = text_length - len(text)
-        text = expand_leading_tab(text)
+        if '\t' in text:
+            text = expand_leading_tab(text)
         if text.startswith('     '):
             text = text[1:]
             space += 1
         else:
-            text_length = len(text)
-            text = _TRIM_4.sub('', text)
-            space += max(text_length - len(text), 1)
+            trim = min(_count_spaces(text[:4]), 4)
+            text = text[trim:]
+            space += max(trim, 1)
 
         # outdent
         if '\n ' in text:
-            pattern = re.compile(r'\n {1,' + str(space) + r'}')
-            text = pattern.sub(r'\n', text)
+            prefix = ' ' * space
+            lines = text.split('\n')
+            text = '\n'.join([lines[0]] + [
+                line[space:] if line.startswith(prefix) else line.lstrip(' ')
+                for line in lines[1:]
+            ])
         return text
 
     def parse_block_html(self, m, state):
@@ -264,30 +314,204 @@ class BlockParser(ScannerParser):
 
         return list(self._scan(s, state, rules))
 
+    def parse_spans(self, s, state, pos=0):
+        """Parse the top level blocks from ``pos``, which must be the start
+        of a block, and iterate them as ``(start, end, tokens)``.
+        """
+        sc = self._create_scanner(self.rules)
+        for start, end, tok in sc.iter_spans(s, state, _text_hole, pos):
+            if tok is _TEXT_HOLE:
+                # every paragraph of the text is a block
+                for m in _PARAGRAPH_SPLIT.finditer(s, start, end):
+                    text = s[start:m.end()]
+                    yield start, m.end(), self.parse_text(text, state)
+                    start = m.end()
+                if start < end:
+                    text = s[start:end]
+                    yield start, end, self.parse_text(text, state)
+            elif isinstance(tok, list):
+                yield start, end, tok
+            elif tok:
+                yield start, end, [tok]
+            else:
+                yield start, end, []
+
+    def parse_blocks(self, s, state, pos=0):
+        """Parse the top level blocks like :meth:`parse_spans`, and
+        iterate them as ``(start, end, tokens, definitions)``, where
+        ``definitions`` is ``(def_links, def_footnotes)`` of the block,
+        including the definitions in its lists and block quotes. They are
+        added to the dicts of the state, the first definition of a key is
+        used.
+        """
+        def_links = state['def_links']
+        def_footnotes = state['def_footnotes']
+        state['def_links'] = {}
+        state['def_footnotes'] = {}
+        try:
+            for start, end, tokens in self.parse_spans(s, state, pos):
+                links = state['def_links']
+                notes = state['def_footnotes']
+                for key in links:
+                    def_links.setdefault(key, links[key])
+                for key in notes:
+                    def_footnotes.setdefault(key, notes[key])
+                state['def_links'] = {}
+                state['def_footnotes'] = {}
+                yield start, end, tokens, (links, notes)
+        finally:
+            state['def_links'] = def_links
+            state['def_footnotes'] = def_footnotes
+
     def render(self, tokens, inline, state):
+        cache = self.render_cache
+        if cache is None or inline.renderer.IS_TREE or '_budget' in state:
+            return self._render_tokens(tokens, inline, state)
+
+        fingerprint = self._render_fingerprint(inline)
+        result = []
+        for tok in tokens:
+            key = None
+            if 'blank' not in tok:
+                key = self._render_cache_key(tok, fingerprint, state)
+
+            if key is None:
+                output = self._render_token(tok, inline, state, None)
+            else:
+                output = cache.get(key)
+                if output is None:
+                    output = self._render_token(tok, inline, state, None)
+                    cache.set(key, output)
+            result.append(output)
+        return ''.join(result)
+
+    def _render_fingerprint(self, inline):
+        # the patterns of the rules and the names of the methods of the
+        # inline parser and the renderer, which are described again when
+        # one of their attributes is changed
+        shape = _shape(inline), _shape(inline.renderer)
+        cached = self._cached_render_fingerprint
+        if cached is None or cached[0] != shape:
+            cached = shape, fingerprint(type(self), inline)
+            self._cached_render_fingerprint = cached
+        return cached[1]
+
+    def _render_cache_key(self, tok, fingerprint, state):
+        """Key of a top level token in the render cache, ``None`` if it can
+        not be cached. The key has the definitions of the links which the
+        token may refer, tokens with footnotes are not cached since they
+        are numbered in the document.
+        """
+        if 'children' in tok:
+            text = '\n'.join(_iter_token_texts(tok))
+        else:
+            text = tok.get('text', '')
+        if state.get('def_footnotes') and '[^' in text:
+            return None
+
+        refs = ()
+        def_links = state.get('def_links')
+        if def_links and '[' in text:
+            keys = {unikey(m.group(1)) for m in _REF_LABEL.finditer(text)}
+            refs = tuple(sorted(
+                (k, def_links[k]) for k in keys if k in def_links
+            ))
+
+        source = repr(tok).encode('utf-8')
+        return fingerprint, hashlib.sha1(source).digest(), refs
+
+    def render_into(self, tokens, inline, state, write):
+        """Render the tokens fragment by fragment into the ``write``
+        callable. The children of wrapper tokens, e.g. lists and block
+        quotes, are written between their opening and closing fragments
+        instead of being joined into a string first.
+        """
+        renderer = inline.renderer
+        for tok in tokens:
+            if 'children' in tok and renderer.is_wrapper(tok['type']):
+                method = renderer._get_method(tok['type'])
+                html = method(_WRAPPER_MARK, *(tok.get('params') or ()))
+                parts = html.split(_WRAPPER_MARK)
+                if len(parts) == 2:
+                    if parts[0]:
+                        write(parts[0])
+                    self.render_into(tok['children'], inline, state, write)
+                    if parts[1]:
+                        write(parts[1])
+                    continue
+
+            output = self._render_token(tok, inline, state, None)
+            if output:
+                write(output)
+
+    def _render_tokens(self, tokens, inline, state):
         data = self._iter_render(tokens, inline, state)
         if inline.renderer.IS_TREE:
             return list(data)
+        budget = state.get('_budget')
+        if budget is not None:
+            return budget.join(data)
         return ''.join(data)
 
     def _iter_render(self, tokens, inline, state):
+        budget = state.get('_budget')
         for tok in tokens:
-            method = inline.renderer._get_method(tok['type'])
-            if 'blank' in tok:
-                yield method()
-                continue
-
-            if 'children' in tok:
-                children = self.render(tok['children'], inline, state)
-            elif 'raw' in tok:
-                children = tok['raw']
-            else:
-                children = inline(tok['text'], state)
-            params = tok.get('params')
-            if params:
-                yield method(children, *params)
+            if budget is not None:
+                budget.check(1)
+            yield self._render_token(tok, inline, state, budget)
+
+    def _render_token(self, tok, inline, state, budget):
+        method = inline.renderer._get_method(tok['type'])
+        if 'blank' in tok:
+            return method()
+
+        if 'children' in tok:
+            if budget is None:
+                children = self._render_tokens(tok['children'], inline, state)
             else:
-                yield method(children)
+                budget.enter()
+                try:
+                    children = self._render_tokens(
+                        tok['children'], inline, state)
+                finally:
+                    budget.leave()
+        elif 'raw' in tok:
+            children = tok['raw']
+        else:
+            children = inline(tok['text'], state)
+        params = tok.get('params')
+        if params:
+            return method(children, *params)
+        return method(children)
+
+
+def _iter_token_texts(tok):
+    text = tok.get('text')
+    if text:
+        yield text
+    for child in tok.get('children') or ():
+        for text in _iter_token_texts(child):
+            yield text
+
+
+_TEXT_HOLE = object()
+#: children of a wrapper token, to split its opening and closing fragments
+_WRAPPER_MARK = '\x00'
+
+
+def _text_hole(text, state):
+    return _TEXT_HOLE
+
+
+def normalize_text(text):
+    """Normalize new lines, blank lines and leading tabs. Lines are
+    normalized one by one, so the text can be normalized in pieces which
+    end with new lines.
+    """
+    text = text.replace('\u2424', '\n')
+    text = _NEWLINE.sub('\n', text)
+    text = _BLANK_LINES.sub('', text)
+    return expand_leading_tab(text)
 
 
 def expand_leading_tab(text):
@@ -299,59 +523,97 @@ def _expand_tab_repl(m):
     return s + ' ' * (4 - len(s))
 
 
-def _create_list_item_pattern(spaces, marker):
-    prefix = r'( {0,' + str(len(spaces) + len(marker)) + r'})'
-
-    if len(marker) > 1:
-        if marker[-1] == '.':
-            prefix = prefix + r'\d{0,9}\.'
-        else:
-            prefix = prefix + r'\d{0,9}\)'
-    else:
-        if marker == '*':
-            prefix = prefix + r'\*'
-        elif marker == '+':
-            prefix = prefix + r'\+'
-        else:
-            prefix = prefix + r'-'
-
-    s1 = ' {' + str(len(marker) + 1) + ',}'
-    if len(marker) > 4:
-        s2 = ' {' + str(len(marker) - 4) + r',}\t'
-    else:
-        s2 = r' *\t'
-    return re.compile(
-        prefix + r'(?:[ \t]*|[ \t]+[^\n]+)\n+'
-        r'(?:\1(?:' + s1 + '|' + s2 + ')'
-        r'[^\n]+\n+)*'
-    )
-
-
 def _find_list_items(string, pos, spaces, marker):
+    """Find the items of a list line by line, return a tuple of
+    ``(items, end, tight)``. A list is loose if there is a blank line
+    before its last line of content.
+    """
     items = []
+    tight = True
+    blank = False
+    width = len(marker)
+    hr = marker in ('*', '-')
 
-    if marker in {'*', '-'}:
-        is_hr = re.compile(
-            r' *((?:-[ \t]*){3,}|(?:\*[ \t]*){3,})\n+'
-        )
-    else:
-        is_hr = None
-
-    pattern = _create_list_item_pattern(spaces, marker)
     while 1:
-        m = pattern.match(string, pos)
+        m = _LIST_ITEM.match(string, pos)
         if not m:
             break
 
-        text = m.group(0)
-        if is_hr and is_hr.match(text):
+        indent = len(m.group(1))
+        if indent > len(spaces) + width:
+            break
+        bullet = m.group(2)
+        if width == 1:
+            if bullet != marker:
+                break
+        elif bullet or m.group(3) != marker[-1]:
+            break
+        if hr and _LIST_HR.match(string, pos, m.end() - 1):
             break
 
-        new_spaces = m.group(1)
-        if new_spaces != spaces:
-            spaces = new_spaces
-            pattern = _create_list_item_pattern(spaces, marker)
+        spaces = m.group(1)
+        if blank:
+            tight = False
+            blank = False
 
-        items.append(text)
+        # the continuation lines are indented more than the marker
+        item_start = pos
         pos = m.end()
-    return items, pos
+        prefix = ' ' * (indent + width + 1)
+        size = len(prefix)
+
+        # most items are followed by lines which are indented enough,
+        # they are accepted at once
+        end = _INDENTED_LINES.match(string, pos).end()
+        if end > pos and all(
+                not line or line.startswith(prefix) and len(line) > size
+                for line in string[pos:end].split('\n')):
+            chunk = string[pos - 1:end]
+            i = chunk.find('\n\n')
+            if i != -1:
+                if chunk[i:].strip():
+                    tight = False
+                blank = not chunk[chunk.rfind('\n\n'):].strip()
+            pos = end
+
+        while string.startswith(_CONTINUATION_CHARS, pos):
+            end = pos
+            while string.startswith('\n', end):
+                end += 1
+            if end > pos:
+                blank = True
+
+            if string.startswith(prefix, end) and \
+                    string[end + size:end + size + 1] not in ('\n', ''):
+                line_end = string.find('\n', end + size)
+            else:
+                line_end = string.find('\n', end)
+                if line_end != -1 and not _is_list_item_line(
+                        string[end:line_end], indent, width):
+                    line_end = -1
+            if line_end == -1:
+                pos = end
+                break
+
+            if blank and string[end:line_end].strip():
+                tight = False
+                blank = False
+            pos = line_end + 1
+
+        items.append(string[item_start:pos])
+    return items, pos, tight
+
+
+def _count_spaces(line):
+    return len(line) - len(line.lstrip(' '))
+
+
+def _is_list_item_line(line, indent, width):
+    count = _count_spaces(line)
+    if count < indent:
+        return False
+    if count - indent > width and len(line) > indent + width + 1:
+        return True
+    if line[count:count + 1] != '\t' or len(line) < count + 2:
+        return False
+    return width <= 4 or count - indent >= width - 4
@@ -0,0 +1,300 @@
+"""
+    Cache
+    ~~~~~
+
+    Caches of compiled scanners, Markdown instances and rendered documents.
+    A cache has ``get``, ``set`` and ``clear`` methods, and counters of
+    ``hits``, ``misses`` and ``evictions``.
+"""
+
+import os
+import time
+import types
+import pickle
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+
+try:
+    import sqlite3
+except ImportError:  # pragma: no cover
+    sqlite3 = None
+
+
+class LRUCache(object):
+    """A thread safe, size bounded mapping which evicts the least recently
+    used item when it is full::
+
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.get('a')  # => 1
+
+    :param maxsize: max count of items to keep.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache(object):
+    """A cache in a local SQLite file, which can be shared by the worker
+    processes of a server::
+
+        cache = SQLiteCache('/tmp/markdown.db', maxsize=100000)
+        markdown = create_markdown(cache=cache)
+
+    Values are pickled, only use a file which other users can not write.
+    The counters are of the current process. The access times of hits are
+    written in batches, when an item is set, or when the cache is closed.
+
+    :param path: path of the database file.
+    :param maxsize: max count of items to keep, the least recently used
+        items are evicted.
+    :param timeout: seconds to wait for the lock of the database.
+    """
+    #: count of access times of hits which are written at once
+    ATIME_BATCH = 100
+
+    def __init__(self, path, maxsize=None, timeout=5.0):
+        if sqlite3 is None:  # pragma: no cover
+            raise RuntimeError('sqlite3 is not available')
+
+        self.path = path
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._atimes = {}
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(key TEXT PRIMARY KEY, value BLOB, atime REAL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS cache_atime ON cache (atime)'
+            )
+
+    def _connect(self):
+        # connections can not be shared by threads or forked processes
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def get(self, key, default=None):
+        row = self._connect().execute(
+            'SELECT value FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        # a read does not take the lock of the database for writing
+        with self._lock:
+            self._atimes[key] = time.time()
+            full = len(self._atimes) >= self.ATIME_BATCH
+        if full:
+            with self._connect() as conn:
+                self._write_atimes(conn)
+        return pickle.loads(row[0])
+
+    def _write_atimes(self, conn):
+        with self._lock:
+            atimes, self._atimes = self._atimes, {}
+        if atimes:
+            conn.executemany(
+                'UPDATE cache SET atime = ? WHERE key = ?',
+                [(atime, key) for key, atime in atimes.items()],
+            )
+
+    def set(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            self._write_atimes(conn)
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, atime) '
+                'VALUES (?, ?, ?)',
+                (key, sqlite3.Binary(data), time.time()),
+            )
+            if self.maxsize is not None:
+                cursor = conn.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                    'ORDER BY atime DESC LIMIT -1 OFFSET ?)',
+                    (self.maxsize,),
+                )
+                self.evictions += max(cursor.rowcount, 0)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache')
+
+    def close(self):
+        """Write the access times of hits and close the connection of the
+        current thread.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with conn:
+                self._write_atimes(conn)
+            conn.close()
+            self._local.conn = None
+
+    def __contains__(self, key):
+        row = self._connect().execute(
+            'SELECT 1 FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+def fingerprint(*objects):
+    """A hash of the configuration of the given objects, which is the same
+    in every process running the same code of the same version of mistune.
+    Functions are identified by their names, code, default arguments and
+    closures, other objects by their types and attributes.
+    """
+    from . import __version__
+    data = repr([__version__] + [_describe(obj, set()) for obj in objects])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def _shape(obj):
+    # identities of the attributes, to find out changes cheaply
+    items = []
+    for k, v in obj.__dict__.items():
+        if k.startswith('_cached'):
+            continue
+        if isinstance(v, dict):
+            v = tuple((key, id(value)) for key, value in v.items())
+        elif isinstance(v, list):
+            v = tuple(id(value) for value in v)
+        else:
+            v = id(v)
+        items.append((k, v))
+    return id(obj), tuple(items)
+
+
+def _qualname(obj):
+    name = getattr(obj, '__qualname__', None) or obj.__name__
+    return getattr(obj, '__module__', None), name
+
+
+def _describe(obj, seen):
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes)):
+        return obj
+
+    if isinstance(obj, types.CodeType):
+        return (
+            'code', obj.co_code, _describe(obj.co_consts, seen),
+            obj.co_names,
+        )
+
+    if hasattr(obj, 'pattern') and hasattr(obj, 'flags'):
+        return 'pattern', obj.pattern, obj.flags
+
+    if isinstance(obj, (list, tuple)):
+        return [_describe(v, seen) for v in obj]
+
+    if isinstance(obj, (set, frozenset)):
+        return sorted(repr(_describe(v, seen)) for v in obj)
+
+    if isinstance(obj, dict):
+        return sorted(
+            (repr(_describe(k, seen)), _describe(v, seen))
+            for k, v in obj.items()
+        )
+
+    if id(obj) in seen:
+        # a reference back to an object being described, e.g. the parser
+        # in the closure of a registered rule
+        return 'seen', _qualname(type(obj))
+    seen = seen | {id(obj)}
+
+    if isinstance(obj, type):
+        # the code of the methods, which may be changed in place
+        methods = []
+        for cls in obj.__mro__:
+            for name, value in sorted(vars(cls).items()):
+                func = getattr(value, '__func__', value)
+                if isinstance(func, types.FunctionType):
+                    methods.append((name, _describe(func, seen)))
+        return _qualname(obj), methods
+
+    if isinstance(obj, functools.partial):
+        return (
+            'partial', _describe(obj.func, seen),
+            _describe(obj.args, seen), _describe(obj.keywords, seen),
+        )
+
+    if isinstance(obj, types.MethodType):
+        return (
+            'method', _describe(obj.__func__, seen),
+            _describe(obj.__self__, seen),
+        )
+
+    if isinstance(obj, types.FunctionType):
+        closure = [c.cell_contents for c in obj.__closure__ or ()]
+        return (
+            'function', _qualname(obj), _describe(obj.__code__, seen),
+            _describe(obj.__defaults__, seen), _describe(closure, seen),
+        )
+
+    attrs = getattr(obj, '__dict__', None)
+    if attrs is None:
+        return _describe(type(obj), seen)
+
+    attrs = dict(
+        (k, v) for k, v in attrs.items()
+        if not k.startswith('_cached') and not _is_cache(v)
+    )
+    return _describe(type(obj), seen), _describe(attrs, seen)
+
+
+def _is_cache(obj):
+    # caches, e.g. the render cache of a parser, do not change the output
+    return all(
+        hasattr(obj, name) for name in ('get', 'set', 'clear', 'hits'))
@@ -0,0 +1,153 @@
+"""
+    Config
+    ~~~~~~
+
+    A picklable description of a :class:`~mistune.markdown.Markdown`
+    instance, which can be sent to worker processes, and the rendering of
+    many documents with a pool of processes::
+
+        config = MarkdownConfig(plugins=['table', 'footnotes'])
+        for html in render_many(config, texts, workers=8):
+            save(html)
+"""
+
+import multiprocessing
+from collections import deque
+from .markdown import Markdown
+from .block_parser import BlockParser
+from .inline_parser import InlineParser
+from .renderers import AstRenderer, HTMLRenderer
+from .plugins import PLUGINS
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # pragma: no cover
+    ProcessPoolExecutor = None
+
+#: count of documents sent to a worker at a time
+CHUNK_SIZE = 64
+
+#: the Markdown instance of a worker process
+_worker_markdown = None
+
+
+class MarkdownConfig(object):
+    """The options of a Markdown instance, :meth:`create` creates the
+    instance. Plugins and classes must be importable, e.g. the names of
+    :data:`mistune.plugins.PLUGINS`, functions of modules, and instances
+    of directives, so that the config can be pickled.
+
+    :param renderer: ``html``, ``ast`` or a renderer class.
+    :param escape: escape HTML of the ``html`` renderer.
+    :param plugins: list of plugin names or plugins.
+    :param renderer_options: keyword arguments of the renderer class.
+    :param block: block parser class, e.g. ``LineBlockParser``.
+    :param block_options: keyword arguments of the block parser class.
+    :param inline_options: keyword arguments of ``InlineParser``, e.g.
+        ``hard_wrap``.
+    """
+    def __init__(self, renderer='html', escape=True, plugins=None,
+                 renderer_options=None, block=None, block_options=None,
+                 inline_options=None):
+        self.renderer = renderer
+        self.escape = escape
+        self.plugins = list(plugins or ())
+        self.renderer_options = dict(renderer_options or {})
+        self.block = block
+        self.block_options = dict(block_options or {})
+        self.inline_options = dict(inline_options or {})
+
+    def create(self):
+        """Create a new Markdown instance of the config."""
+        options = dict(self.renderer_options)
+        if self.renderer == 'html':
+            options.setdefault('escape', self.escape)
+            renderer = HTMLRenderer(**options)
+        elif self.renderer == 'ast':
+            renderer = AstRenderer(**options)
+        else:
+            renderer = self.renderer(**options)
+
+        block_cls = self.block or BlockParser
+        block = block_cls(**self.block_options)
+        inline = InlineParser(renderer, **self.inline_options)
+        plugins = [
+            PLUGINS[p] if isinstance(p, str) else p for p in self.plugins
+        ]
+        return Markdown(renderer, block=block, inline=inline, plugins=plugins)
+
+    def __eq__(self, other):
+        if not isinstance(other, MarkdownConfig):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __repr__(self):
+        return 'MarkdownConfig({})'.format(', '.join(
+            '{}={!r}'.format(k, v) for k, v in sorted(self.__dict__.items())
+        ))
+
+
+def render_many(config, texts, workers=None, chunksize=CHUNK_SIZE):
+    """Render the texts with a pool of processes, iterate the outputs in
+    the order of the texts. Every worker creates one Markdown instance of
+    the config, the texts are sent to the workers in chunks, and only a
+    few chunks are pending at a time, so ``texts`` can be a generator of
+    a large count of documents.
+
+    :param config: :class:`MarkdownConfig` instance.
+    :param texts: iterable of texts.
+    :param workers: count of processes, the count of CPUs by default. With
+        one worker, the texts are rendered in the current process.
+    :param chunksize: count of texts sent to a worker at a time.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        md = config.create()
+        for text in texts:
+            yield md(text)
+        return
+
+    if ProcessPoolExecutor is None:  # pragma: no cover
+        raise RuntimeError('concurrent.futures is not available')
+
+    executor = ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(config,))
+    with executor:
+        pending = deque()
+        for chunk in _iter_chunks(texts, chunksize):
+            pending.append(executor.submit(_render_chunk, chunk))
+            if len(pending) > workers * 2:
+                for output in pending.popleft().result():
+                    yield output
+        while pending:
+            for output in pending.popleft().result():
+                yield output
+
+
+def _init_worker(config):
+    global _worker_markdown
+    _worker_markdown = config.create()
+    # compile the scanners before the first chunk
+    _worker_markdown('# a\n\n*b*\n')
+
+
+def _render_chunk(texts):
+    return [_worker_markdown(text) for text in texts]
+
+
+def _iter_chunks(texts, size):
+    chunk = []
+    for text in texts:
+        chunk.append(text)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
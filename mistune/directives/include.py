@@ -1,6 +1,6 @@
 import os
 from mistune.markdown import preprocess
-from .base import Directive
+from .base import Directive, DIRECTIVE_PATTERN
 
 
 class DirectiveInclude(Directive):
@@ -15,28 +15,28 @@ class DirectiveInclude(Directive):
         relpath = m.group('value')
         options = self.parse_options(m)
 
-        dest = os.path.join(os.path.dirname(source_file), relpath)
-        dest = os.path.normpath(dest)
+        dest = include_path(source_file, relpath)
         if dest == source_file:
             return {
                 'type': 'block_error',
                 'raw': 'Could not include self: ' + relpath,
             }
 
-        if not os.path.isfile(dest):
+        content = _read_file(dest, state)
+        if content is None:
             return {
                 'type': 'block_error',
                 'raw': 'Could not find file: ' + relpath,
             }
-
-        with open(dest, 'rb') as f:
-            content = f.read()
-            text = content.decode('utf-8')
+        text = content.decode('utf-8')
 
         if not options:
             ext = os.path.splitext(relpath)[1]
             if ext in {'.md', '.markdown', '.mkd'}:
-                text, state = preprocess(text, {'__file__': dest})
+                child_state = {'__file__': dest}
+                if '_include_files' in state:
+                    child_state['_include_files'] = state['_include_files']
+                text, state = preprocess(text, child_state)
                 return block.parse(text, state)
             if ext in {'.html', '.xhtml', '.htm'}:
                 return {'type': 'block_html', 'text': text}
@@ -50,12 +50,47 @@ class DirectiveInclude(Directive):
     def __call__(self, md):
         self.register_directive(md, 'include')
         if md.renderer.NAME == 'html':
-            md.renderer.register('include', render_html_include)
+            md.renderer.register(
+                'include', render_html_include, wrapper=True)
 
         elif md.renderer.NAME == 'ast':
             md.renderer.register('include', render_ast_include)
 
 
+def include_path(source_file, relpath):
+    """Path of the file included by ``relpath`` in the source file."""
+    dest = os.path.join(os.path.dirname(source_file), relpath)
+    return os.path.normpath(dest)
+
+
+def find_includes(text, source_file):
+    """Iterate the paths of the files which the include directives of the
+    text may include, e.g. to read them before parsing.
+    """
+    for m in DIRECTIVE_PATTERN.finditer(text):
+        if m.group('name') == 'include':
+            dest = include_path(source_file, m.group('value'))
+            if dest != source_file:
+                yield dest
+
+
+def read_include(dest):
+    """Read the bytes of an included file, ``None`` if it is missing."""
+    if not os.path.isfile(dest):
+        return None
+    with open(dest, 'rb') as f:
+        return f.read()
+
+
+def _read_file(dest, state):
+    # files read before parsing, e.g. by parse_async, are kept in the
+    # "_include_files" dict of the state
+    files = state.get('_include_files')
+    if files is not None and dest in files:
+        return files[dest]
+    return read_include(dest)
+
+
 def render_ast_include(text, relpath, abspath=None, options=None):
     return {
         'type': 'include',
@@ -62,8 +62,10 @@ class DirectiveToc(Directive):
 
 
 def record_toc_heading(text, level, state):
-    # we will use this method to replace tokenize_heading
-    tid = 'toc_' + str(len(state['toc_headings']) + 1)
+    # we will use this method to replace tokenize_heading, the ids of a
+    # part of a document start after the "toc_offset" headings before it
+    index = state.get('toc_offset', 0) + len(state['toc_headings']) + 1
+    tid = 'toc_' + str(index)
     state['toc_headings'].append((tid, text, level))
     return {'type': 'theading', 'text': text, 'params': (level, tid)}
 
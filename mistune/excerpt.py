@@ -0,0 +1,296 @@
+"""
+    Excerpt
+    ~~~~~~~
+
+    Render the first blocks of a document, e.g. for previews of feeds and
+    search results, without parsing the rest of it::
+
+        html = md.render_excerpt(text, max_chars=300)
+
+    The output is cut after ``max_chars`` characters of text, and the
+    open tags are closed.
+"""
+
+import re
+
+#: appended to the text of a cut block
+ELLIPSIS = u'…'
+
+_HTML_PART = re.compile(
+    r'<!--.*?-->|<(/?)([A-Za-z][A-Za-z0-9-]*)[^>]*>'
+    r'|&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);',
+    re.S,
+)
+#: a line which may start a definition of a link or a footnote
+_DEFINITION = re.compile(r'^[ >]*\[(?:\\.|[^\\\]]){0,1000}\]:', re.M)
+_VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'source', 'track', 'wbr',
+}
+
+
+def render_excerpt(md, s, max_chars=None, max_blocks=None, state=None,
+                   ellipsis=ELLIPSIS):
+    """Render the top level blocks of a document until ``max_chars``
+    characters of text or ``max_blocks`` blocks are rendered. The blocks
+    after them are not parsed, and ``after_render`` hooks are not called,
+    e.g. there is no section of footnotes.
+
+    When the excerpt has brackets and a definition of a link or footnote
+    may follow it, the rest of the blocks are parsed, but not rendered,
+    so that references are resolved.
+
+    :param md: :class:`~mistune.markdown.Markdown` instance of a renderer
+        of text.
+    :param s: text of the document.
+    :param max_chars: max count of characters of text, new lines and
+        tags are not counted.
+    :param max_blocks: max count of top level blocks.
+    :param state: dict of the parsing state.
+    :param ellipsis: text appended to the last block when it is cut.
+    """
+    if md.renderer.IS_TREE:
+        raise ValueError('render_excerpt() needs a renderer of text')
+
+    if state is None:
+        state = {}
+    s, state = md.before_parse(s, state)
+    spans = md.block.parse_spans(s, state)
+    excerpt = _Excerpt(max_chars, max_blocks, ellipsis)
+    pos = 0
+    parsed = False
+    while not excerpt.full:
+        # the text of a block is not shorter than its output, parse
+        # blocks until their text fills the excerpt, and more blocks if
+        # the output is shorter, e.g. of reference links
+        tokens, end = _parse_blocks(spans, excerpt, pos)
+        if not tokens:
+            break
+        if not parsed and '[' in s[pos:end] and _DEFINITION.search(s, end):
+            spans = iter(list(spans))
+            parsed = True
+        pos = end
+        tokens = md.before_render(tokens, state)
+        for tok in tokens:
+            pruned = False
+            if max_chars is not None:
+                rest = max_chars - excerpt.chars
+                tok, pruned = _prune(md, tok, rest, state)
+            output = md.block.render([tok], md.inline, state)
+            excerpt.add(tok, output, pruned)
+            if excerpt.full:
+                break
+    return ''.join(excerpt.outputs)
+
+
+class _Excerpt(object):
+    def __init__(self, max_chars, max_blocks, ellipsis):
+        self.max_chars = max_chars
+        self.max_blocks = max_blocks
+        self.ellipsis = ellipsis
+        self.chars = 0
+        self.blocks = 0
+        self.outputs = []
+        self.full = (
+            max_chars is not None and max_chars <= 0 or
+            max_blocks is not None and max_blocks <= 0
+        )
+
+    def add(self, tok, output, pruned=False):
+        if self.max_chars is not None:
+            size = text_length(output)
+            rest = self.max_chars - self.chars
+            if size > rest:
+                output = truncate_html(output, rest, self.ellipsis)
+                self.full = True
+            elif pruned:
+                output = _append_ellipsis(output, self.ellipsis)
+                self.full = True
+            self.chars += size
+            if self.chars >= self.max_chars:
+                self.full = True
+
+        self.outputs.append(output)
+        if 'blank' not in tok:
+            self.blocks += 1
+            if self.max_blocks is not None:
+                if self.blocks >= self.max_blocks:
+                    self.full = True
+
+
+def _parse_blocks(spans, excerpt, pos):
+    chars = blocks = None
+    if excerpt.max_chars is not None:
+        chars = excerpt.max_chars - excerpt.chars
+    if excerpt.max_blocks is not None:
+        blocks = excerpt.max_blocks - excerpt.blocks
+
+    tokens = []
+    size = count = 0
+    end = pos
+    for start, end, toks in spans:
+        tokens.extend(toks)
+        if any('blank' not in tok for tok in toks):
+            size += end - start
+            count += sum(1 for tok in toks if 'blank' not in tok)
+        if chars is not None and size >= chars:
+            break
+        if blocks is not None and count >= blocks:
+            break
+    return tokens, end
+
+
+def _prune(md, tok, size, state):
+    # drop the children of a long list or block quote after the rendered
+    # text of the size, the last kept child may be cut after rendering
+    children = tok.get('children')
+    if not isinstance(children, list):
+        return tok, False
+
+    # the children are measured with a copy of the footnote references
+    scratch = dict(state)
+    if 'footnotes' in state:
+        scratch['footnotes'] = list(state['footnotes'])
+
+    kept = []
+    pruned = False
+    for child in children:
+        if size <= 0:
+            break
+        output = md.block.render([child], md.inline, scratch)
+        length = text_length(output)
+        if length > size:
+            child, pruned = _prune(md, child, size, state)
+            # a child is kept if a word of it is in the excerpt
+            if pruned or text_length(_truncate(output, size, '', True)):
+                kept.append(child)
+            break
+        kept.append(child)
+        size -= length
+    if not kept or not pruned and len(kept) == len(children):
+        return tok, False
+    return dict(tok, children=kept), True
+
+
+def text_length(html):
+    """Count the characters of the text of the HTML, an entity is one
+    character, new lines and tags are not counted.
+    """
+    count = 0
+    pos = 0
+    for m in _HTML_PART.finditer(html):
+        count += _text_size(html[pos:m.start()])
+        if m.group(0)[0] == '&':
+            count += 1
+        pos = m.end()
+    return count + _text_size(html[pos:])
+
+
+def truncate_html(html, max_chars, ellipsis=ELLIPSIS):
+    """Cut the HTML after ``max_chars`` characters of text, at the end of
+    a word when it is possible, append the ellipsis and close the open
+    tags, with the new lines after their closing tags in the HTML. The
+    HTML is returned as it is if the text is not longer.
+    """
+    return _truncate(html, max_chars, ellipsis, False)
+
+
+def _truncate(html, max_chars, ellipsis, after_text):
+    out = []
+    stack = []
+    count = 0
+    pos = 0
+    for m in _HTML_PART.finditer(html):
+        text = html[pos:m.start()]
+        size = _text_size(text)
+        if count + size > max_chars:
+            text = _cut_text(text, max_chars - count, after_text or count)
+            out.append(text + ellipsis)
+            return _close(out, stack, html, m.start())
+        count += size
+        out.append(text)
+
+        part = m.group(0)
+        if part[0] == '&':
+            if count + 1 > max_chars:
+                out[-1] = text.rstrip() + ellipsis
+                return _close(out, stack, html, m.end())
+            count += 1
+        elif m.group(2):
+            name = m.group(2).lower()
+            if m.group(1):
+                if name in stack:
+                    while stack.pop() != name:
+                        pass
+            elif name not in _VOID_ELEMENTS and not part.endswith('/>'):
+                stack.append(name)
+        out.append(part)
+        pos = m.end()
+
+    text = html[pos:]
+    if count + _text_size(text) > max_chars:
+        text = _cut_text(text, max_chars - count, after_text or count)
+        out.append(text + ellipsis)
+        return _close(out, stack, html, len(html))
+    return html
+
+
+def _append_ellipsis(html, ellipsis):
+    # the ellipsis is added after the last text of the HTML
+    end = pos = 0
+    for m in _HTML_PART.finditer(html):
+        text = html[pos:m.start()].rstrip()
+        if text:
+            end = pos + len(text)
+        if m.group(0)[0] == '&':
+            end = m.end()
+        pos = m.end()
+    text = html[pos:].rstrip()
+    if text:
+        end = pos + len(text)
+    return html[:end] + ellipsis + html[end:]
+
+
+def _text_size(text):
+    return len(text) - text.count('\n')
+
+
+def _cut_text(text, size, after_text):
+    i = 0
+    while size > 0:
+        if text[i] != '\n':
+            size -= 1
+        i += 1
+
+    if i < len(text) and not text[i].isspace():
+        # do not cut a word, unless it is the only text
+        j = text.rfind(' ', 0, i)
+        if j >= 0 or after_text:
+            i = max(j, 0)
+    return text[:i].rstrip()
+
+
+def _close(out, stack, html, pos):
+    # the open tags are closed by their closing tags in the rest of the
+    # HTML, with the new lines after them, as the renderer wrote them
+    skipped = []
+    for m in _HTML_PART.finditer(html, pos):
+        if not stack:
+            break
+        if not m.group(2):
+            continue
+        name = m.group(2).lower()
+        if not m.group(1):
+            part = m.group(0)
+            if name not in _VOID_ELEMENTS and not part.endswith('/>'):
+                skipped.append(name)
+        elif skipped and skipped[-1] == name:
+            skipped.pop()
+        elif name == stack[-1]:
+            stack.pop()
+            end = m.end()
+            while html.startswith('\n', end):
+                end += 1
+            out.append(html[m.start():end])
+    out.extend('</' + name + '>' for name in reversed(stack))
+    return ''.join(out)
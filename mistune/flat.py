@@ -0,0 +1,432 @@
+"""
+    Flat AST
+    ~~~~~~~~
+
+    A binary format of the tokens of :class:`~mistune.renderers.AstRenderer`
+    for caching parsed documents on disk. The nodes are kept in flat
+    arrays, with a table of the shared strings::
+
+        with open('doc.ast', 'wb') as f:
+            dump(tokens, f)
+
+        with load('doc.ast') as ast:
+            ast[0]['type']
+
+    A loaded file is memory mapped, nodes are read when they are accessed,
+    and compare equal to the dicts of the same tokens. Tuples are read as
+    lists, as with JSON.
+
+    Layout, every array is little endian and aligned to 8 bytes::
+
+        header
+        nodes         uint32 * 3 * nodes: type, first value, count of values
+        value keys    uint32 * values: string index of the key
+        value tags    uint8 * values: type of the value
+        value data    int64 * values: number, string index or range
+        string ends   uint32 * strings: end offset in the string data
+        string data   utf-8
+"""
+
+import sys
+import mmap
+import struct
+from array import array
+from collections import deque
+from .renderers import AstRenderer
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:  # pragma: no cover
+    from collections import Mapping, Sequence
+
+#: version of the layout of the file
+FORMAT_VERSION = 1
+
+MAGIC = b'MAST'
+
+# magic, format version, ast version, first root node, count of root
+# nodes, count of nodes, count of values, count of strings, size of the
+# string data
+_HEADER = struct.Struct('<4sHHIIIIII')
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _NODES, _LIST, _NODE = range(9)
+_NO_KEY = 0xffffffff
+_DOUBLE = struct.Struct('<d')
+_INT64 = struct.Struct('<q')
+_LITTLE = sys.byteorder == 'little'
+
+
+class FormatError(ValueError):
+    """The data is not a flat AST of this version."""
+
+
+def dumps(tokens):
+    """Serialize the list of tokens into bytes."""
+    writer = _Writer()
+    writer.write(tokens)
+    return writer.getvalue()
+
+
+def dump(tokens, fileobj):
+    """Serialize the list of tokens into a file object of bytes."""
+    fileobj.write(dumps(tokens))
+
+
+def loads(data):
+    """Read a :class:`FlatAST` from bytes or a buffer."""
+    return FlatAST(data)
+
+
+def load(path):
+    """Memory map the file of the path into a :class:`FlatAST`, close it
+    when it is not used, or use it as a context manager.
+    """
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return FlatAST(buf, buf)
+
+
+class _Writer(object):
+    def __init__(self):
+        self.nodes = array('I')
+        self.keys = array('I')
+        self.tags = array('B')
+        self.data = array('q')
+        self.strings = {}
+        self.string_data = []
+        self.string_ends = array('I')
+        self.size = 0
+        self.pending = deque()
+        self.root = (0, 0)
+
+    def write(self, tokens):
+        self.root = (self.reserve_nodes(tokens), len(tokens))
+        pending = self.pending
+        while pending:
+            kind, first, items = pending.popleft()
+            if kind == _NODES:
+                for i, node in enumerate(items):
+                    self.fill_node(first + i, node)
+            else:
+                for i, value in enumerate(items):
+                    self.fill_value(first + i, _NO_KEY, value)
+
+    def string(self, s):
+        index = self.strings.get(s)
+        if index is None:
+            data = s.encode('utf-8')
+            self.size += len(data)
+            index = len(self.string_data)
+            self.strings[s] = index
+            self.string_data.append(data)
+            self.string_ends.append(self.size)
+        return index
+
+    def reserve_nodes(self, items):
+        first = len(self.nodes) // 3
+        self.nodes.extend([0] * (3 * len(items)))
+        self.pending.append((_NODES, first, items))
+        return first
+
+    def reserve_values(self, count):
+        first = len(self.tags)
+        self.keys.extend([_NO_KEY] * count)
+        self.tags.extend([_NONE] * count)
+        self.data.extend([0] * count)
+        return first
+
+    def fill_node(self, index, node):
+        first = self.reserve_values(len(node))
+        i = index * 3
+        self.nodes[i] = self.string(node['type'])
+        self.nodes[i + 1] = first
+        self.nodes[i + 2] = len(node)
+        for j, key in enumerate(node):
+            self.fill_value(first + j, self.string(key), node[key])
+
+    def fill_value(self, index, key, value):
+        self.keys[index] = key
+        if value is None:
+            tag, data = _NONE, 0
+        elif value is True:
+            tag, data = _TRUE, 0
+        elif value is False:
+            tag, data = _FALSE, 0
+        elif isinstance(value, int):
+            tag, data = _INT, value
+        elif isinstance(value, float):
+            tag, data = _FLOAT, _INT64.unpack(_DOUBLE.pack(value))[0]
+        elif isinstance(value, str):
+            tag, data = _STR, self.string(value)
+        elif isinstance(value, Mapping):
+            tag, data = _NODE, self.reserve_nodes([value])
+        elif isinstance(value, (list, tuple)):
+            if value and all(_is_node(v) for v in value):
+                tag = _NODES
+                first = self.reserve_nodes(value)
+            else:
+                tag = _LIST
+                first = self.reserve_values(len(value))
+                self.pending.append((_LIST, first, value))
+            data = first << 32 | len(value)
+        else:
+            raise TypeError('Can not serialize {!r}'.format(value))
+        self.tags[index] = tag
+        self.data[index] = data
+
+    def getvalue(self):
+        header = _HEADER.pack(
+            MAGIC, FORMAT_VERSION, AstRenderer.AST_VERSION,
+            self.root[0], self.root[1], len(self.nodes) // 3,
+            len(self.tags), len(self.string_data), self.size,
+        )
+        out = [header]
+        for column in (self.nodes, self.keys, self.tags, self.data,
+                       self.string_ends):
+            _pad(out)
+            if not _LITTLE:  # pragma: no cover
+                column = array(column.typecode, column)
+                column.byteswap()
+            out.append(column.tobytes())
+        _pad(out)
+        out.extend(self.string_data)
+        return b''.join(out)
+
+
+class FlatAST(Sequence):
+    """The list of root nodes of a flat AST, read from a buffer.
+
+    :param buf: bytes, or a buffer such as ``mmap``.
+    :param closable: object to close by :meth:`close`.
+    """
+    def __init__(self, buf, closable=None):
+        self._closable = closable
+        view = memoryview(buf)
+        if len(view) < _HEADER.size:
+            raise FormatError('Not a flat AST')
+        (magic, version, ast_version, root, root_count, node_count,
+         value_count, string_count, size) = _HEADER.unpack(
+            view[:_HEADER.size])
+        if magic != MAGIC:
+            raise FormatError('Not a flat AST')
+        if version != FORMAT_VERSION:
+            raise FormatError('Format version {} is not {}'.format(
+                version, FORMAT_VERSION))
+        if ast_version != AstRenderer.AST_VERSION:
+            raise FormatError('AST version {} is not {}'.format(
+                ast_version, AstRenderer.AST_VERSION))
+
+        self._views = [view]
+        offset = _HEADER.size
+        columns = []
+        for typecode, count in (('I', node_count * 3), ('I', value_count),
+                                ('B', value_count), ('q', value_count),
+                                ('I', string_count)):
+            offset = _align(offset)
+            end = offset + count * array(typecode).itemsize
+            columns.append(self._column(view, offset, end, typecode))
+            offset = end
+        offset = _align(offset)
+        if offset + size > len(view):
+            raise FormatError('Truncated flat AST')
+
+        self._nodes, self._keys, self._tags, self._data, self._ends = columns
+        self._string_start = offset
+        self._view = view
+        self._strings = {}
+        self._root = root
+        self._root_count = root_count
+
+    def _column(self, view, start, end, typecode):
+        part = view[start:end]
+        if _LITTLE and hasattr(part, 'cast'):
+            part = part.cast(typecode)
+            self._views.append(part)
+            return part
+        column = array(typecode)  # pragma: no cover
+        column.frombytes(part.tobytes())  # pragma: no cover
+        if not _LITTLE:  # pragma: no cover
+            column.byteswap()
+        return column  # pragma: no cover
+
+    def __len__(self):
+        return self._root_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return FlatNode(self, self._root + index)
+
+    def __eq__(self, other):
+        return _sequence_equal(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def to_list(self):
+        """Read all the nodes into dicts."""
+        return [node.to_dict() for node in self]
+
+    def close(self):
+        """Release the buffer, nodes can not be read after closing."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._closable is not None:
+            self._closable.close()
+            self._closable = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _string(self, index):
+        s = self._strings.get(index)
+        if s is None:
+            start = self._ends[index - 1] if index else 0
+            end = self._ends[index]
+            offset = self._string_start
+            data = self._view[offset + start:offset + end]
+            s = self._strings[index] = data.tobytes().decode('utf-8')
+        return s
+
+    def _value(self, index):
+        tag = self._tags[index]
+        if tag == _STR:
+            return self._string(self._data[index])
+        if tag == _NODES:
+            data = self._data[index]
+            return FlatNodeList(self, data >> 32, data & 0xffffffff)
+        if tag == _INT:
+            return self._data[index]
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _LIST:
+            data = self._data[index]
+            first = data >> 32
+            return [
+                self._value(i)
+                for i in range(first, first + (data & 0xffffffff))
+            ]
+        if tag == _NODE:
+            return FlatNode(self, self._data[index])
+        if tag == _FLOAT:
+            return _DOUBLE.unpack(_INT64.pack(self._data[index]))[0]
+        raise FormatError('Unknown tag {}'.format(tag))
+
+
+class FlatNode(Mapping):
+    """A node of a :class:`FlatAST`, its values are read when they are
+    accessed.
+    """
+    __slots__ = ('_ast', '_index')
+
+    def __init__(self, ast, index):
+        self._ast = ast
+        self._index = index
+
+    @property
+    def type(self):
+        return self._ast._string(self._ast._nodes[self._index * 3])
+
+    def _range(self):
+        i = self._index * 3
+        first = self._ast._nodes[i + 1]
+        return range(first, first + self._ast._nodes[i + 2])
+
+    def __getitem__(self, key):
+        ast = self._ast
+        for i in self._range():
+            if ast._string(ast._keys[i]) == key:
+                return ast._value(i)
+        raise KeyError(key)
+
+    def __iter__(self):
+        ast = self._ast
+        for i in self._range():
+            yield ast._string(ast._keys[i])
+
+    def __len__(self):
+        return len(self._range())
+
+    def __repr__(self):
+        return 'FlatNode({!r})'.format(self.to_dict())
+
+    def to_dict(self):
+        """Read the node and its children into dicts."""
+        return dict((k, _to_python(v)) for k, v in self.items())
+
+
+class FlatNodeList(Sequence):
+    """A list of the children nodes of a :class:`FlatNode`."""
+    __slots__ = ('_ast', '_first', '_count')
+
+    def __init__(self, ast, first, count):
+        self._ast = ast
+        self._first = first
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return FlatNode(self._ast, self._first + index)
+
+    def __eq__(self, other):
+        return _sequence_equal(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _is_node(value):
+    return isinstance(value, Mapping) and 'type' in value
+
+
+def _sequence_equal(a, b):
+    if not isinstance(b, (Sequence, list)) or isinstance(b, str):
+        return NotImplemented
+    return len(a) == len(b) and all(x == y for x, y in zip(a, b))
+
+
+def _to_python(value):
+    if isinstance(value, FlatNode):
+        return value.to_dict()
+    if isinstance(value, (list, FlatNodeList)):
+        return [_to_python(v) for v in value]
+    return value
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _pad(out):
+    size = sum(len(b) for b in out)
+    if size % 8:
+        out.append(b'\0' * (8 - size % 8))
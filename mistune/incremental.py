@@ -0,0 +1,283 @@
+"""
+    Incremental Parsing
+    ~~~~~~~~~~~~~~~~~~~
+
+    Re-parse only the top level blocks around an edit of a document, for
+    the preview of live editors::
+
+        result = markdown.parse_incremental(text)
+        html = result.output
+
+        result = markdown.parse_incremental(new_text, result)
+        html = result.output
+"""
+
+import re
+import bisect
+from .block_parser import normalize_text
+
+#: size of the chunks to compare when looking for the edited region
+_CHUNK = 4096
+
+#: an HTML block which is not closed is parsed as text, a closing marker
+#: turns it into an HTML block from its start, before the edited blocks
+_HTML_ENDS = (
+    ('<!--', re.compile(r'-->')),
+    ('<?', re.compile(r'\?>')),
+    ('<![CDATA[', re.compile(r'\]\]>')),
+    ('<!', re.compile(r'>')),
+    ('<script', re.compile(r'</script>', re.I)),
+    ('<pre', re.compile(r'</pre>', re.I)),
+    ('<style', re.compile(r'</style>', re.I)),
+)
+
+
+class Block(object):
+    """A top level block of a document, ``text[start:end]`` is parsed
+    into ``tokens`` and rendered into ``output``. ``footnotes`` are the
+    keys of the footnotes referred in the block, ``definitions`` is true
+    if the block defines links or footnotes, e.g. in a list item.
+    """
+    __slots__ = (
+        'start', 'end', 'tokens', 'output', 'footnotes', 'definitions',
+    )
+
+    def __init__(self, start, end, tokens, output=None, footnotes=None,
+                 definitions=False):
+        self.start = start
+        self.end = end
+        self.tokens = tokens
+        self.output = output
+        self.footnotes = footnotes
+        self.definitions = definitions
+
+    def shift(self, delta):
+        return Block(
+            self.start + delta, self.end + delta,
+            self.tokens, self.output, self.footnotes, self.definitions,
+        )
+
+
+class IncrementalResult(object):
+    """Result of :meth:`Markdown.parse_incremental`, pass it to the next
+    call to re-parse only the edited blocks.
+    """
+    def __init__(self, text, state, output, blocks=None):
+        #: normalized text of the document
+        self.text = text
+        self.state = state
+        #: rendered output of the document
+        self.output = output
+        #: list of :class:`Block`, ``None`` if it can not be re-parsed
+        #: incrementally
+        self.blocks = blocks
+
+
+def parse_incremental(md, s, previous=None, edit_range=None):
+    """Parse the text of a document, re-parsing only the blocks around
+    the edit if the ``previous`` result of the document is given.
+
+    :param md: :class:`~mistune.markdown.Markdown` instance.
+    :param s: new text of the document.
+    :param previous: :class:`IncrementalResult` of the previous text.
+    :param edit_range: ``(start, end)`` of the replaced text in the new
+        text, it is found by comparing the texts if it is not given.
+    """
+    if not previous or not previous.blocks or md.before_parse_hooks:
+        return _parse_full(md, s)
+
+    # a full parse normalizes the given text, normalizing a text again
+    # may change it, e.g. a line of a tab
+    text = s
+    old = previous.text
+    if edit_range is None:
+        s = _normalize(s)
+        p = _common_prefix(old, s)
+        q = _common_suffix(old, s, min(len(old), len(s)) - p)
+    else:
+        s, p, q = _normalize_edit(s, edit_range)
+        q = min(q, len(s) - p, len(old) - p)
+
+    if p == len(old) == len(s):
+        return previous
+
+    blocks = previous.blocks
+    delta = len(s) - len(old)
+    if _closes_html(s, p, len(s) - q):
+        return _parse_full(md, text)
+
+    # the edited text may join the block before it, such as a paragraph
+    # turned into a setext heading or a list item continued after blank
+    # lines, so the re-parse starts from the block before the edit
+    k = bisect.bisect_right([b.start for b in blocks], p) - 1
+    k = max(k - 1, 0)
+    while k > 0 and _is_blank(blocks[k]):
+        k -= 1
+
+    footnotes = []
+    for b in blocks[:k]:
+        footnotes.extend(b.footnotes)
+
+    old_state = previous.state
+    state = {
+        'def_links': dict(old_state['def_links']),
+        'def_footnotes': dict(old_state['def_footnotes']),
+        'footnotes': footnotes,
+        'footnote_index': len(footnotes),
+    }
+
+    changed_end = len(s) - q
+    j = k
+    new_blocks = []
+    parser = _parse_blocks(md, s, state, blocks[k].start)
+    for block in parser:
+        if block.definitions:
+            return _parse_full(md, text)
+        end = block.end
+
+        new_blocks.append(block)
+        while j < len(blocks) and blocks[j].end + delta < end:
+            j += 1
+        if end >= changed_end and j < len(blocks) \
+                and blocks[j].end + delta == end:
+            break
+    else:
+        j = len(blocks) - 1
+    # put the definitions of the document back into the state
+    parser.close()
+
+    # definitions are global to the document
+    for b in blocks[k:j + 1]:
+        if b.definitions:
+            return _parse_full(md, text)
+
+    _render_blocks(md, new_blocks, state)
+
+    # footnotes are numbered in the document
+    old_keys = [key for b in blocks[k:j + 1] for key in b.footnotes]
+    new_keys = [key for b in new_blocks for key in b.footnotes]
+    if old_keys != new_keys:
+        return _parse_full(md, text)
+
+    rest = blocks[j + 1:]
+    if delta:
+        rest = [b.shift(delta) for b in rest]
+    return _finish(md, s, state, blocks[:k] + new_blocks + rest)
+
+
+def _parse_full(md, s):
+    state = {}
+    if md.before_parse_hooks:
+        # hooks such as TOC work on the whole document
+        output = md.parse(s, state)
+        return IncrementalResult(s, state, output)
+
+    s, state = md.before_parse(s, state)
+    blocks = list(_parse_blocks(md, s, state, 0))
+    _render_blocks(md, blocks, state)
+    return _finish(md, s, state, blocks)
+
+
+def _parse_blocks(md, s, state, pos):
+    spans = md.block.parse_blocks(s, state, pos)
+    try:
+        for start, end, tokens, (links, notes) in spans:
+            yield Block(start, end, tokens, definitions=bool(links or notes))
+    finally:
+        spans.close()
+
+
+def _render_blocks(md, blocks, state):
+    footnotes = state['footnotes']
+    for block in blocks:
+        count = len(footnotes)
+        block.tokens = md.before_render(block.tokens, state)
+        block.output = md.block.render(block.tokens, md.inline, state)
+        block.footnotes = footnotes[count:]
+
+
+def _finish(md, s, state, blocks):
+    if md.renderer.IS_TREE:
+        output = []
+        for b in blocks:
+            output.extend(b.output)
+    else:
+        output = ''.join(b.output for b in blocks)
+
+    footnotes = [key for b in blocks for key in b.footnotes]
+    state['footnotes'] = footnotes
+    state['footnote_index'] = len(footnotes)
+    output = md.after_render(output, state)
+    return IncrementalResult(s, state, output, blocks)
+
+
+def _closes_html(s, start, end):
+    # a marker may be completed by the edit, e.g. "--" + ">"
+    changed = s[max(start - 8, 0):end + 8]
+    before = None
+    for opener, pattern in _HTML_ENDS:
+        if pattern.search(changed):
+            if before is None:
+                before = s[:start].lower()
+            if opener in before:
+                return True
+    return False
+
+
+def _is_blank(block):
+    tokens = block.tokens
+    return tokens and all(tok.get('type') == 'newline' for tok in tokens)
+
+
+def _normalize(s):
+    s = normalize_text(s)
+    if not s.endswith('\n'):
+        s += '\n'
+    return s
+
+
+def _normalize_edit(s, edit_range):
+    start, end = edit_range
+    # normalize the text in pieces split at the start of lines, the
+    # unchanged pieces are normalized the same as the previous text
+    start = s.rfind('\n', 0, start) + 1
+    end = s.find('\n', end) + 1 or len(s)
+    prefix = normalize_text(s[:start])
+    suffix = normalize_text(s[end:])
+    s = prefix + normalize_text(s[start:end]) + suffix
+    if not s.endswith('\n'):
+        s += '\n'
+        if suffix:
+            suffix += '\n'
+    return s, len(prefix), len(suffix)
+
+
+def _common_prefix(a, b):
+    size = min(len(a), len(b))
+    lo = 0
+    while lo + _CHUNK <= size and a[lo:lo + _CHUNK] == b[lo:lo + _CHUNK]:
+        lo += _CHUNK
+    hi = min(lo + _CHUNK, size)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, size):
+    i, j = len(a), len(b)
+    n = 0
+    while n + _CHUNK <= size and \
+            a[i - n - _CHUNK:i - n] == b[j - n - _CHUNK:j - n]:
+        n += _CHUNK
+    hi = min(n + _CHUNK, size)
+    while n < hi:
+        mid = (n + hi + 1) // 2
+        if a[i - mid:i - n] == b[j - mid:j - n]:
+            n = mid
+        else:
+            hi = mid - 1
+    return n
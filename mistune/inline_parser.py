@@ -1,4 +1,6 @@
 import re
+import bisect
+import unicodedata
 from .scanner import ScannerParser, escape_url, unikey
 
 PUNCTUATION = r'''\\!"#$%&'()*+,./:;<=>?@\[\]^`{}|_~-'''
@@ -59,6 +61,10 @@ class InlineParser(ScannerParser):
     #:    [an example]: https://example.com "optional title"
     REF_LINK2 = r'!?\[(' + LINK_LABEL + r')\]'
 
+    #: opening bracket of a link or an image, the link is found with a
+    #: stack of brackets, see ``bracket_links``
+    LINK_START = r'!?\['
+
     #: emphasis and strong * or _::
     #:
     #:    *emphasis*  **strong**
@@ -74,6 +80,10 @@ class InlineParser(ScannerParser):
         r'(?!_|[^\s' + PUNCTUATION + r'])\b'
     )
 
+    #: delimiter runs of * and _, they are matched into emphasis and strong
+    #: after the text is scanned, see ``delimiter_emphasis``
+    EMPHASIS_DELIMITER = r'\*+|_+'
+
     #: codespan with `::
     #:
     #:    `code`
@@ -95,21 +105,60 @@ class InlineParser(ScannerParser):
 
     RULE_NAMES = (
         'escape', 'inline_html', 'auto_link',
-        'std_link', 'ref_link', 'ref_link2',
+        'std_link', 'ref_link', 'ref_link2', 'link_start',
         'asterisk_emphasis', 'underscore_emphasis',
-        'codespan', 'linebreak',
+        'emphasis_delimiter', 'codespan', 'linebreak',
     )
 
-    def __init__(self, renderer, hard_wrap=False):
+    #: patterns matching wherever a rule can start, the scanner jumps
+    #: between these positions and treats everything else as text. Rules
+    #: not listed here are triggered by the characters they start with.
+    RULE_TRIGGERS = {
+        'std_link': r'!?\[',
+        'ref_link': r'!?\[',
+        'ref_link2': r'!?\[',
+        'linebreak': r'\\\n| {2,}\n',
+    }
+
+    def __init__(self, renderer, hard_wrap=False, delimiter_emphasis=False,
+                 bracket_links=False):
         super(InlineParser, self).__init__()
         if hard_wrap:
             #: every new line becomes <br>
             self.LINEBREAK = r' *\n(?!\s*$)'
+            self.RULE_TRIGGERS = dict(self.RULE_TRIGGERS, linebreak=r' *\n')
         self.renderer = renderer
-        rules = list(self.RULE_NAMES)
-        rules.remove('ref_link')
-        rules.remove('ref_link2')
-        self.ref_link_rules = rules
+
+        #: match emphasis with a stack of delimiter runs like CommonMark,
+        #: every delimiter is processed once, instead of the regex rules
+        #: which rescan the text of every emphasis
+        if delimiter_emphasis:
+            self.rules.remove('asterisk_emphasis')
+            self.rules.remove('underscore_emphasis')
+        else:
+            self.rules.remove('emphasis_delimiter')
+
+        #: find links with a stack of brackets, every bracket is matched
+        #: once, instead of the regex rules which rescan the text after
+        #: every unmatched bracket
+        if bracket_links:
+            self.rules.remove('std_link')
+            self.rules.remove('ref_link')
+            self.rules.remove('ref_link2')
+        else:
+            self.rules.remove('link_start')
+
+        self.ref_link_rules = [
+            name for name in self.rules
+            if name not in ('ref_link', 'ref_link2')
+        ]
+
+    def get_rule_lists(self):
+        return [self.rules, self.ref_link_rules]
+
+    def freeze(self):
+        self.ref_link_rules = tuple(self.ref_link_rules)
+        super(InlineParser, self).freeze()
 
     def parse_escape(self, m, state):
         text = m.group(0)[1:]
@@ -163,6 +212,26 @@ class InlineParser(ScannerParser):
     def parse_ref_link2(self, m, state):
         return self.parse_ref_link(m, state)
 
+    def parse_link_start(self, m, state, string):
+        start = m.start()
+        links = state.get('_bracket_links')
+        if links is None:
+            links = state['_bracket_links'] = {}
+
+        found = links.get(string)
+        if found is None:
+            found = _match_brackets(string, state.get('def_links'))
+            links[string] = found
+
+        if start not in found:
+            return ('text', m.group(0)), m.end()
+
+        end, text, link, title = found[start]
+        line = string[start:end]
+        if line[0] == '!':
+            return ('image', link, text, title), end
+        return self.tokenize_link(line, link, text, title, state), end
+
     def tokenize_link(self, line, link, text, title, state):
         if state.get('_in_link'):
             return 'text', line
@@ -184,6 +253,67 @@ class InlineParser(ScannerParser):
             return 'emphasis', self.render(text, state)
         return 'strong', self.render(text, state)
 
+    def parse_emphasis_delimiter(self, m, state):
+        run = m.group(0)
+        start, end = m.span()
+        string = m.string
+        before = string[start - 1] if start else ' '
+        after = string[end] if end < len(string) else ' '
+
+        before_space = before.isspace()
+        after_space = after.isspace()
+        before_punct = _is_punctuation(before)
+        after_punct = _is_punctuation(after)
+        left = not after_space and (
+            not after_punct or before_space or before_punct)
+        right = not before_space and (
+            not before_punct or after_space or after_punct)
+
+        if run[0] == '*':
+            can_open = left
+            can_close = right
+        else:
+            can_open = left and (not right or before_punct)
+            can_close = right and (not left or after_punct)
+        return 'emphasis_delimiter', run, can_open, can_close
+
+    def tokenize_delimiters(self, tokens):
+        """Render the tokens, match the delimiter runs into emphasis and
+        strong with the CommonMark rules.
+        """
+        get_method = self.renderer._get_method
+        items = []
+        delimiters = []
+        for t in tokens:
+            if t[0] == 'emphasis_delimiter':
+                d = _Delimiter(len(delimiters), *t[1:])
+                delimiters.append(d)
+                items.append(d)
+            else:
+                items.append(get_method(t[0])(*t[1:]))
+
+        if not delimiters:
+            return items
+
+        _process_emphasis(delimiters)
+
+        text = get_method('text')
+        join = _join_tree if self.renderer.IS_TREE else ''.join
+        stack = [(None, [])]
+        for item in items:
+            if item.__class__ is not _Delimiter:
+                stack[-1][1].append(item)
+                continue
+
+            for _ in item.closes:
+                name, children = stack.pop()
+                stack[-1][1].append(get_method(name)(join(children)))
+            if item.count:
+                stack[-1][1].append(text(item.char * item.count))
+            for size in reversed(item.opens):
+                stack.append(('strong' if size == 2 else 'emphasis', []))
+        return stack[0][1]
+
     def parse_codespan(self, m, state):
         code = re.sub(r'[ \n]+', ' ', m.group(2).strip())
         return 'codespan', code
@@ -202,17 +332,297 @@ class InlineParser(ScannerParser):
         if rules is None:
             rules = self.rules
 
+        budget = state.get('_budget')
+        if budget is None:
+            tokens = self._scan(s, state, rules)
+        elif budget.check():
+            tokens = list(self._scan(s, state, rules))
+            if not budget.check(len(tokens)):
+                tokens = [('text', s)]
+        else:
+            tokens = [('text', s)]
+
+        if 'emphasis_delimiter' in rules:
+            return self.tokenize_delimiters(tokens)
+
         tokens = (
             self.renderer._get_method(t[0])(*t[1:])
-            for t in self._scan(s, state, rules)
+            for t in tokens
         )
         return tokens
 
     def render(self, s, state, rules=None):
+        budget = state.get('_budget')
+        if budget is not None:
+            return self._render_limited(s, state, rules, budget)
+
         tokens = self.parse(s, state, rules)
         if self.renderer.IS_TREE:
             return list(tokens)
         return ''.join(tokens)
 
+    def _render_limited(self, s, state, rules, budget):
+        try:
+            if budget.enter():
+                tokens = self.parse(s, state, rules)
+            else:
+                tokens = [self.renderer._get_method('text')(s)]
+            if self.renderer.IS_TREE:
+                return list(tokens)
+            return budget.join(tokens)
+        finally:
+            budget.leave()
+
     def __call__(self, s, state):
         return self.render(s, state)
+
+
+class _Delimiter(object):
+    __slots__ = (
+        'index', 'char', 'length', 'count', 'can_open', 'can_close',
+        'opens', 'closes', 'prev', 'next',
+    )
+
+    def __init__(self, index, run, can_open, can_close):
+        self.index = index
+        self.char = run[0]
+        #: length of the run, and count of the unmatched characters
+        self.length = len(run)
+        self.count = len(run)
+        self.can_open = can_open
+        self.can_close = can_close
+        #: sizes of the emphasis opened and closed, the innermost first
+        self.opens = []
+        self.closes = []
+        self.prev = None
+        self.next = None
+
+
+def _process_emphasis(delimiters):
+    # the "process emphasis" procedure of CommonMark, delimiters are in a
+    # linked list, and ``bottoms`` keeps the lowest opener worth to check
+    # for every kind of closer, so every delimiter is visited a few times
+    for a, b in zip(delimiters, delimiters[1:]):
+        a.next = b
+        b.prev = a
+
+    bottoms = {}
+    closer = delimiters[0]
+    while closer is not None:
+        if not closer.can_close:
+            closer = closer.next
+            continue
+
+        key = (closer.char, closer.can_open, closer.length % 3)
+        bottom = bottoms.get(key, -1)
+        opener = closer.prev
+        while opener is not None and opener.index > bottom:
+            if opener.char == closer.char and opener.can_open and not (
+                    (opener.can_close or closer.can_open) and
+                    (opener.length + closer.length) % 3 == 0 and
+                    (opener.length % 3 or closer.length % 3)):
+                break
+            opener = opener.prev
+        else:
+            opener = None
+
+        if opener is None:
+            prev = closer.prev
+            bottoms[key] = prev.index if prev else -1
+            nxt = closer.next
+            if not closer.can_open:
+                _unlink(closer)
+            closer = nxt
+            continue
+
+        size = 2 if opener.count > 1 and closer.count > 1 else 1
+        opener.count -= size
+        closer.count -= size
+        opener.opens.append(size)
+        closer.closes.append(size)
+
+        # delimiters between them can not be matched any more
+        opener.next = closer
+        closer.prev = opener
+        if not opener.count:
+            _unlink(opener)
+        if not closer.count:
+            nxt = closer.next
+            _unlink(closer)
+            closer = nxt
+
+
+def _unlink(d):
+    if d.prev is not None:
+        d.prev.next = d.next
+    if d.next is not None:
+        d.next.prev = d.prev
+    d.prev = d.next = None
+
+
+def _join_tree(children):
+    return children
+
+
+#: the things to look at when matching brackets: escapes, runs of
+#: backticks, angle brackets, openers of links and images, and closing
+#: brackets
+_BRACKET_DELIMITER = re.compile(r'\\[' + PUNCTUATION + r']|`+|<|!?\[|\]')
+#: autolinks and inline html bind tighter than brackets
+_ANGLE_SPAN = re.compile(
+    InlineParser.AUTO_LINK + '|' + InlineParser.INLINE_HTML)
+_BACKTICKS = re.compile(r'`+')
+_LINK_SPACE = re.compile(r'[ \t\n]*')
+_LINK_ANGLE_DEST = re.compile(r'<(?:\\[<>]?|[^ \t\n<>\\])*>')
+_LINK_DEST_CHARS = re.compile(r'[^ \x00-\x1f()\\]*')
+_LINK_TITLE = re.compile(
+    r'(?:[ \t\n]+('
+    r'''"(?:\\"?|[^"\\])*"|'(?:\\'?|[^'\\])*'|\((?:\\[()]?|[^()\\])*\)'''
+    r'))?[ \t\n]*\)'
+)
+_LINK_LABEL = re.compile(r'\[(' + LINK_LABEL + r')\]')
+#: the max nesting of parentheses in a link destination
+_MAX_LINK_PARENS = 32
+_MAX_LABEL_LENGTH = 1000
+
+
+def _match_brackets(s, def_links):
+    # the "look for link or image" procedure of CommonMark, return a dict
+    # of {start: (end, text, link, title)}. Every bracket is pushed and
+    # popped once, openers before a link are deactivated with ``bottom``
+    # since links can not contain other links
+    links = {}
+    openers = []
+    bottom = 0
+    code_runs = None
+
+    m = _BRACKET_DELIMITER.search(s)
+    while m is not None:
+        c = m.group(0)
+        pos = m.end()
+        if c == ']':
+            if openers:
+                start, text_start = openers.pop()
+                image = s[start] == '!'
+                active = image or len(openers) >= bottom
+                bottom = min(bottom, len(openers))
+                if active:
+                    text = s[text_start:m.start()]
+                    found = _match_link_tail(s, pos, text, def_links)
+                    if found is not None:
+                        links[start] = (found[0], text) + found[1:]
+                        pos = found[0]
+                        if not image:
+                            bottom = len(openers)
+        elif c == '<':
+            span = _ANGLE_SPAN.match(s, m.start())
+            if span is not None:
+                pos = span.end()
+        elif c[0] == '`':
+            if code_runs is None:
+                code_runs = _code_runs(s)
+            closer = _find_code_closer(code_runs, c, pos)
+            if closer is not None:
+                pos = closer
+        elif c[0] != '\\':
+            openers.append((m.start(), pos))
+        m = _BRACKET_DELIMITER.search(s, pos)
+    return links
+
+
+def _code_runs(s):
+    runs = {}
+    for m in _BACKTICKS.finditer(s):
+        runs.setdefault(len(m.group(0)), []).append(m.start())
+    return runs
+
+
+def _find_code_closer(code_runs, run, pos):
+    starts = code_runs[len(run)]
+    i = bisect.bisect_left(starts, pos)
+    if i < len(starts):
+        return starts[i] + len(run)
+    return None
+
+
+def _match_link_tail(s, pos, text, def_links):
+    # match what follows the closing bracket at ``pos - 1``, return a
+    # tuple of (end, link, title)
+    if s[pos:pos + 1] == '(':
+        found = _match_inline_link(s, pos + 1)
+        if found is not None:
+            return found
+
+    if not def_links:
+        return None
+
+    m = _LINK_LABEL.match(s, pos)
+    if m and m.group(1):
+        key = unikey(m.group(1))
+        pos = m.end()
+    elif len(text) <= _MAX_LABEL_LENGTH:
+        key = unikey(text)
+        if m:
+            pos = m.end()
+    else:
+        return None
+
+    if not key or key not in def_links:
+        return None
+
+    link, title = def_links[key]
+    link = ESCAPE_CHAR.sub(r'\1', link)
+    if title:
+        title = ESCAPE_CHAR.sub(r'\1', title)
+    return pos, link, title
+
+
+def _match_inline_link(s, pos):
+    pos = _LINK_SPACE.match(s, pos).end()
+    m = _LINK_ANGLE_DEST.match(s, pos)
+    if m:
+        found = _match_link_title(s, m.end(), m.group(0)[1:-1])
+        if found is not None:
+            return found
+
+    end = _match_link_dest(s, pos)
+    if end is None:
+        return None
+    return _match_link_title(s, end, s[pos:end])
+
+
+def _match_link_dest(s, pos):
+    depth = 0
+    while 1:
+        pos = _LINK_DEST_CHARS.match(s, pos).end()
+        c = s[pos:pos + 1]
+        if c == '(':
+            depth += 1
+            if depth > _MAX_LINK_PARENS:
+                return None
+            pos += 1
+        elif c == ')':
+            if not depth:
+                return pos
+            depth -= 1
+            pos += 1
+        elif c == '\\':
+            pos += 2 if s[pos + 1:pos + 2] in ('(', ')') else 1
+        elif depth:
+            return None
+        else:
+            return pos
+
+
+def _match_link_title(s, pos, link):
+    m = _LINK_TITLE.match(s, pos)
+    if m is None:
+        return None
+    title = m.group(1)
+    if title:
+        title = ESCAPE_CHAR.sub(r'\1', title[1:-1])
+    return m.end(), ESCAPE_CHAR.sub(r'\1', link), title
+
+
+def _is_punctuation(c):
+    return c in PUNCTUATION or unicodedata.category(c).startswith('P')
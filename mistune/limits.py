@@ -0,0 +1,135 @@
+"""
+    Limits
+    ~~~~~~
+
+    Resource budgets of parsing one document, to render untrusted input
+    without letting a single hostile document take a worker.
+"""
+
+import time
+
+try:
+    timer = time.monotonic
+except AttributeError:  # pragma: no cover
+    timer = time.time
+
+
+class LimitExceeded(Exception):
+    """A document is over one of its :class:`Limits`. ``name`` is the
+    exceeded limit: ``timeout``, ``max_nesting``, ``max_tokens`` or
+    ``max_output``.
+    """
+    def __init__(self, name, limit):
+        super(LimitExceeded, self).__init__(
+            '{} of {} is exceeded'.format(name, limit))
+        self.name = name
+        self.limit = limit
+
+
+class Limits(object):
+    """Limits of parsing and rendering one document::
+
+        limits = Limits(timeout=0.5, max_tokens=100000)
+        html = markdown.parse(text, limits=limits)
+
+    When a limit is hit, the rest of the document is rendered as escaped
+    text, except ``max_output`` which cuts the output at the last token
+    that fits. With ``strict=True`` a :class:`LimitExceeded` is raised
+    instead.
+
+    :param timeout: seconds to parse and render the document.
+    :param max_nesting: max depth of nested blocks and inline tokens,
+        deeper inline text is rendered as escaped text.
+    :param max_tokens: max count of block and inline tokens.
+    :param max_output: max length of the rendered output.
+    :param strict: raise :class:`LimitExceeded` when a limit is hit.
+    """
+    def __init__(self, timeout=None, max_nesting=None, max_tokens=None,
+                 max_output=None, strict=False):
+        self.timeout = timeout
+        self.max_nesting = max_nesting
+        self.max_tokens = max_tokens
+        self.max_output = max_output
+        self.strict = strict
+
+    def start(self):
+        """Create the :class:`Budget` of a new document."""
+        return Budget(self)
+
+
+class Budget(object):
+    """Counters of the :class:`Limits` of a document being parsed, it is
+    kept in ``state['_budget']`` by ``Markdown.parse``.
+    """
+    def __init__(self, limits):
+        self.limits = limits
+        self.deadline = None
+        if limits.timeout is not None:
+            self.deadline = timer() + limits.timeout
+        self.tokens = 0
+        self.output = 0
+        self.depth = 0
+        #: name of the first exceeded limit, everything after it is
+        #: rendered as text
+        self.exceeded = None
+
+    def exceed(self, name):
+        if self.limits.strict:
+            raise LimitExceeded(name, getattr(self.limits, name))
+        if self.exceeded is None:
+            self.exceeded = name
+        return False
+
+    def check(self, tokens=0):
+        """Count the new tokens, return ``False`` if a limit is exceeded."""
+        if self.exceeded is not None:
+            return False
+
+        self.tokens += tokens
+        limits = self.limits
+        if limits.max_tokens is not None and self.tokens > limits.max_tokens:
+            return self.exceed('max_tokens')
+        if self.deadline is not None and timer() > self.deadline:
+            return self.exceed('timeout')
+        return True
+
+    def enter(self):
+        """Go one level deeper, return ``False`` if it is too deep."""
+        self.depth += 1
+        max_nesting = self.limits.max_nesting
+        if max_nesting is not None and self.depth > max_nesting:
+            if self.limits.strict:
+                raise LimitExceeded('max_nesting', max_nesting)
+            return False
+        return True
+
+    def leave(self):
+        self.depth -= 1
+
+    def join(self, chunks):
+        """Join the rendered chunks until the output is too long, the
+        output at the top level is counted.
+        """
+        max_output = self.limits.max_output
+        if max_output is None:
+            return ''.join(chunks)
+
+        if self.exceeded == 'max_output':
+            return ''
+
+        size = self.output
+        result = []
+        for chunk in chunks:
+            cut = self.exceeded == 'max_output'
+            if not cut and size + len(chunk) > max_output:
+                self.exceed('max_output')
+                break
+            size += len(chunk)
+            result.append(chunk)
+            if cut:
+                # the chunk is cut by a nested join, keep its closing tags
+                break
+
+        if not self.depth:
+            self.output = size
+        return ''.join(result)
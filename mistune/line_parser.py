@@ -0,0 +1,729 @@
+"""
+    Line Block Parser
+    ~~~~~~~~~~~~~~~~~
+
+    An alternative engine for block quotes and lists. The document is split
+    into a table of lines once, container blocks are built in a single pass
+    with a stack of open containers, and only the leaf blocks of every
+    container are left to the rules of :class:`BlockParser`::
+
+        md = Markdown(renderer, block=LineBlockParser())
+
+    Container blocks follow CommonMark, e.g. lazy continuation lines, the
+    tokens are the same as the tokens of :class:`BlockParser`.
+"""
+
+import re
+from .block_parser import BlockParser, _BLOCK_TAGS
+
+#: NumPy is imported when a long document is parsed, ``False`` if it is
+#: not installed
+numpy = None
+
+_CONTAINER_RULES = {'block_quote', 'list_start'}
+_LIST_CHARS = set('*+-0123456789')
+
+_THEMATIC_BREAK = re.compile(
+    r'(?:(?:-[ \t]*){3,}|(?:_[ \t]*){3,}|(?:\*[ \t]*){3,})$'
+)
+_LIST_MARKER = re.compile(r'(?:[\*\+-]|(\d{1,9})[.)])(?=[ \t]|$)')
+_AXT_HEADING = re.compile(r'#{1,6}(?:[ \t]|$)')
+_SETEX_LINE = re.compile(r'(?:=+|-+)[ \t]*$')
+_FENCE_START = re.compile(r'(`{3,}(?=[^`]*$)|~{3,})')
+_FENCE_END = re.compile(r'(`{3,}|~{3,})[ \t]*$')
+_SPACES = re.compile(r' *')
+
+#: start and end patterns of html blocks, ``None`` means the html block
+#: ends at a blank line
+_HTML_BLOCKS = (
+    (re.compile(r'<(?:script|pre|style)(?:[\s>]|$)', re.I),
+     re.compile(r'</(?:script|pre|style)>', re.I)),
+    (re.compile(r'<!--'), re.compile(r'-->')),
+    (re.compile(r'<\?'), re.compile(r'\?>')),
+    (re.compile(r'<![A-Z]'), re.compile(r'>')),
+    (re.compile(r'<!\[CDATA\['), re.compile(r'\]\]>')),
+    (re.compile(
+        r'</?(?:' + '|'.join(_BLOCK_TAGS) + r')(?:[ \t]|/?>|$)', re.I),
+     None),
+)
+_HTML_BLOCK_7 = re.compile(
+    r'(?:<[a-z][\w-]*(?:[ \t][^<>]*)?/?>|</[a-z][\w-]*[ \t]*>)[ \t]*$',
+    re.I
+)
+
+
+class LineBlockParser(BlockParser):
+    #: classify the lines with NumPy when it is installed and the document
+    #: is longer than this size
+    NUMPY_THRESHOLD = 1 << 16
+
+    #: leaf blocks never contain list items, thematic breaks need their
+    #: own trigger to interrupt a paragraph
+    RULE_TRIGGERS = dict(
+        BlockParser.RULE_TRIGGERS,
+        thematic_break=(
+            r' {0,3}(?:(?:-[ \t]*){3,}|(?:_[ \t]*){3,}|(?:\*[ \t]*){3,})\n'
+        ),
+    )
+
+    def __init__(self, use_numpy=None, render_cache=None):
+        super(LineBlockParser, self).__init__(render_cache)
+        if use_numpy is None:
+            # NumPy is used if it can be imported
+            use_numpy = True
+        self.use_numpy = use_numpy
+
+    def parse(self, s, state, rules=None):
+        if rules is None:
+            rules = self.rules
+
+        leaf_rules = [n for n in rules if n not in _CONTAINER_RULES]
+        if len(leaf_rules) == len(rules):
+            return list(self._scan(s, state, rules))
+
+        use_numpy = self.use_numpy and len(s) >= self.NUMPY_THRESHOLD
+        table = line_table(s, use_numpy)
+        builder = _TreeBuilder(self, s, table, rules)
+        doc = builder.build()
+        sc = self._create_scanner(leaf_rules)
+        return self._parse_container(doc, state, sc)
+
+    def get_rule_lists(self):
+        lists = super(LineBlockParser, self).get_rule_lists()
+        # the leaf blocks of containers are scanned without container rules
+        return lists + [
+            [n for n in rules if n not in _CONTAINER_RULES]
+            for rules in lists
+        ]
+
+    def parse_spans(self, s, state, pos=0):
+        # containers are not split, the rest of the document is one span
+        yield pos, len(s), self.parse(s[pos:], state)
+
+    def _parse_container(self, node, state, sc):
+        # the leaf blocks are scanned by the scanner of the leaf rules
+        tokens = []
+        for child in node.children:
+            if child.__class__ is list:
+                text = '\n'.join(child) + '\n'
+                for tok in sc.iter(text, state, self.parse_text):
+                    if tok.__class__ is list:
+                        tokens.extend(tok)
+                    elif tok:
+                        tokens.append(tok)
+            elif child.type == 'block_quote':
+                tokens.append({
+                    'type': 'block_quote',
+                    'children': self._parse_container(child, state, sc),
+                })
+            else:
+                tokens.append(self._parse_list(child, state, sc))
+        return tokens
+
+    def _parse_list(self, node, state, sc):
+        list_tights = state.get('list_tights', [])
+        list_tights.append(not node.loose)
+        state['list_tights'] = list_tights
+
+        depth = len(list_tights)
+        children = []
+        for item in node.children:
+            if item.children:
+                item_children = self._parse_container(item, state, sc)
+            else:
+                item_children = [{'type': 'block_text', 'text': ''}]
+            children.append({
+                'type': 'list_item',
+                'params': (depth,),
+                'children': item_children,
+            })
+        list_tights.pop()
+
+        start = node.start
+        if start == 1:
+            start = None
+        params = (node.start is not None, depth, start)
+        return {'type': 'list', 'children': children, 'params': params}
+
+
+def line_table(s, use_numpy=False):
+    """Split the text into lines, return a tuple of ``(lines, indents,
+    firsts)``. ``indents`` are the widths of the leading whitespace with
+    tabs expanded, ``firsts`` is a string of the first non whitespace
+    character of every line, it is ``'\\n'`` for blank lines.
+    """
+    lines = s.split('\n')
+    if use_numpy and load_numpy() is not None:
+        indents, firsts = _classify_numpy(s, lines)
+    else:
+        indents, firsts = _classify(lines)
+    return lines, indents, firsts
+
+
+def load_numpy():
+    """Import NumPy once, return ``None`` if it is not installed."""
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:  # pragma: no cover
+            module = False
+        numpy = module
+    return numpy or None
+
+
+def _classify(lines):
+    indents = []
+    firsts = []
+    for line in lines:
+        text = line.lstrip(' \t')
+        n = len(line) - len(text)
+        if n and '\t' in line[:n]:
+            n = len(line[:n].expandtabs(4))
+        indents.append(n)
+        firsts.append(text[:1] or '\n')
+    return indents, ''.join(firsts)
+
+
+def _classify_numpy(s, lines):
+    try:
+        data = (s + '\n').encode('utf-32-le')
+    except UnicodeEncodeError:
+        # lone surrogates can not be encoded
+        return _classify(lines)
+    codes = numpy.frombuffer(data, numpy.uint32)
+    sizes = numpy.fromiter(map(len, lines), numpy.int64, len(lines)) + 1
+    starts = numpy.cumsum(sizes) - sizes
+
+    # the position of the first non whitespace character of every line, a
+    # blank line stops at its own newline character
+    tabs = codes == 9
+    solid = numpy.flatnonzero(~(tabs | (codes == 32)))
+    firsts = solid[numpy.searchsorted(solid, starts)]
+
+    indents = (firsts - starts).tolist()
+    tab_counts = numpy.concatenate(([0], numpy.cumsum(tabs)))
+    for i in numpy.flatnonzero(tab_counts[firsts] != tab_counts[starts]):
+        line = lines[i]
+        indents[i] = len(line[:indents[i]].expandtabs(4))
+
+    text = codes[firsts].astype('<u4').tobytes().decode('utf-32-le')
+    return indents, text
+
+
+class _Container(object):
+    __slots__ = (
+        'type', 'parent', 'children', 'blank',
+        'indent', 'marker', 'start', 'loose',
+    )
+
+    def __init__(self, type, parent=None):
+        self.type = type
+        self.parent = parent
+        #: leaf lines are kept in lists, the other children are containers
+        self.children = []
+        #: it ends with a blank line
+        self.blank = False
+        #: the content indent of a list item
+        self.indent = 0
+        #: the bullet or delimiter character of a list
+        self.marker = None
+        #: the start number of an ordered list
+        self.start = None
+        self.loose = False
+
+    def add_line(self, text):
+        children = self.children
+        if children and children[-1].__class__ is list:
+            children[-1].append(text)
+        else:
+            children.append([text])
+
+    def add_blank(self):
+        children = self.children
+        if children and children[-1].__class__ is list:
+            children[-1].append('')
+        self.blank = True
+
+    def add_child(self, node):
+        self.children.append(node)
+
+
+class _Cursor(object):
+    """Column based position in a line, a tab can be consumed partially."""
+    __slots__ = ('line', 'pos', 'col', 'partial')
+
+    def __init__(self, line):
+        self.line = line
+        self.pos = 0
+        self.col = 0
+        #: remaining columns of a partially consumed tab at ``pos``
+        self.partial = 0
+
+    def scan(self):
+        """Return the indent width and the position of the first non
+        whitespace character from the current position.
+        """
+        line = self.line
+        i = self.pos
+        col = self.col
+        indent = self.partial
+        if indent:
+            i += 1
+            col += indent
+        length = len(line)
+        while i < length:
+            c = line[i]
+            if c == ' ':
+                indent += 1
+                col += 1
+            elif c == '\t':
+                width = 4 - col % 4
+                indent += width
+                col += width
+            else:
+                break
+            i += 1
+        return indent, i
+
+    def advance(self, columns):
+        line = self.line
+        while columns > 0:
+            if self.partial:
+                n = min(columns, self.partial)
+                self.partial -= n
+                self.col += n
+                columns -= n
+                if not self.partial:
+                    self.pos += 1
+                continue
+
+            if self.pos >= len(line):
+                break
+            if line[self.pos] == '\t':
+                width = 4 - self.col % 4
+                if width <= columns:
+                    self.pos += 1
+                    self.col += width
+                    columns -= width
+                else:
+                    self.partial = width - columns
+                    self.col += columns
+                    columns = 0
+            else:
+                self.pos += 1
+                self.col += 1
+                columns -= 1
+
+    def skip(self, pos):
+        """Move to a position after the leading whitespace."""
+        indent, first = self.scan()
+        self.col += indent + pos - first
+        self.partial = 0
+        self.pos = pos
+
+    def rest(self):
+        if self.partial:
+            return ' ' * self.partial + self.line[self.pos + 1:]
+        if self.pos:
+            return self.line[self.pos:]
+        return self.line
+
+
+class _TreeBuilder(object):
+    def __init__(self, parser, s, table, rules):
+        self.s = s
+        self.lines, self.indents, self.firsts = table
+        self.allow_quote = 'block_quote' in rules
+        self.allow_list = 'list_start' in rules
+        self.max_quote_depth = parser.BLOCK_QUOTE_MAX_DEPTH
+        self.max_list_depth = parser.LIST_MAX_DEPTH
+        self.plugin_rules = [
+            parser.get_rule_pattern(n) for n in rules
+            if n not in parser.RULE_NAMES
+        ]
+
+        self.doc = _Container('document')
+        self.stack = [self.doc]
+        #: markers of the open containers in the last line, see
+        #: ``_match_plain``
+        self.prefix = None
+        self.quote_depth = 0
+        self.list_depth = 0
+
+        #: leaf block of the innermost container: None, ``paragraph``,
+        #: ``fence`` or ``html``
+        self.leaf = None
+        self.fence = None
+        self.html_end = None
+
+    def build(self):
+        lines = self.lines
+        indents = self.indents
+        firsts = self.firsts
+        stack = self.stack
+        doc = self.doc
+
+        # the last item of split is the empty string after the last newline
+        count = len(lines)
+        if count and not lines[-1]:
+            count -= 1
+
+        offset = 0
+        i = 0
+        while i < count:
+            line = lines[i]
+            if len(stack) == 1:
+                first = firsts[i]
+                # plain text lines of the top level paragraph
+                if (self.leaf == 'paragraph' and indents[i] < 4 and
+                        first not in _SPECIAL_CHARS):
+                    doc.add_line(line)
+                    offset += len(line) + 1
+                    i += 1
+                    continue
+
+                if (self.plugin_rules and self.leaf is None and
+                        first != '\n'):
+                    end = self._match_plugin(offset)
+                    if end:
+                        n = self.s.count('\n', offset, end)
+                        doc.add_child(lines[i:i + n])
+                        offset = end
+                        i += n
+                        continue
+
+            self.add_line(line, indents[i])
+            offset += len(line) + 1
+            i += 1
+
+        while len(stack) > 1:
+            self._close()
+        return doc
+
+    def _match_plugin(self, offset):
+        s = self.s
+        for pattern in self.plugin_rules:
+            m = pattern.match(s, offset)
+            if m and m.end() > offset:
+                end = m.end()
+                if s[end - 1] != '\n':
+                    end = s.find('\n', end) + 1 or len(s)
+                return end
+        return 0
+
+    def add_line(self, line, lead=0):
+        stack = self.stack
+        cursor = _Cursor(line)
+
+        # match the open containers
+        if '\t' in line:
+            container, matched = self._match_containers(cursor)
+        else:
+            container, matched = self._match_plain(cursor, lead)
+
+        all_matched = matched == len(stack)
+        if all_matched and self.leaf == 'fence':
+            self._add_fence_line(container, cursor)
+            return
+
+        indent, pos = cursor.scan()
+        blank = pos == len(line)
+        if all_matched and self.leaf == 'html':
+            if not blank or self.html_end is not None:
+                container.add_line(cursor.rest())
+                if self.html_end and self.html_end.search(line, pos):
+                    self.leaf = None
+                return
+
+        # open new containers
+        opened = False
+        while indent < 4 and not blank:
+            c = line[pos]
+            if c == '>':
+                if not self.allow_quote or \
+                        self.quote_depth >= self.max_quote_depth:
+                    break
+                self._close(matched)
+                node = _Container('block_quote', container)
+                self._open(container, node)
+                cursor.skip(pos + 1)
+                _skip_space(cursor)
+            elif c in _LIST_CHARS:
+                if not self.allow_list or \
+                        self.list_depth >= self.max_list_depth:
+                    break
+                interrupt = all_matched and not opened and \
+                    self.leaf == 'paragraph'
+                node = self._list_item(cursor, indent, pos, interrupt)
+                if node is None:
+                    break
+                self._close(matched)
+                container = self._add_item(container, node)
+            else:
+                break
+
+            container = node
+            matched = len(self.stack)
+            opened = True
+            indent, pos = cursor.scan()
+            blank = pos == len(line)
+
+        # lazy continuation line of a paragraph
+        if (not opened and not all_matched and not blank and
+                self.leaf == 'paragraph' and
+                (indent > 3 or not _interrupt_paragraph(line, pos))):
+            stack[-1].add_line(cursor.rest())
+            return
+
+        if not opened:
+            self._close(matched)
+            if container.type == 'list' and not blank:
+                self._close()
+                container = stack[-1]
+
+        if blank:
+            # a line of only container markers is not a blank line
+            if not opened:
+                container.add_blank()
+            self.leaf = None
+            return
+
+        _touch(container)
+        container.add_line(cursor.rest())
+        if indent > 3:
+            if self.leaf != 'paragraph':
+                self.leaf = None
+        else:
+            self._start_leaf(line, pos)
+
+    def _match_containers(self, cursor):
+        line = cursor.line
+        container = self.stack[0]
+        matched = 1
+        for node in self.stack[1:]:
+            indent, pos = cursor.scan()
+            if node.type == 'block_quote':
+                if indent > 3 or line[pos:pos + 1] != '>':
+                    break
+                cursor.skip(pos + 1)
+                _skip_space(cursor)
+            elif node.type == 'list_item':
+                if pos == len(line):
+                    if not node.children:
+                        break
+                elif indent >= node.indent:
+                    cursor.advance(node.indent)
+                else:
+                    break
+            container = node
+            matched += 1
+        return container, matched
+
+    def _match_plain(self, cursor, lead):
+        # the same as _match_containers for a line without tabs, whose
+        # columns are the positions of its characters, ``lead`` is the
+        # count of its leading spaces
+        line = cursor.line
+        length = len(line)
+        stack = self.stack
+        prefix = self.prefix
+        if prefix is not None:
+            # the markers of the last line which matched every container,
+            # a line starting with them followed by a character which is
+            # not a space matches them the same way
+            pos = len(prefix)
+            if pos < length and line[pos] != ' ' and line.startswith(prefix):
+                cursor.pos = cursor.col = pos
+                return stack[-1], len(stack)
+
+        spaces = _SPACES.match
+        container = stack[0]
+        matched = 1
+        pos = 0
+        for i in range(1, len(stack)):
+            node = stack[i]
+            if pos <= lead:
+                first = lead
+            else:
+                first = spaces(line, pos).end()
+            if node.type == 'block_quote':
+                if first - pos > 3 or first == length or line[first] != '>':
+                    break
+                pos = first + 1
+                if pos < length and line[pos] == ' ':
+                    pos += 1
+            elif node.type == 'list_item':
+                if first == length:
+                    if not node.children:
+                        break
+                elif first - pos >= node.indent:
+                    pos += node.indent
+                else:
+                    break
+            container = node
+            matched += 1
+        if matched == len(stack) and pos < length and line[pos] != ' ':
+            self.prefix = line[:pos]
+        cursor.pos = cursor.col = pos
+        return container, matched
+
+    def _add_fence_line(self, container, cursor):
+        indent, pos = cursor.scan()
+        container.add_line(cursor.rest())
+        if indent < 4:
+            m = _FENCE_END.match(cursor.line, pos)
+            if m:
+                marker = m.group(1)
+                char, length = self.fence
+                if marker[0] == char and len(marker) >= length:
+                    self.leaf = None
+
+    def _start_leaf(self, line, pos):
+        c = line[pos]
+        leaf = 'paragraph'
+        if c == '`' or c == '~':
+            m = _FENCE_START.match(line, pos)
+            if m:
+                marker = m.group(1)
+                self.fence = (marker[0], len(marker))
+                leaf = 'fence'
+        elif c == '<':
+            html_end = _match_html_start(line, pos, self.leaf == 'paragraph')
+            if html_end is not False:
+                self.html_end = html_end
+                leaf = 'html'
+                if html_end and html_end.search(line, pos + 2):
+                    leaf = None
+        elif c == '#':
+            if _AXT_HEADING.match(line, pos):
+                leaf = None
+        elif (c == '=' or c == '-') and self.leaf == 'paragraph' and \
+                _SETEX_LINE.match(line, pos):
+            leaf = None
+        if leaf == 'paragraph' and c in '*-_' and \
+                _THEMATIC_BREAK.match(line, pos):
+            leaf = None
+        self.leaf = leaf
+
+    def _list_item(self, cursor, indent, pos, interrupt):
+        line = cursor.line
+        if line[pos] in '*-' and _THEMATIC_BREAK.match(line, pos):
+            return None
+
+        m = _LIST_MARKER.match(line, pos)
+        if not m:
+            return None
+
+        marker = m.group(0)
+        number = m.group(1)
+        end = m.end()
+        empty = not line[end:].strip(' \t')
+        if interrupt and (empty or number and int(number) != 1):
+            return None
+
+        node = _Container('list_item')
+        if number is None:
+            node.marker = marker
+        else:
+            node.marker = marker[-1]
+            node.start = int(number)
+
+        cursor.skip(end)
+        if empty:
+            padding = 1
+        else:
+            spaces, _ = cursor.scan()
+            if spaces > 4:
+                padding = 1
+            else:
+                padding = spaces
+            cursor.advance(padding)
+        node.indent = indent + len(marker) + padding
+        return node
+
+    def _add_item(self, container, item):
+        if container.type == 'list' and container.marker == item.marker:
+            _touch(container)
+        else:
+            if container.type == 'list':
+                self._close()
+                container = self.stack[-1]
+            node = _Container('list', container)
+            node.marker = item.marker
+            node.start = item.start
+            self._open(container, node)
+            container = node
+
+        item.parent = container
+        self._open(container, item)
+        return container
+
+    def _open(self, container, node):
+        _touch(container)
+        container.add_child(node)
+        self.stack.append(node)
+        self.prefix = None
+        if node.type == 'block_quote':
+            self.quote_depth += 1
+        elif node.type == 'list':
+            self.list_depth += 1
+        self.leaf = None
+
+    def _close(self, count=None):
+        stack = self.stack
+        if count is None:
+            count = len(stack) - 1
+        while len(stack) > count:
+            node = stack.pop()
+            self.prefix = None
+            if node.type == 'block_quote':
+                self.quote_depth -= 1
+            elif node.type == 'list':
+                self.list_depth -= 1
+            # only lists look through their last child for a blank line
+            if node.blank and node.type != 'block_quote':
+                node.parent.blank = True
+            self.leaf = None
+
+
+#: first characters of the lines which may start a block
+_SPECIAL_CHARS = set('>*+-0123456789`~<#=_\n')
+
+
+def _skip_space(cursor):
+    line = cursor.line
+    if cursor.pos < len(line) and line[cursor.pos] in ' \t':
+        cursor.advance(1)
+
+
+def _touch(container):
+    # a blank line between two children makes the list loose
+    if container.blank:
+        container.blank = False
+        if container.type == 'list':
+            container.loose = True
+        elif container.type == 'list_item' and container.children:
+            container.parent.loose = True
+
+
+def _match_html_start(line, pos, in_paragraph):
+    for start, end in _HTML_BLOCKS:
+        if start.match(line, pos):
+            return end
+    if not in_paragraph and _HTML_BLOCK_7.match(line, pos):
+        return None
+    return False
+
+
+def _interrupt_paragraph(line, pos):
+    c = line[pos]
+    if c == '`' or c == '~':
+        return bool(_FENCE_START.match(line, pos))
+    if c == '#':
+        return bool(_AXT_HEADING.match(line, pos))
+    if c == '<':
+        return _match_html_start(line, pos, True) is not False
+    if c in '*-_':
+        return bool(_THEMATIC_BREAK.match(line, pos))
+    return False
@@ -1,13 +1,17 @@
-import re
-from .block_parser import BlockParser, expand_leading_tab
+import copy
+import hashlib
+from .block_parser import BlockParser, normalize_text
 from .inline_parser import InlineParser
-
-_newline_pattern = re.compile(r'\r\n|\r')
-_blank_lines = re.compile(r'^ +$', re.M)
+from .renderers import render_ast
+from .incremental import parse_incremental
+from .streaming import parse_stream
+from .excerpt import render_excerpt, ELLIPSIS
+from .cache import fingerprint, _shape
 
 
 class Markdown(object):
-    def __init__(self, renderer, block=None, inline=None, plugins=None):
+    def __init__(self, renderer, block=None, inline=None, plugins=None,
+                 cache=None):
         if block is None:
             block = BlockParser()
 
@@ -20,14 +24,46 @@ class Markdown(object):
         self.before_parse_hooks = []
         self.before_render_hooks = []
         self.after_render_hooks = []
+        #: cache of the rendered documents, e.g. :class:`~mistune.cache.LRUCache`
+        #: or :class:`~mistune.cache.SQLiteCache`
+        self.cache = cache
+        #: a frozen instance can not be changed, see :meth:`freeze`
+        self.frozen = False
+        self._fingerprint = None
 
         if plugins:
             for plugin in plugins:
                 plugin(self)
 
     def use(self, plugin):
+        if self.frozen:
+            raise RuntimeError('Can not use a plugin in a frozen Markdown')
         plugin(self)
 
+    def freeze(self):
+        """Prepare the instance to be shared by threads, and forbid
+        changes of it. The scanners of every list of rules are compiled,
+        including the rules of nested block quotes and lists, and the
+        methods of the renderer are resolved. Plugins, rules and renderer
+        methods can not be added after freezing::
+
+            md = create_markdown(plugins=['table']).freeze()
+
+        The state of a document is kept in the ``state`` dict of each
+        call, so concurrent calls of a frozen instance are safe. Return
+        the instance itself.
+        """
+        self.block.freeze()
+        self.inline.freeze()
+        self.renderer.freeze()
+        self.before_parse_hooks = tuple(self.before_parse_hooks)
+        self.before_render_hooks = tuple(self.before_render_hooks)
+        self.after_render_hooks = tuple(self.after_render_hooks)
+        if self.cache is not None:
+            self.fingerprint()
+        self.frozen = True
+        return self
+
     def before_parse(self, s, state):
         s, state = preprocess(s, state)
         for hook in self.before_parse_hooks:
@@ -44,9 +80,19 @@ class Markdown(object):
             result = hook(self, result, state)
         return result
 
-    def parse(self, s, state=None):
+    def parse(self, s, state=None, limits=None):
+        """Parse and render the text of a document.
+
+        :param s: text of the document.
+        :param state: dict of the parsing state.
+        :param limits: :class:`~mistune.limits.Limits` of the document.
+        """
         if state is None:
+            if self.cache is not None and limits is None:
+                return self._parse_cached(s)
             state = {}
+        if limits is not None:
+            state['_budget'] = limits.start()
 
         s, state = self.before_parse(s, state)
         tokens = self.block.parse(s, state)
@@ -55,7 +101,172 @@ class Markdown(object):
         result = self.after_render(result, state)
         return result
 
-    def read(self, filepath, state=None):
+    def iter_render(self, s, state=None, limits=None):
+        """Parse the text of a document, and iterate the output of its top
+        level blocks while they are rendered, which can be streamed into
+        a response::
+
+            def app(environ, start_response):
+                start_response('200 OK', [('Content-Type', 'text/html')])
+                for html in md.iter_render(text):
+                    yield html.encode('utf-8')
+
+        The ``after_render`` hooks are called with an empty output at the
+        end, and the output they add, e.g. footnotes, is the last item.
+        The parameters are the same as :meth:`parse`.
+        """
+        if state is None:
+            state = {}
+        if limits is not None:
+            state['_budget'] = limits.start()
+
+        s, state = self.before_parse(s, state)
+        tokens = self.block.parse(s, state)
+        tokens = self.before_render(tokens, state)
+        for tok in tokens:
+            output = self.block.render([tok], self.inline, state)
+            if output:
+                yield output
+
+        if self.renderer.IS_TREE:
+            output = self.after_render([], state)
+        else:
+            output = self.after_render('', state)
+        if output:
+            yield output
+
+    def parse_async(self, s, state=None, limits=None, time_slice=None):
+        """Parse and render the text of a document in a coroutine, which
+        yields to the event loop between top level blocks, every
+        ``time_slice`` seconds of work::
+
+            html = await md.parse_async(text)
+
+        Files of the include directive are read without blocking the
+        loop, and cancelling the task stops the work. The other parameters
+        are the same as :meth:`parse`. Needs Python 3.5, see
+        :func:`mistune.aio.parse_async`.
+        """
+        # the module has the syntax of Python 3
+        from .aio import parse_async, TIME_SLICE
+        if time_slice is None:
+            time_slice = TIME_SLICE
+        return parse_async(self, s, state, limits, time_slice)
+
+    def render_ast(self, tokens):
+        """Render the tokens of an AST renderer with the renderer of this
+        instance, and the methods registered by its plugins.
+        """
+        return render_ast(tokens, self.renderer)
+
+    def render_to(self, s, out, state=None, encoding=None):
+        """Parse the text of a document, and write the HTML into ``out``
+        fragment by fragment, without building the output string::
+
+            with open('index.html', 'wb') as f:
+                md.render_to(text, f, encoding='utf-8')
+
+        :param s: text of the document.
+        :param out: object with a ``write`` method, e.g. a file object,
+            ``io.StringIO``, or a list of which ``append`` is used.
+        :param state: dict of the parsing state.
+        :param encoding: encode the fragments into bytes before writing.
+        """
+        if self.renderer.IS_TREE:
+            raise ValueError('render_to() needs a renderer of text')
+
+        write = getattr(out, 'write', None) or out.append
+        if encoding is not None:
+            write = _encoded_writer(write, encoding)
+
+        if state is None:
+            state = {}
+        s, state = self.before_parse(s, state)
+        tokens = self.block.parse(s, state)
+        tokens = self.before_render(tokens, state)
+        self.block.render_into(tokens, self.inline, state, write)
+        output = self.after_render('', state)
+        if output:
+            write(output)
+
+    def render_excerpt(self, s, max_chars=None, max_blocks=None,
+                       state=None, ellipsis=ELLIPSIS):
+        """Render the first blocks of a document, until ``max_chars``
+        characters of text or ``max_blocks`` top level blocks, and stop
+        parsing there::
+
+            preview = md.render_excerpt(text, max_chars=300)
+
+        The last block is cut at the end of a word, the ellipsis is added
+        and its open tags are closed. The ``after_render`` hooks are not
+        called, e.g. there is no section of footnotes, see
+        :func:`mistune.excerpt.render_excerpt`.
+        """
+        return render_excerpt(
+            self, s, max_chars, max_blocks, state, ellipsis)
+
+    def fingerprint(self):
+        """A hash of the configuration of this instance: the renderer
+        and its options, the rules of the parsers, the registered rules
+        and the hooks of plugins. It is computed again when an attribute
+        of the renderer or the parsers, or a hook is changed.
+        """
+        hooks = (
+            self.before_parse_hooks, self.before_render_hooks,
+            self.after_render_hooks,
+        )
+        shape = (
+            _shape(self.renderer), _shape(self.block), _shape(self.inline),
+            tuple(tuple(id(f) for f in h) for h in hooks),
+        )
+        if self._fingerprint is None or self._fingerprint[0] != shape:
+            value = fingerprint(self.renderer, self.block, self.inline, hooks)
+            self._fingerprint = shape, value
+        return self._fingerprint[1]
+
+    def _parse_cached(self, s):
+        text = (s or '').encode('utf-8')
+        key = self.fingerprint() + ':' + hashlib.sha1(text).hexdigest()
+        result = self.cache.get(key)
+        if result is None:
+            result = self.parse(s, {})
+            self.cache.set(key, result)
+        if self.renderer.IS_TREE:
+            # tokens are mutable, the cached ones are not shared
+            result = copy.deepcopy(result)
+        return result
+
+    def parse_incremental(self, s, previous=None, edit_range=None):
+        """Parse the text of a document being edited, only the blocks
+        around the edit are parsed and rendered again::
+
+            result = md.parse_incremental(text)
+            result = md.parse_incremental(new_text, result)
+            html = result.output
+
+        :param s: new text of the document.
+        :param previous: result of the previous call.
+        :param edit_range: ``(start, end)`` of the replaced text in ``s``.
+        :return: :class:`~mistune.incremental.IncrementalResult`
+        """
+        return parse_incremental(self, s, previous, edit_range)
+
+    def parse_stream(self, fileobj, writer, definitions=False):
+        """Read a document from a file object and write the output into
+        the ``writer`` block by block, without keeping the whole document
+        in memory::
+
+            with open('report.md', 'rb') as f, open('report.html', 'w') as w:
+                md.parse_stream(f, w, definitions=True)
+
+        :param fileobj: file object of text or UTF-8 bytes.
+        :param writer: object with a ``write`` method.
+        :param definitions: read the file twice to collect the definitions
+            of links and footnotes first, the file must be seekable.
+        """
+        parse_stream(self, fileobj, writer, definitions)
+
+    def read(self, filepath, state=None, limits=None):
         if state is None:
             state = {}
 
@@ -63,12 +274,18 @@ class Markdown(object):
         with open(filepath, 'rb') as f:
             s = f.read()
 
-        return self.parse(s.decode('utf-8'), state)
+        return self.parse(s.decode('utf-8'), state, limits)
 
     def __call__(self, s):
         return self.parse(s)
 
 
+def _encoded_writer(write, encoding):
+    def write_encoded(s):
+        write(s.encode(encoding))
+    return write_encoded
+
+
 def preprocess(s, state):
     state.update({
         'def_links': {},
@@ -79,10 +296,7 @@ def preprocess(s, state):
     if s is None:
         s = '\n'
     else:
-        s = s.replace('\u2424', '\n')
-        s = _newline_pattern.sub('\n', s)
-        s = _blank_lines.sub('', s)
-        s = expand_leading_tab(s)
+        s = normalize_text(s)
         if not s.endswith('\n'):
             s += '\n'
 
@@ -0,0 +1,173 @@
+"""
+    Nodes
+    ~~~~~
+
+    Compact nodes of the AST. A node is an object with ``__slots__``
+    instead of a dict, there is a class for every type of tokens and
+    every set of its keys. Nodes are mappings, they can be used as the
+    dicts of tokens::
+
+        node = make_node({'type': 'heading', 'children': [], 'level': 1})
+        node['level']  # => 1
+        node.level  # => 1
+        node == {'type': 'heading', 'children': [], 'level': 1}  # => True
+"""
+
+import re
+import threading
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # pragma: no cover
+    from collections import MutableMapping
+
+
+class Node(MutableMapping):
+    """Base class of the nodes. Keys in ``fields`` are kept in slots,
+    other keys, e.g. the keys added by plugins or the keys which are names
+    of the methods of mappings, are kept in a dict.
+    """
+    __slots__ = ('type', '_extra')
+
+    #: names of the keys kept in slots
+    fields = ()
+    _field_set = frozenset()
+
+    def __init__(self, type, **kwargs):
+        self.type = type
+        self._extra = None
+        for key in kwargs:
+            self[key] = kwargs[key]
+
+    def __getitem__(self, key):
+        if key == 'type' or key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key == 'type' or key in self._field_set:
+            setattr(self, key, value)
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key == 'type':
+            raise KeyError('can not delete the type of a node')
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __iter__(self):
+        yield 'type'
+        for key in self.fields:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key == 'type':
+            return True
+        if key in self._field_set:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __reduce__(self):
+        return make_node, (dict(self),)
+
+    def __copy__(self):
+        return make_node(dict(self))
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, dict(self))
+
+    def to_dict(self):
+        """Convert the node and its children into dicts."""
+        return dict((k, to_dicts(v)) for k, v in self.items())
+
+
+#: classes of the nodes, by the token type and the names of the fields
+NODE_CLASSES = {}
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_lock = threading.Lock()
+
+
+def node_class(name, fields=()):
+    """Get the node class of the token type ``name`` with the given
+    ``fields``, it is created the first time.
+    """
+    key = (name, tuple(fields))
+    cls = NODE_CLASSES.get(key)
+    if cls is not None:
+        return cls
+
+    fields = tuple(
+        k for k in fields
+        if _IDENTIFIER.match(k) and not hasattr(Node, k)
+    )
+
+    class_name = ''.join(w.capitalize() for w in name.split('_')) + 'Node'
+    with _lock:
+        cls = NODE_CLASSES.get(key)
+        if cls is None:
+            cls = type(str(class_name), (Node,), {
+                '__slots__': fields,
+                'fields': fields,
+                '_field_set': frozenset(fields),
+            })
+            NODE_CLASSES[key] = cls
+    return cls
+
+
+def make_node(data):
+    """Create a node from the dict of a token, its children are kept as
+    they are.
+    """
+    cls = node_class(data['type'], data)
+    node = cls.__new__(cls)
+    node._extra = None
+    for key in data:
+        node[key] = data[key]
+    return node
+
+
+def compact(tokens):
+    """Convert the dicts of tokens and their children into nodes."""
+    if isinstance(tokens, list):
+        return [compact(tok) for tok in tokens]
+    if isinstance(tokens, dict) and 'type' in tokens:
+        node = make_node(tokens)
+        for key in ('children', 'text'):
+            value = node.get(key)
+            if isinstance(value, list):
+                node[key] = compact(value)
+        return node
+    return tokens
+
+
+def to_dicts(tokens):
+    """Convert nodes and their children into dicts, e.g. before dumping
+    them into JSON.
+    """
+    if isinstance(tokens, list):
+        return [to_dicts(tok) for tok in tokens]
+    if isinstance(tokens, Node):
+        return tokens.to_dict()
+    return tokens
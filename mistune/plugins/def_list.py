@@ -38,6 +38,6 @@ def plugin_def_list(md):
     md.block.register_rule("def_list", DEFINITION_LIST_PATTERN, parse_def_list)
     md.block.rules.append("def_list")
     if md.renderer.NAME == "html":
-        md.renderer.register("def_list", render_html_def_list)
+        md.renderer.register("def_list", render_html_def_list, wrapper=True)
         md.renderer.register("def_list_header", render_html_def_list_header)
         md.renderer.register("def_list_item", render_html_def_list_item)
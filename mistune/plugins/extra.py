@@ -6,6 +6,7 @@ __all__ = ['plugin_url', 'plugin_strikethrough']
 
 #: url link like: ``https://lepture.com/``
 URL_LINK_PATTERN = r'''(https?:\/\/[^\s<]+[^<.,:;"')\]\s])'''
+URL_LINK_TRIGGER = r'https?://'
 
 
 def parse_url_link(self, m, state):
@@ -13,7 +14,8 @@ def parse_url_link(self, m, state):
 
 
 def plugin_url(md):
-    md.inline.register_rule('url_link', URL_LINK_PATTERN, parse_url_link)
+    md.inline.register_rule(
+        'url_link', URL_LINK_PATTERN, parse_url_link, URL_LINK_TRIGGER)
     md.inline.rules.append('url_link')
 
 
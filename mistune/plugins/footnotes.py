@@ -125,11 +125,13 @@ def plugin_footnotes(md):
         INLINE_FOOTNOTE_PATTERN,
         parse_inline_footnote
     )
-    index = md.inline.rules.index('std_link')
-    if index != -1:
-        md.inline.rules.insert(index, 'footnote')
+    rules = md.inline.rules
+    if 'link_start' in rules:
+        rules.insert(rules.index('link_start'), 'footnote')
+    elif 'std_link' in rules:
+        rules.insert(rules.index('std_link'), 'footnote')
     else:
-        md.inline.rules.append('footnote')
+        rules.append('footnote')
 
     md.block.register_rule('def_footnote', DEF_FOOTNOTE, parse_def_footnote)
     index = md.block.rules.index('def_link')
@@ -141,7 +143,8 @@ def plugin_footnotes(md):
     if md.renderer.NAME == 'html':
         md.renderer.register('footnote_ref', render_html_footnote_ref)
         md.renderer.register('footnote_item', render_html_footnote_item)
-        md.renderer.register('footnotes', render_html_footnotes)
+        md.renderer.register(
+            'footnotes', render_html_footnotes, wrapper=True)
     elif md.renderer.NAME == 'ast':
         md.renderer.register('footnote_ref', render_ast_footnote_ref)
         md.renderer.register('footnote_item', render_ast_footnote_item)
@@ -143,10 +143,12 @@ def plugin_table(md):
     md.block.rules.append('nptable')
 
     if md.renderer.NAME == 'html':
-        md.renderer.register('table', render_html_table)
-        md.renderer.register('table_head', render_html_table_head)
-        md.renderer.register('table_body', render_html_table_body)
-        md.renderer.register('table_row', render_html_table_row)
+        md.renderer.register('table', render_html_table, wrapper=True)
+        md.renderer.register(
+            'table_head', render_html_table_head, wrapper=True)
+        md.renderer.register(
+            'table_body', render_html_table_body, wrapper=True)
+        md.renderer.register('table_row', render_html_table_row, wrapper=True)
         md.renderer.register('table_cell', render_html_table_cell)
 
     elif md.renderer.NAME == 'ast':
@@ -1,17 +1,76 @@
 from .scanner import escape, escape_html
+from .nodes import make_node
 
 
 class BaseRenderer(object):
     NAME = 'base'
     IS_TREE = False
 
+    #: names of the methods which only put their children between an
+    #: opening and a closing fragment, these tokens are written without
+    #: joining their children by ``BlockParser.render_into``. A method
+    #: overridden by a subclass is not a wrapper, unless the subclass
+    #: lists it in its own ``WRAPPERS``
+    WRAPPERS = frozenset()
+
+    #: methods can not be registered to a frozen renderer, see
+    #: :meth:`freeze`
+    frozen = False
+    _cached_dispatch = None
+
     def __init__(self):
         self._methods = {}
-
-    def register(self, name, method):
+        self._wrappers = _class_wrappers(type(self))
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('_cached_dispatch', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.frozen:
+            self._resolve_methods()
+
+    def register(self, name, method, wrapper=False):
+        if self.frozen:
+            raise RuntimeError('Can not register a method of a frozen '
+                               'renderer')
         self._methods[name] = method
+        if wrapper:
+            self._wrappers.add(name)
+        else:
+            self._wrappers.discard(name)
+
+    def is_wrapper(self, name):
+        return name in self._wrappers
+
+    def freeze(self):
+        """Resolve the methods of the registered names and the methods of
+        the renderer class, and forbid registering methods, so that the
+        renderer can be shared by threads.
+        """
+        self._wrappers = frozenset(self._wrappers)
+        self._resolve_methods()
+        self.frozen = True
+
+    def _resolve_methods(self):
+        names = set(self._methods)
+        names.update(
+            name for name in dir(type(self))
+            if not name.startswith('_') and not hasattr(BaseRenderer, name)
+        )
+        dispatch = {}
+        for name in names:
+            method = self._get_method(name)
+            if callable(method):
+                dispatch[name] = method
+        self._cached_dispatch = dispatch
 
     def _get_method(self, name):
+        dispatch = self._cached_dispatch
+        if dispatch is not None and name in dispatch:
+            return dispatch[name]
         try:
             return object.__getattribute__(self, name)
         except AttributeError:
@@ -25,6 +84,26 @@ class AstRenderer(BaseRenderer):
     NAME = 'ast'
     IS_TREE = True
 
+    #: version of the tokens, increase it when the types or the keys of
+    #: the tokens are changed, files of :mod:`mistune.flat` with another
+    #: version are not read
+    AST_VERSION = 1
+
+    def __init__(self, compact=False):
+        super(AstRenderer, self).__init__()
+        #: render compact nodes of :mod:`mistune.nodes` instead of dicts
+        self.compact = compact
+        self._cached_methods = {}
+
+    def __getstate__(self):
+        state = super(AstRenderer, self).__getstate__()
+        state['_cached_methods'] = {}
+        return state
+
+    def register(self, name, method, wrapper=False):
+        super(AstRenderer, self).register(name, method, wrapper)
+        self._cached_methods.pop(name, None)
+
     def text(self, text):
         return {'type': 'text', 'text': text}
 
@@ -87,6 +166,18 @@ class AstRenderer(BaseRenderer):
         return __ast
 
     def _get_method(self, name):
+        dispatch = self._cached_dispatch
+        if dispatch is not None and name in dispatch:
+            return dispatch[name]
+        if self.compact:
+            method = self._cached_methods.get(name)
+            if method is None:
+                method = _compact_method(self._get_dict_method(name))
+                self._cached_methods[name] = method
+            return method
+        return self._get_dict_method(name)
+
+    def _get_dict_method(self, name):
         try:
             return super(AstRenderer, self)._get_method(name)
         except AttributeError:
@@ -96,6 +187,7 @@ class AstRenderer(BaseRenderer):
 class HTMLRenderer(BaseRenderer):
     NAME = 'html'
     IS_TREE = False
+    WRAPPERS = frozenset(['block_quote', 'list', 'list_item'])
     HARMFUL_PROTOCOLS = {
         'javascript:',
         'vbscript:',
@@ -209,3 +301,69 @@ class HTMLRenderer(BaseRenderer):
 
     def list_item(self, text, level):
         return '<li>' + text + '</li>\n'
+
+
+#: keys of the children tokens, a text is kept as it is
+_CHILDREN_KEYS = frozenset(['children', 'text'])
+
+
+def render_ast(tokens, renderer):
+    """Render the tokens of :class:`AstRenderer` with another renderer,
+    so a document is parsed once and rendered into many formats::
+
+        tokens = create_markdown(renderer='ast')(text)
+        html = render_ast(tokens, HTMLRenderer())
+
+    The keys of a token are the arguments of the renderer method of its
+    type, in the same order, with ``children`` rendered first. Methods
+    registered by plugins must be registered on the renderer, e.g. with
+    :meth:`Markdown.render_ast <mistune.markdown.Markdown.render_ast>`.
+
+    :param tokens: list of tokens, dicts or nodes.
+    :param renderer: instance of a renderer.
+    """
+    get_method = renderer._get_method
+    join = list if renderer.IS_TREE else ''.join
+
+    def render(tokens):
+        return join([render_token(tok) for tok in tokens])
+
+    def render_token(tok):
+        name = tok['type']
+        args = []
+        for key in tok:
+            value = tok[key]
+            if key == 'type':
+                continue
+            if key in _CHILDREN_KEYS and value is not None \
+                    and not isinstance(value, str):
+                # "text" of the include directive is a list of tokens
+                value = render(value)
+            elif key == 'id' and name == 'heading':
+                # headings with the ids of the TOC directive
+                name = 'theading'
+            args.append(value)
+        return get_method(name)(*args)
+
+    return render(tokens)
+
+
+def _compact_method(method):
+    def __compact(*args):
+        data = method(*args)
+        if isinstance(data, dict):
+            return make_node(data)
+        return data
+    return __compact
+
+
+def _class_wrappers(cls):
+    wrappers = set()
+    for name in cls.WRAPPERS:
+        # the class defining the method must declare it as a wrapper
+        for base in cls.__mro__:
+            if name in vars(base):
+                if name in vars(base).get('WRAPPERS', ()):
+                    wrappers.add(name)
+                break
+    return wrappers
@@ -1,42 +1,189 @@
 import re
+import functools
+from .cache import LRUCache
 try:
     from urllib.parse import quote
     import html
 except ImportError:
     from urllib import quote
     html = None
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+#: compiled scanners shared by every parser, the key is the scanner class
+#: with the patterns and flags of its rules
+compiled_scanners = LRUCache(maxsize=128)
 
 
 class Scanner(re.Scanner):
+    def __init__(self, lexicon, compiled=None):
+        if compiled is None:
+            compiled = self.compile(lexicon)
+        self.lexicon = lexicon
+        self.scanner, self.trigger = compiled
+
+    @classmethod
+    def compile(cls, lexicon, triggers=None):
+        scanner = re.Scanner(lexicon).scanner
+        if triggers is None:
+            return scanner, None
+
+        patterns = []
+        chars = set()
+        for (pattern, _), trigger in zip(lexicon, triggers):
+            if trigger is not None:
+                patterns.append('(?:' + trigger + ')')
+                continue
+
+            start_chars = get_start_chars(pattern)
+            if not start_chars:
+                # this rule can start anywhere
+                return scanner, None
+            chars.update(start_chars)
+
+        if chars:
+            patterns.append(
+                '[' + ''.join(re.escape(c) for c in sorted(chars)) + ']'
+            )
+        return scanner, re.compile('|'.join(patterns))
+
     def iter(self, string, state, parse_text):
-        sc = self.scanner.scanner(string)
+        if self.trigger is None:
+            return self._iter_search(string, state, parse_text)
+        return self._iter_trigger(string, state, parse_text)
+
+    def _iter_trigger(self, string, state, parse_text):
+        search_trigger = self.trigger.search
+        match = self.scanner.match
+        budget = state.get('_budget')
+
+        pos = 0
+        m = search_trigger(string)
+        while m is not None:
+            if budget is not None and not budget.check():
+                # the rest of the string is text
+                break
+
+            start = m.start()
+            matched = match(string, start)
+            if matched is None:
+                m = search_trigger(string, start + 1)
+                continue
+
+            if start > pos:
+                yield parse_text(string[pos:start], state)
+            while matched is not None:
+                name, method = self.lexicon[matched.lastindex - 1][1]
+                if name.endswith('_start'):
+                    token, pos = method(matched, state, string)
+                else:
+                    token, pos = method(matched, state), matched.end()
+                yield token
+                if matched.end() > start or pos > start:
+                    break
+                matched = _match_non_empty(self.scanner, string, start)
+            # an empty match keeps the character at its start in the text
+            m = search_trigger(string, max(pos, start + 1))
+
+        hole = string[pos:]
+        if hole:
+            yield parse_text(hole, state)
+
+    def _iter_search(self, string, state, parse_text):
+        search = self.scanner.search
+        budget = state.get('_budget')
 
         pos = 0
-        for match in iter(sc.search, None):
+        match = search(string)
+        while match is not None:
+            if budget is not None and not budget.check():
+                break
+
             name, method = self.lexicon[match.lastindex - 1][1]
-            hole = string[pos:match.start()]
+            start = match.start()
+            hole = string[pos:start]
             if hole:
                 yield parse_text(hole, state)
 
-            yield method(match, state)
-            pos = match.end()
+            if name.endswith('_start'):
+                token, pos = method(match, state, string)
+            else:
+                token, pos = method(match, state), match.end()
+            yield token
+            if match.end() == start and pos == start:
+                retry = _match_non_empty(self.scanner, string, start)
+                if retry is not None:
+                    match = retry
+                    continue
+            match = search(string, max(pos, start + 1))
 
         hole = string[pos:]
         if hole:
             yield parse_text(hole, state)
 
 
+def _match_non_empty(scanner, string, pos):
+    # after an empty match, the rules are tried again for a non empty match
+    # at the same position, like the next match of the alternation
+    sc = scanner.scanner(string, pos)
+    sc.match()
+    m = sc.match()
+    if m is not None and m.end() > pos:
+        return m
+    return None
+
+
 class ScannerParser(object):
     scanner_cls = Scanner
     RULE_NAMES = tuple()
 
+    RULE_TRIGGERS = {}
+
+    #: the rules of a frozen parser can not be changed, see :meth:`freeze`
+    frozen = False
+
     def __init__(self):
         self.rules = list(self.RULE_NAMES)
         self.rule_methods = {}
+        self.rule_triggers = {}
         self._cached_sc = {}
 
-    def register_rule(self, name, pattern, method):
-        self.rule_methods[name] = (pattern, lambda m, state: method(self, m, state))
+    def __getstate__(self):
+        # compiled scanners are created again after unpickling
+        state = dict(self.__dict__)
+        state['_cached_sc'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.frozen:
+            self._compile_rule_lists()
+
+    def get_rule_lists(self):
+        """Lists of the rules which the parser scans with."""
+        return [self.rules]
+
+    def freeze(self):
+        """Compile the scanners of every list of rules, and forbid changes
+        of the rules, so that the parser can be shared by threads.
+        """
+        self.rules = tuple(self.rules)
+        self._compile_rule_lists()
+        self.frozen = True
+
+    def _compile_rule_lists(self):
+        for rules in self.get_rule_lists():
+            self._create_scanner(rules)
+
+    def register_rule(self, name, pattern, method, trigger=None):
+        if self.frozen:
+            raise RuntimeError('Can not register a rule of a frozen parser')
+        self.rule_methods[name] = (pattern, functools.partial(method, self))
+        self.rule_triggers[name] = trigger
 
     def get_rule_pattern(self, name):
         if name not in self.RULE_NAMES:
@@ -48,6 +195,11 @@ class ScannerParser(object):
             return self.rule_methods[name][1]
         return getattr(self, 'parse_' + name)
 
+    def get_rule_trigger(self, name):
+        if name not in self.RULE_NAMES:
+            return self.rule_triggers.get(name)
+        return self.RULE_TRIGGERS.get(name)
+
     def parse_text(self, text, state):
         raise NotImplementedError
 
@@ -70,26 +222,63 @@ class ScannerParser(object):
             (self.get_rule_pattern(n), (n, self.get_rule_method(n)))
             for n in rules
         ]
-        sc = self.scanner_cls(lexicon)
+        triggers = tuple(self.get_rule_trigger(n) for n in rules)
+        key = (
+            self.scanner_cls,
+            tuple(_pattern_key(p) for p, _ in lexicon),
+            triggers,
+        )
+        compiled = compiled_scanners.get(key)
+        if compiled is None:
+            compiled = self.scanner_cls.compile(lexicon, triggers)
+            compiled_scanners.set(key, compiled)
+
+        sc = self.scanner_cls(lexicon, compiled)
         self._cached_sc[sc_key] = sc
         return sc
 
 
+def _pattern_key(pattern):
+    return getattr(pattern, 'pattern', pattern), getattr(pattern, 'flags', 0)
+
+
 class Matcher(object):
-    PARAGRAPH_END = re.compile(
-        r'(?:\n{2,})|'
-        r'(?:\n {0,3}#{1,6})|'  # axt heading
-        r'(?:\n {0,3}(?:`{3,}|~{3,}))|'  # fenced code
-        r'(?:\n {0,3}>)|'  # blockquote
-        r'(?:\n {0,3}(?:[\*\+-]|1[.)]))|'  # list
-        r'(?:\n {0,3}<)'  # block html
-    )
-
-    def __init__(self, lexicon):
+    def __init__(self, lexicon, compiled=None):
+        if compiled is None:
+            compiled = self.compile(lexicon)
         self.lexicon = lexicon
+        self.paragraph_end, dispatch = compiled
+
+        # map the first character of a line to the rules to try
+        self.dispatch = {}
+        rules_of = {}
+        for c, indexes in dispatch.items():
+            rules = rules_of.get(indexes)
+            if rules is None:
+                rules = [lexicon[i] for i in indexes]
+                rules_of[indexes] = rules
+            self.dispatch[c] = rules
+
+    @classmethod
+    def compile(cls, lexicon, triggers=None):
+        # rules with a trigger can interrupt a paragraph
+        patterns = [r'\n{2,}']
+        if triggers:
+            patterns.extend(r'\n(?:' + t + ')' for t in triggers if t)
+        paragraph_end = re.compile('|'.join(patterns))
+
+        start_chars = [_get_start_chars(p, ' ') for p, _ in lexicon]
+        dispatch = {}
+        for i in range(128):
+            c = chr(i)
+            dispatch[c] = tuple(
+                index for index, chars in enumerate(start_chars)
+                if chars is None or c in chars
+            )
+        return paragraph_end, dispatch
 
     def search_pos(self, string, pos):
-        m = self.PARAGRAPH_END.search(string, pos)
+        m = self.paragraph_end.search(string, pos)
         if not m:
             return None
         if set(m.group(0)) == {'\n'}:
@@ -97,25 +286,41 @@ class Matcher(object):
         return m.start() + 1
 
     def iter(self, string, state, parse_text):
-        pos = 0
+        for _, _, token in self.iter_spans(string, state, parse_text):
+            yield token
+
+    def iter_spans(self, string, state, parse_text, pos=0):
+        """Iterate the tokens with their spans as ``(start, end, token)``,
+        scanning from ``pos`` which must be the start of a line.
+        """
         endpos = len(string)
-        last_end = 0
+        last_end = pos
+        lexicon = self.lexicon
+        dispatch = self.dispatch
+        budget = state.get('_budget')
         while 1:
             if pos >= endpos:
                 break
-            for rule, (name, method) in self.lexicon:
+            if budget is not None and not budget.check():
+                break
+
+            c = string[pos]
+            if c == ' ':
+                c = string[_LEADING_SPACES.match(string, pos).end():][:1]
+
+            for rule, (name, method) in dispatch.get(c, lexicon):
                 match = rule.match(string, pos)
                 if match is not None:
                     start, end = match.span()
                     if start > last_end:
-                        yield parse_text(string[last_end:start], state)
+                        text = string[last_end:start]
+                        yield last_end, start, parse_text(text, state)
 
                     if name.endswith('_start'):
-                        token = method(match, state, string)
-                        yield token[0]
-                        end = token[1]
+                        token, end = method(match, state, string)
                     else:
-                        yield method(match, state)
+                        token = method(match, state)
+                    yield start, end, token
                     last_end = pos = end
                     break
             else:
@@ -125,7 +330,151 @@ class Matcher(object):
                 pos = found
 
         if last_end < endpos:
-            yield parse_text(string[last_end:], state)
+            yield last_end, endpos, parse_text(string[last_end:], state)
+
+
+_LEADING_SPACES = re.compile(r' *')
+
+
+def get_start_chars(pattern, skip=''):
+    """Find the set of characters which the given pattern can start with.
+    Return ``None`` if the pattern can start with any character or if it
+    can match an empty string.
+
+    :param pattern: regex string or compiled pattern.
+    :param skip: characters to look through, e.g. with ``skip=' '`` it
+        returns the first characters after any leading spaces.
+    """
+    chars = _get_start_chars(pattern, skip)
+    if chars is None or _NON_ASCII in chars:
+        return None
+    return chars
+
+
+#: a member of start chars which stands for every non ASCII character
+_NON_ASCII = object()
+_ASCII = [chr(i) for i in range(128)]
+_REPEATS = {
+    sre_constants.MAX_REPEAT,
+    sre_constants.MIN_REPEAT,
+    getattr(sre_constants, 'POSSESSIVE_REPEAT', None),
+}
+_ZERO_WIDTH = {
+    sre_constants.AT,
+    sre_constants.ASSERT,
+    sre_constants.ASSERT_NOT,
+}
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: r'\d',
+    sre_constants.CATEGORY_NOT_DIGIT: r'\D',
+    sre_constants.CATEGORY_SPACE: r'\s',
+    sre_constants.CATEGORY_NOT_SPACE: r'\S',
+    sre_constants.CATEGORY_WORD: r'\w',
+    sre_constants.CATEGORY_NOT_WORD: r'\W',
+}
+
+
+def _get_start_chars(pattern, skip):
+    # like get_start_chars, but non ASCII characters are kept as _NON_ASCII
+    flags = getattr(pattern, 'flags', 0)
+    pattern = getattr(pattern, 'pattern', pattern)
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+        flags |= getattr(parsed, 'state', getattr(parsed, 'pattern', None)).flags
+        chars, nullable = _first_chars(parsed, skip, flags & re.I)
+    except (ValueError, TypeError, AttributeError, re.error):
+        return None
+    if nullable:
+        return None
+    return chars
+
+
+def _first_chars(items, skip, ignore_case):
+    # return a tuple of (chars, nullable), chars is None for any character,
+    # nullable means it can match an empty string or only skip characters
+    chars = set()
+    for op, av in items:
+        if op in _ZERO_WIDTH:
+            continue
+
+        if op is sre_constants.SUBPATTERN:
+            sub_ignore_case = ignore_case
+            if len(av) == 4:
+                sub_ignore_case = (
+                    (ignore_case or av[1] & re.I) and not av[2] & re.I
+                )
+            sub, nullable = _first_chars(av[-1], skip, sub_ignore_case)
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            sub, nullable = _first_chars(av, skip, ignore_case)
+        elif op in _REPEATS:
+            sub, nullable = _first_chars(av[2], skip, ignore_case)
+            nullable = nullable or av[0] == 0
+        elif op is sre_constants.BRANCH:
+            sub, nullable = set(), False
+            for branch in av[1]:
+                branch_chars, branch_nullable = _first_chars(
+                    branch, skip, ignore_case)
+                if branch_chars is None:
+                    return None, False
+                sub.update(branch_chars)
+                nullable = nullable or branch_nullable
+        else:
+            sub = _class_chars([(op, av)], ignore_case)
+            if sub is None:
+                return None, False
+            # a single character is nullable if it can be a skip character
+            nullable = any(c in sub for c in skip)
+            sub.difference_update(skip)
+
+        if sub is None:
+            return None, False
+        chars.update(sub)
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _class_chars(items, ignore_case):
+    chars = set()
+    negate = False
+    for op, av in items:
+        if op is sre_constants.IN:
+            sub = _class_chars(av, ignore_case)
+            if sub is None:
+                return None
+            chars.update(sub)
+        elif op is sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_constants.NOT_LITERAL:
+            negate = True
+            chars.add(chr(av))
+        elif op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.ANY:
+            chars.update(_ASCII)
+            chars.add(_NON_ASCII)
+        elif op is sre_constants.RANGE:
+            chars.update(chr(c) for c in range(av[0], min(av[1], 127) + 1))
+            if av[1] > 127:
+                chars.add(_NON_ASCII)
+        elif op is sre_constants.CATEGORY and av in _CATEGORIES:
+            regex = re.compile(_CATEGORIES[av])
+            chars.update(c for c in _ASCII if regex.match(c))
+            chars.add(_NON_ASCII)
+        else:
+            return None
+
+    if negate:
+        chars = set(c for c in _ASCII if c not in chars)
+        chars.add(_NON_ASCII)
+
+    if ignore_case:
+        for c in list(chars):
+            if c is _NON_ASCII:
+                continue
+            if c.lower() != c.upper():
+                chars.update((c.lower(), c.upper(), _NON_ASCII))
+    return chars
 
 
 def escape(s, quote=True):
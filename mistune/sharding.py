@@ -0,0 +1,275 @@
+"""
+    Sharding
+    ~~~~~~~~
+
+    Render one large document with a pool of processes. The document is
+    split between top level blocks, every shard is parsed twice by the
+    workers: first for the definitions of links and footnotes, then it is
+    rendered with the definitions of the whole document::
+
+        config = MarkdownConfig(plugins=['footnotes', 'table'])
+        html = render_sharded(config, text, workers=8)
+
+    Footnote references and the TOC directive are rendered after the
+    shards are joined, so they are numbered in the whole document.
+"""
+
+import os
+import re
+import binascii
+import multiprocessing
+from .block_parser import normalize_text
+from .directives.toc import _cleanup_headings_text
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # pragma: no cover
+    ProcessPoolExecutor = None
+
+#: min count of characters of a shard
+SHARD_SIZE = 1 << 20
+
+#: lines of fenced code and HTML blocks which may contain blank lines
+_REGION = re.compile(
+    r'^ {0,3}(?:(`{3,}|~{3,})([^\n]*)'
+    r'|<(?:(script|pre|style)[\s>]|(!--)|(\?)|(!\[CDATA\[)|(![A-Z])))',
+    re.M | re.I,
+)
+_HTML_ENDS = (None, None, None, None, '-->', '?>', ']]>', '>')
+
+#: a line after blank lines, which does not continue a list, a block
+#: quote or a definition list
+_SPLIT = re.compile(r'\n\n+(?=[^\s\-*+>:|0-9])')
+
+#: the Markdown instance and the text of a worker process, the calls of
+#: the deferred renderer methods, and the prefix of their markers in the
+#: output
+_worker_markdown = None
+_worker_text = ''
+_worker_calls = []
+_worker_marker = ''
+
+
+def render_sharded(config, text, workers=None, shard_size=None):
+    """Render a large document with a pool of processes, the output is the
+    same as the output of one Markdown instance.
+
+    :param config: :class:`~mistune.config.MarkdownConfig` of an HTML
+        renderer.
+    :param text: text of the document.
+    :param workers: count of processes, the count of CPUs by default.
+    :param shard_size: min count of characters of a shard, by default the
+        text is split into 4 shards for every worker.
+    """
+    md = config.create()
+    if md.renderer.IS_TREE:
+        raise ValueError('render_sharded() needs a renderer of text')
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    s = normalize_text(text or '')
+    if not s.endswith('\n'):
+        s += '\n'
+    if shard_size is None:
+        shard_size = max(SHARD_SIZE, len(s) // (workers * 4))
+
+    shards = split_shards(s, shard_size)
+    if workers <= 1 or len(shards) <= 1:
+        return md(text)
+
+    if ProcessPoolExecutor is None:  # pragma: no cover
+        raise RuntimeError('concurrent.futures is not available')
+
+    bounds = []
+    start = 0
+    for shard in shards:
+        bounds.append((start, start + len(shard)))
+        start += len(shard)
+
+    executor = ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(config, s))
+    with executor:
+        scans = list(executor.map(_scan_shard, bounds))
+        # a shard which does not end with a top level block, e.g. a fence
+        # of a list item or an HTML block, is joined with the next shard
+        i = 0
+        while i < len(bounds) - 1:
+            if scans[i][3]:
+                i += 1
+                continue
+            bounds[i:i + 2] = [(bounds[i][0], bounds[i + 1][1])]
+            scans[i:i + 2] = [executor.submit(_scan_shard, bounds[i]).result()]
+
+        def_links = {}
+        def_footnotes = {}
+        offsets = []
+        count = 0
+        for links, footnotes, headings, _ in scans:
+            # the first definition of a key is used
+            for key in links:
+                def_links.setdefault(key, links[key])
+            for key in footnotes:
+                def_footnotes.setdefault(key, footnotes[key])
+            offsets.append(count)
+            count += headings
+
+        nonce = binascii.hexlify(os.urandom(8)).decode('ascii')
+        tasks = [
+            (start, end, def_links, def_footnotes, offset, nonce)
+            for (start, end), offset in zip(bounds, offsets)
+        ]
+        results = list(executor.map(_render_shard, tasks))
+
+    _, state = md.before_parse('', {})
+    state['def_links'] = def_links
+    state['def_footnotes'] = def_footnotes
+    headings = [h for result in results for h in result[4]]
+    output = _join(md, results, state, headings, nonce)
+    return md.after_render(output, state)
+
+
+def split_shards(s, size):
+    """Split the normalized text into shards of at least ``size``
+    characters, between top level blocks. The split points are guessed
+    from the lines of the text, :func:`render_sharded` verifies them with
+    the block parser.
+    """
+    shards = []
+    start = pos = 0
+    search = size
+    while True:
+        m = _SPLIT.search(s, max(search, pos))
+        if not m:
+            break
+
+        region = _REGION.search(s, pos, m.end())
+        if region:
+            pos = _region_end(s, region)
+            if pos < 0:
+                break
+            continue
+
+        # a definition list continues after a blank line
+        if s.startswith(':', s.rfind('\n', 0, m.start()) + 1):
+            search = m.end()
+            continue
+
+        shards.append(s[start:m.end()])
+        start = pos = m.end()
+        search = start + size
+    shards.append(s[start:])
+    return shards
+
+
+def _region_end(s, m):
+    end = s.find('\n', m.end())
+    if m.group(1):
+        fence = m.group(1)
+        if fence[0] == '`' and '`' in m.group(2):
+            # not a fence
+            return end + 1
+        pattern = r'^ {0,3}' + re.escape(fence) + r'[~`]* *$'
+        close = re.compile(pattern, re.M).search(s, end + 1)
+    elif m.group(3):
+        pattern = r'</' + m.group(3) + '>'
+        close = re.compile(pattern, re.I).search(s, m.end())
+    else:
+        marker = next(k for k in range(4, 8) if m.group(k))
+        i = s.find(_HTML_ENDS[marker], m.end())
+        return -1 if i < 0 else i
+    if close is None:
+        return -1
+    return close.end()
+
+
+def _init_worker(config, text):
+    global _worker_markdown, _worker_text
+    md = config.create()
+    md.renderer.register('footnote_ref', _defer('footnote_ref'))
+    md.renderer.register('toc', _defer('toc'))
+    _worker_markdown = md
+    _worker_text = text
+
+
+def _defer(name):
+    def render(*args):
+        _worker_calls.append((name, args))
+        return _worker_marker + str(len(_worker_calls) - 1) + '\x00'
+    return render
+
+
+def _scan_shard(task):
+    start, end = task
+    md = _worker_markdown
+    _, state = md.before_parse('', {})
+    # the shard is parsed in the text of the document, which is parsed
+    # lazily, the split is right if a top level block ends at the end of
+    # the shard
+    pos = start
+    for _, pos, _ in md.block.parse_spans(_worker_text, state, start):
+        if pos >= end:
+            break
+    headings = len(state.get('toc_headings') or ())
+    return state['def_links'], state['def_footnotes'], headings, pos == end
+
+
+def _render_shard(task):
+    global _worker_marker
+    start, end, def_links, def_footnotes, offset, nonce = task
+    md = _worker_markdown
+    del _worker_calls[:]
+    _worker_marker = '\x00' + nonce
+
+    s, state = md.before_parse(_worker_text[start:end], {})
+    state['def_links'] = def_links
+    state['def_footnotes'] = def_footnotes
+    state['toc_offset'] = offset
+    tokens = md.block.parse(s, state)
+    tokens = md.before_render(tokens, state)
+    # the TOC hook scans the footnote references of headings before the
+    # references are rendered
+    scanned = len(state['footnotes'])
+    output = md.block.render(tokens, md.inline, state)
+
+    footnotes = state['footnotes']
+    headings = state.get('toc_headings')
+    if headings:
+        scan_state = dict(state, footnotes=[])
+        headings = _cleanup_headings_text(md.inline, headings, scan_state)
+    return (
+        output, list(_worker_calls), footnotes[:scanned],
+        footnotes[scanned:], list(headings or ()),
+    )
+
+
+def _join(md, results, state, headings, nonce):
+    renderer = md.renderer
+    default_depth = state.get('toc_depth', 3)
+    footnotes = state['footnotes']
+    marker = re.compile('\x00' + nonce + r'(\d+)\x00')
+
+    for result in results:
+        footnotes.extend(result[2])
+
+    outputs = []
+    for output, calls, scanned, keys, _ in results:
+        # indexes of a shard are counted after its scanned references
+        offset = len(footnotes) - len(scanned)
+        footnotes.extend(keys)
+
+        def render(m):
+            name, args = calls[int(m.group(1))]
+            if name == 'footnote_ref':
+                key, index = args
+                return renderer._get_method(name)(key, offset + index)
+            items, title, depth = args
+            limit = depth or default_depth
+            items = [h for h in headings if h[2] <= limit]
+            return renderer._get_method(name)(items, title, depth)
+
+        if calls:
+            output = marker.sub(render, output)
+        outputs.append(output)
+
+    state['footnote_index'] = len(footnotes)
+    return ''.join(outputs)
@@ -0,0 +1,373 @@
+"""
+    Streaming
+    ~~~~~~~~~
+
+    Render a document which arrives in chunks, such as a streamed answer
+    of a chat, without parsing the whole text again for every chunk.
+"""
+
+import re
+import codecs
+from .block_parser import normalize_text, _WRAPPER_MARK
+from .renderers import HTMLRenderer
+from .scanner import escape
+
+#: characters to read from a file at a time
+CHUNK_SIZE = 65536
+
+#: start of an HTML block which may contain blank lines
+_HTML_START = re.compile(
+    r'^ {0,3}<(?:(script|pre|style)(?=[\s>]|$)'
+    r'|(!--)|(\?)|(!\[CDATA\[)|(![A-Z]))',
+    re.M | re.I,
+)
+_HTML_ENDS = (None, None, '-->', '?>', ']]>', '>')
+#: opening line of a fenced code block
+_FENCE_START = re.compile(r'\n*( {0,3})(`{3,}|~{3,})')
+#: code of this method is escaped character by character, it can be
+#: rendered line by line
+_BLOCK_CODE = HTMLRenderer.__dict__['block_code']
+
+
+class StreamingMarkdown(object):
+    """A session of rendering a document chunk by chunk::
+
+        stream = StreamingMarkdown(markdown)
+        for chunk in chunks:
+            final, provisional = stream.feed(chunk)
+            # show the final output, and the provisional output after it
+        final = stream.close()
+
+    Only the text from the start of the last unfinished top level blocks
+    is parsed again, the blocks before them are final and rendered once.
+    The lines of a fenced code block which is not closed yet are not
+    parsed again, they are rendered once until the closing fence arrives.
+
+    Links and footnotes are rendered with the definitions before them,
+    definitions after a final block do not change its output. Hooks of
+    ``before_render`` are called with the tokens of each block.
+
+    :param md: :class:`~mistune.markdown.Markdown` instance.
+    """
+    def __init__(self, md):
+        self.md = md
+        _, self.state = md.before_parse('', {})
+        #: normalized text of the unfinished blocks
+        self._text = ''
+        #: text of the last incomplete line
+        self._raw = ''
+        #: :class:`_OpenFence` of the unfinished text
+        self._fence = None
+        self.closed = False
+
+    def feed(self, chunk):
+        """Feed a chunk of the text, return ``(final, provisional)``:
+        the output of the blocks finished by this chunk, and the output of
+        the unfinished blocks at the end, which is replaced by the next
+        call. The output of the complete lines of an open fenced code
+        block is final, the provisional output closes the code block.
+        """
+        if self.closed:
+            raise ValueError('feed() after close()')
+
+        final = []
+        fence = self._fence
+        if fence is not None:
+            self._add(chunk)
+            code, i = fence.add(self._text)
+            final.append(code)
+            if i is None:
+                self._text = ''
+                return code, fence.provisional(self._raw)
+            self._text = self._text[i:]
+            self._fence = None
+
+        s, blocks, state = self._parse(chunk if fence is None else '')
+        k = _count_final(s, blocks)
+        final.extend(self._finish(s, blocks[:k]))
+        pending = blocks[k:]
+        if (pending and _is_fence(s, pending[0]) and
+                all(_is_blank(b[2]) for b in pending[1:])):
+            fence, output = _OpenFence.create(
+                self.md.renderer, self._text, pending[0][2][0])
+            if fence is not None:
+                # the lines are not parsed again, until the closing fence
+                final.append(output)
+                self._text = ''
+                self._fence = fence
+                return ''.join(final), fence.provisional(self._raw)
+
+        provisional = [self._render(b[2], state) for b in pending]
+        return self._join(final), self._join(provisional)
+
+    def _add(self, chunk):
+        """Add the complete lines of the chunk to the unfinished text."""
+        raw = self._raw + chunk
+        # a line is complete at a new line, "\r" may be followed by "\n"
+        i = max(
+            raw.rfind('\n'),
+            raw.rfind('\u2424'),
+            raw.rfind('\r', 0, len(raw) - 1),
+        ) + 1
+        if i:
+            self._text += normalize_text(raw[:i])
+            raw = raw[i:]
+        self._raw = raw
+
+    def _parse(self, chunk):
+        self._add(chunk)
+        s = self._text + normalize_text(self._raw)
+        if s and not s.endswith('\n'):
+            s += '\n'
+
+        state = self._pending_state()
+        blocks = list(self.md.block.parse_blocks(s, state))
+        return s, blocks, state
+
+    def _finish(self, s, blocks, render=True):
+        """Iterate the output of the final blocks, and drop their text."""
+        for start, end, tokens, (links, notes) in blocks:
+            # register the definitions in the document state, including
+            # the ones in lists and block quotes
+            for key in links:
+                self.state['def_links'].setdefault(key, links[key])
+            for key in notes:
+                self.state['def_footnotes'].setdefault(key, notes[key])
+            if render:
+                yield self._render(tokens, self.state)
+        if blocks:
+            self._text = self._text[blocks[-1][1]:]
+
+    def close(self):
+        """Finish the document, return the output of the rest blocks,
+        with the output of ``after_render`` hooks, e.g. footnotes.
+        """
+        if self._fence is not None:
+            # the open fenced code block is closed by the end
+            output = self._fence.provisional(self._raw)
+        else:
+            s = self._text + normalize_text(self._raw)
+            if s and not s.endswith('\n'):
+                s += '\n'
+            tokens = self.md.block.parse(s, self.state)
+            output = self._render(tokens, self.state)
+
+        self._text = self._raw = ''
+        self._fence = None
+        self.closed = True
+        return self.md.after_render(output, self.state)
+
+    def _pending_state(self):
+        state = dict(self.state)
+        state['def_links'] = dict(self.state['def_links'])
+        state['def_footnotes'] = dict(self.state['def_footnotes'])
+        state['footnotes'] = list(self.state['footnotes'])
+        return state
+
+    def _render(self, tokens, state):
+        md = self.md
+        tokens = md.before_render(tokens, state)
+        return md.block.render(tokens, md.inline, state)
+
+    def _join(self, outputs):
+        if self.md.renderer.IS_TREE:
+            return [tok for output in outputs for tok in output]
+        return ''.join(outputs)
+
+
+class _OpenFence(object):
+    """Fenced code block at the end of the text, which is not closed yet.
+    Its lines are rendered once, between the opening fragment of the code
+    block and the closing one, which is written with the closing fence.
+    """
+    def __init__(self, spaces, marker, start, end):
+        self.spaces = spaces
+        self.closing = re.compile(
+            r' {0,3}' + re.escape(marker) + r'[~`]* *$')
+        #: opening and closing fragments of the code block
+        self.start = start
+        self.end = end
+        #: the last line is blank, it is not a line of the code if the
+        #: code block is not closed
+        self.blank = False
+        self.empty = True
+
+    @classmethod
+    def create(cls, renderer, text, tok):
+        """Create the fence of the complete lines of a fenced code block
+        at the end of the text, return the fence and the output of the
+        lines. Return ``(None, None)`` if the code block is closed, or if
+        the renderer does not escape the code line by line.
+        """
+        m = _FENCE_START.match(text)
+        # the opening fence may be the incomplete line
+        if m is None or renderer.IS_TREE:
+            return None, None
+        method = renderer._get_method('block_code')
+        if getattr(method, '__func__', None) is not _BLOCK_CODE:
+            return None, None
+
+        html = method(_WRAPPER_MARK, *(tok.get('params') or ()))
+        start, end = html.split(_WRAPPER_MARK)
+        fence = cls(m.group(1), m.group(2), start, end)
+        code, pos = fence.add(text, text.index('\n', m.end()) + 1)
+        if pos is not None:
+            return None, None
+        return fence, start + code
+
+    def add(self, text, pos=0):
+        """Render the complete lines of the text. Return the output and
+        the position after the closing fence, or None if the code block
+        is not closed.
+        """
+        code = []
+        while pos < len(text):
+            i = text.index('\n', pos) + 1
+            line = text[pos:i - 1]
+            pos = i
+            if self.closing.match(line):
+                if self.blank or self.empty:
+                    code.append('\n')
+                code.append(self.end)
+                return ''.join(code), pos
+            if self.blank:
+                code.append('\n')
+            self.blank = not line
+            if line:
+                code.append(self._escape(line))
+            self.empty = self.empty and not code
+        return ''.join(code), None
+
+    def provisional(self, raw):
+        """Output of the incomplete line and the closing fragment."""
+        code = ''
+        text = normalize_text(raw)
+        if text:
+            line = text.rstrip('\n')
+            # a blank line followed by another line is a line of the code
+            if self.blank:
+                code = '\n'
+            if line and not self.closing.match(line):
+                code += self._escape(line)
+        if self.empty and not code:
+            # an empty code block has a blank line
+            code = '\n'
+        return code + self.end
+
+    def _escape(self, line):
+        if line.startswith(self.spaces):
+            line = line[len(self.spaces):]
+        return escape(line) + '\n'
+
+
+def parse_stream(md, fileobj, writer, definitions=False,
+                 chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """Read a document from a file object and write the output block by
+    block, the memory is bounded by the largest block of the document.
+
+    :param md: :class:`~mistune.markdown.Markdown` instance.
+    :param fileobj: file object of text or bytes.
+    :param writer: object with a ``write`` method, e.g. a file object.
+    :param definitions: read the file twice, the first time to collect
+        the definitions of links and footnotes, so references before
+        definitions are resolved. The file must be seekable.
+    :param chunk_size: characters to read at a time.
+    :param encoding: encoding of a file of bytes.
+    """
+    stream = StreamingMarkdown(md)
+    if definitions:
+        pos = fileobj.tell()
+        collector = StreamingMarkdown(md)
+        for chunk in _read_chunks(fileobj, collector, chunk_size, encoding):
+            s, blocks, _ = collector._parse(chunk)
+            final = blocks[:_count_final(s, blocks)]
+            for _ in collector._finish(s, final, False):
+                pass
+        s = collector._text + normalize_text(collector._raw) + '\n'
+        md.block.parse(s, collector.state)
+        fileobj.seek(pos)
+        stream.state['def_links'] = collector.state['def_links']
+        stream.state['def_footnotes'] = collector.state['def_footnotes']
+
+    for chunk in _read_chunks(fileobj, stream, chunk_size, encoding):
+        s, blocks, _ = stream._parse(chunk)
+        for output in stream._finish(s, blocks[:_count_final(s, blocks)]):
+            writer.write(output)
+    writer.write(stream.close())
+
+
+def _read_chunks(fileobj, stream, chunk_size, encoding):
+    decoder = None
+    while True:
+        # read at least the size of the unfinished blocks, so that a long
+        # block is parsed a few times, not once for every chunk
+        size = max(chunk_size, len(stream._text) + len(stream._raw))
+        data = fileobj.read(size)
+        if isinstance(data, bytes):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(data, not data)
+        else:
+            chunk = data
+        if chunk:
+            yield chunk
+        if not data:
+            return
+
+
+def _count_final(s, blocks):
+    # the next chunk may continue the last block, and turn the block
+    # before it into something else, e.g. a setext heading
+    k = len(blocks) - 2
+    while k > 0 and _is_blank(blocks[k][2]):
+        k -= 1
+
+    # the text after a fenced code block can not change the blocks before
+    # it, the code block is final when it is closed, i.e. when it is not
+    # the last block
+    n = len(blocks)
+    while n and _is_blank(blocks[n - 1][2]):
+        n -= 1
+    for i in range(n - 1, max(k, 0) - 1, -1):
+        if _is_fence(s, blocks[i]):
+            k = i if i == n - 1 else i + 1
+            break
+
+    # an HTML block which is not closed yet is parsed as text, it becomes
+    # an HTML block when its closing marker arrives, as an open fence
+    # keeps the text after it in a code block
+    for i in range(max(k, 0)):
+        start, end, tokens = blocks[i][:3]
+        if not _is_code(tokens) and _has_open_html(s, start, end):
+            return i
+    return max(k, 0)
+
+
+def _has_open_html(s, start, end):
+    for m in _HTML_START.finditer(s, start, end):
+        if m.group(1):
+            close = re.compile('</' + m.group(1) + '>', re.I)
+            if not close.search(s, m.end()):
+                return True
+        else:
+            marker = _HTML_ENDS[m.lastindex]
+            if s.find(marker, m.end()) < 0:
+                return True
+    return False
+
+
+def _is_fence(s, block):
+    start, tokens = block[0], block[2]
+    return (
+        len(tokens) == 1 and tokens[0].get('type') == 'block_code' and
+        _FENCE_START.match(s, start) is not None
+    )
+
+
+def _is_code(tokens):
+    return tokens and all(
+        tok.get('type') in ('block_code', 'block_html') for tok in tokens)
+
+
+def _is_blank(tokens):
+    return tokens and all(tok.get('type') == 'newline' for tok in tokens)
@@ -0,0 +1,98 @@
+import os
+from mistune import create_markdown, HTMLRenderer, Markdown, Limits
+from mistune.directives import DirectiveInclude, DirectiveToc
+from tests.fixtures import ROOT
+from unittest import TestCase
+
+try:
+    import asyncio
+except ImportError:  # pragma: no cover
+    asyncio = None
+
+
+class CountingRenderer(HTMLRenderer):
+    def __init__(self):
+        super(CountingRenderer, self).__init__()
+        self.paragraphs = 0
+
+    def paragraph(self, text):
+        self.paragraphs += 1
+        return super(CountingRenderer, self).paragraph(text)
+
+
+class TestParseAsync(TestCase):
+    def setUp(self):
+        if asyncio is None:  # pragma: no cover
+            self.skipTest('asyncio is not available')
+        self.loop = asyncio.new_event_loop()
+        self.text = ''.join(
+            '## Part {0}\n\nText {0} with a note[^n] and [link]\n\n'
+            .format(i) for i in range(50)
+        ) + '[^n]: Note\n\n[link]: /url\n'
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_output(self):
+        md = create_markdown(plugins=['footnotes', DirectiveToc()])
+        text = '.. toc::\n\n' + self.text
+        self.assertEqual(self.run_async(md.parse_async(text)), md(text))
+
+        md = create_markdown(renderer='ast', plugins=['footnotes'])
+        output = self.run_async(md.parse_async(self.text, time_slice=0))
+        self.assertEqual(output, md(self.text))
+
+    def test_yield(self):
+        md = create_markdown(plugins=['footnotes'])
+        ticks = []
+
+        def tick():
+            ticks.append(1)
+            if not task.done():
+                self.loop.call_soon(tick)
+
+        task = self.loop.create_task(md.parse_async(self.text, time_slice=0))
+        self.loop.call_soon(tick)
+        self.run_async(task)
+        # parsed and rendered block by block
+        self.assertGreater(len(ticks), 100)
+
+        ticks = []
+        task = self.loop.create_task(md.parse_async(self.text, time_slice=10))
+        self.loop.call_soon(tick)
+        self.run_async(task)
+        self.assertLess(len(ticks), 5)
+
+    def test_cancel(self):
+        renderer = CountingRenderer()
+        md = Markdown(renderer)
+        task = self.loop.create_task(md.parse_async(self.text, time_slice=0))
+        for _ in range(60):
+            self.loop.call_soon(lambda: None)
+        self.loop.call_later(0, task.cancel)
+        self.assertRaises(asyncio.CancelledError, self.run_async, task)
+        self.assertLess(renderer.paragraphs, 50)
+
+    def test_include(self):
+        md = create_markdown(escape=False, plugins=[DirectiveInclude()])
+        path = os.path.join(ROOT, 'include/text.md')
+        with open(path) as f:
+            text = f.read()
+
+        state = {'__file__': path}
+        html = self.run_async(md.parse_async(text, state))
+        self.assertEqual(html, md.read(path))
+        files = state['_include_files']
+        self.assertIn(os.path.join(ROOT, 'include/hello.md'), files)
+        self.assertIsNone(files[os.path.join(ROOT, 'include/not-exist.md')])
+        self.assertNotIn(path, files)
+
+    def test_limits(self):
+        md = create_markdown()
+        text = '*a* ' * 1000 + '\n\n' + self.text
+        for limits in (Limits(max_tokens=10), Limits(max_output=100)):
+            output = self.run_async(md.parse_async(text, limits=limits))
+            self.assertEqual(output, md.parse(text, limits=limits))
@@ -1,4 +1,10 @@
+import copy
+import json
+import pickle
 import mistune
+from mistune.nodes import Node, make_node, compact, to_dicts
+from mistune.plugins.task_lists import task_lists_hook
+from mistune.directives import Admonition
 from tests import fixtures
 from unittest import TestCase
 
@@ -14,13 +20,101 @@ class TestAstRenderer(TestCase):
                 tokens = mistune.markdown(data['text'], renderer='ast')
                 self.assertEqual(tokens, data['tokens'])
 
+            def compact_method(self):
+                md = mistune.create_markdown(
+                    renderer=mistune.AstRenderer(compact=True))
+                tokens = md(data['text'])
+                self.assertEqual(tokens, data['tokens'])
+                self.assertEqual(
+                    json.dumps(to_dicts(tokens), sort_keys=True),
+                    json.dumps(data['tokens'], sort_keys=True),
+                )
+
             name = 'test_{}'.format(n)
             method.__name__ = name
             method.__doc__ = 'Run fixture {} - {}'.format(case_file, n)
             setattr(cls, name, method)
+            setattr(cls, 'test_compact_{}'.format(n), compact_method)
 
         for n, data in enumerate(cases):
             attach_case(n, data)
 
 
 TestAstRenderer.load_fixtures('ast.json')
+
+
+class TestNodes(TestCase):
+    def test_mapping(self):
+        node = make_node({'type': 'list', 'children': [], 'ordered': True})
+        self.assertIsInstance(node, Node)
+        self.assertEqual(node['ordered'], True)
+        self.assertTrue(node.ordered)
+        self.assertEqual(node.get('start'), None)
+        self.assertNotIn('start', node)
+        self.assertRaises(KeyError, lambda: node['start'])
+
+        node['start'] = 3
+        node['items'] = []
+        self.assertEqual(
+            list(node), ['type', 'children', 'ordered', 'start', 'items'])
+        self.assertEqual(list(node.items())[-1], ('items', []))
+        del node['items']
+        self.assertEqual(node, {
+            'type': 'list', 'children': [], 'ordered': True, 'start': 3,
+        })
+
+    def test_copy(self):
+        md = mistune.create_markdown(
+            renderer=mistune.AstRenderer(compact=True),
+            plugins=['footnotes', 'table'],
+        )
+        tokens = md('a[^1]\n\n|b|\n|-|\n|c|\n\n[^1]: d\n')
+        self.assertEqual(pickle.loads(pickle.dumps(tokens)), tokens)
+        self.assertEqual(copy.deepcopy(tokens), tokens)
+        self.assertEqual(
+            tokens, mistune.markdown(
+                'a[^1]\n\n|b|\n|-|\n|c|\n\n[^1]: d\n',
+                renderer='ast', plugins=['footnotes', 'table'],
+            ))
+
+    def test_hooks(self):
+        md = mistune.create_markdown(plugins=['task_lists'])
+        text = '- [x] a\n- b\n'
+        s, state = md.before_parse(text, {})
+        tokens = compact(md.block.parse(s, state))
+        tokens = task_lists_hook(md, tokens, state)
+        self.assertEqual(tokens[0]['children'][0]['type'], 'task_list_item')
+        self.assertEqual(md.block.render(tokens, md.inline, state), md(text))
+
+
+class TestRenderAst(TestCase):
+    def test_html(self):
+        plugins = list(mistune.PLUGINS) + [Admonition()]
+        ast = mistune.create_markdown(renderer='ast', plugins=plugins)
+        md = mistune.create_markdown(plugins=plugins)
+        for data in fixtures.load_json('ast.json'):
+            tokens = ast(data['text'])
+            self.assertEqual(md.render_ast(tokens), md(data['text']))
+
+        text = (
+            '# a\n\n- [x] b[^1]\n\n|c|d|\n|-|:-|\n|e|f|\n\n'
+            'g\n: h\n\n.. note:: i\n\n   j ~~k~~\n\n[^1]: l\n'
+        )
+        tokens = ast(text)
+        self.assertEqual(md.render_ast(tokens), md(text))
+        self.assertEqual(md.render_ast(compact(tokens)), md(text))
+
+    def test_custom_renderer(self):
+        class TextRenderer(mistune.renderers.BaseRenderer):
+            def text(self, text):
+                return text
+
+            def paragraph(self, text):
+                return text + '\n'
+
+            def emphasis(self, text):
+                return text.upper()
+
+        tokens = mistune.markdown('a *b*\n\nc', renderer='ast')
+        text = mistune.renderers.render_ast(tokens, TextRenderer())
+        self.assertEqual(text, 'a B\nc\n')
@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+import mistune
+from unittest import TestCase
+from mistune import LRUCache, SQLiteCache, Limits
+from mistune.cache import fingerprint
+
+
+class TestLRUCache(TestCase):
+    def test_counters(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 1, 1))
+
+
+class TestSQLiteCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_shared(self):
+        cache = SQLiteCache(self.path, maxsize=2)
+        cache.set('a', '<p>a</p>')
+        cache.set('b', [{'type': 'b'}])
+
+        other = SQLiteCache(self.path)
+        self.assertEqual(other.get('a'), '<p>a</p>')
+        self.assertEqual(other.get('b'), [{'type': 'b'}])
+        self.assertIsNone(other.get('c'))
+        self.assertEqual((other.hits, other.misses), (2, 1))
+
+        cache.set('c', 'c')
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+        self.assertIn('c', other)
+        other.clear()
+        self.assertEqual(len(cache), 0)
+        cache.close()
+        other.close()
+
+    def test_atime(self):
+        cache = SQLiteCache(self.path, maxsize=2)
+        cache.set('a', 'a')
+        cache.set('b', 'b')
+        # the access time of a hit is written when an item is set
+        self.assertEqual(cache.get('a'), 'a')
+        cache.set('c', 'c')
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        cache.close()
+
+    def test_markdown(self):
+        md = mistune.create_markdown(cache=SQLiteCache(self.path))
+        self.assertEqual(md('*a*'), '<p><em>a</em></p>\n')
+        self.assertEqual(md('*a*'), '<p><em>a</em></p>\n')
+        self.assertEqual((md.cache.hits, md.cache.misses), (1, 1))
+        md.cache.close()
+
+
+class TestMarkdownCache(TestCase):
+    def test_parse(self):
+        cache = LRUCache()
+        md = mistune.create_markdown(cache=cache)
+        self.assertEqual(md('*a*'), '<p><em>a</em></p>\n')
+        self.assertEqual(md('*a*'), '<p><em>a</em></p>\n')
+        self.assertEqual(md(None), '')
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        # a given state or limits are not cached
+        md.parse('*a*', {})
+        md.parse('*a*', limits=Limits())
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_fingerprint(self):
+        cache = LRUCache()
+        md1 = mistune.create_markdown(cache=cache)
+        md2 = mistune.create_markdown(escape=False, cache=cache)
+        md3 = mistune.create_markdown(plugins=['strikethrough'], cache=cache)
+        self.assertEqual(md1.fingerprint(), mistune.create_markdown().fingerprint())
+        self.assertNotEqual(md1.fingerprint(), md2.fingerprint())
+        self.assertNotEqual(md1.fingerprint(), md3.fingerprint())
+
+        text = '~~<a>~~'
+        self.assertEqual(md1(text), '<p>~~&lt;a&gt;~~</p>\n')
+        self.assertEqual(md2(text), '<p>~~<a>~~</p>\n')
+        self.assertEqual(md3(text), '<p><del>&lt;a&gt;</del></p>\n')
+
+        # registered rules and hooks change the fingerprint
+        def parse_b(inline, m, state):
+            return 'text', 'b'
+
+        fingerprint = md1.fingerprint()
+        md1.inline.register_rule('b', r'~~', parse_b)
+        md1.inline.rules.append('b')
+        self.assertNotEqual(md1.fingerprint(), fingerprint)
+        self.assertEqual(md1(text), '<p>b&lt;a&gt;b</p>\n')
+
+        fingerprint = md1.fingerprint()
+        md1.after_render_hooks.append(lambda md, result, state: result)
+        self.assertNotEqual(md1.fingerprint(), fingerprint)
+
+    def test_fingerprint_code(self):
+        cache = LRUCache()
+        md1 = mistune.create_markdown(cache=cache)
+        md2 = mistune.create_markdown(cache=cache)
+        md1.after_render_hooks.append(lambda md, r, s: r.upper())
+        md2.after_render_hooks.append(lambda md, r, s: r.lower())
+        self.assertNotEqual(md1.fingerprint(), md2.fingerprint())
+        self.assertEqual(md1('Hi'), '<P>HI</P>\n')
+        self.assertEqual(md2('Hi'), '<p>hi</p>\n')
+
+    def test_fingerprint_caches(self):
+        md = mistune.create_markdown()
+        md.block.render_cache = LRUCache()
+        value = fingerprint(md.block)
+        # the items of a cache are not a part of the fingerprint
+        md('*a*\n\nb')
+        self.assertEqual(len(md.block.render_cache), 2)
+        self.assertEqual(fingerprint(md.block), value)
+
+    def test_ast(self):
+        md = mistune.create_markdown(renderer='ast', cache=LRUCache())
+        tokens = md('a')
+        tokens[0]['type'] = 'b'
+        self.assertEqual(md('a')[0]['type'], 'paragraph')
@@ -149,3 +149,53 @@ class TestCommonMark(BaseTestCase):
 
 
 TestCommonMark.load_fixtures('commonmark.txt')
+
+
+class TestDelimiterEmphasis(BaseTestCase):
+    renderer = mistune.HTMLRenderer(escape=False)
+    md = mistune.Markdown(
+        renderer,
+        inline=mistune.InlineParser(renderer, delimiter_emphasis=True),
+    )
+
+    @classmethod
+    def ignore_case(cls, n):
+        if n == 'emphasis_and_strong_emphasis_017':
+            # the second line is a list item
+            return True
+        return not n.startswith('emphasis')
+
+    def assert_case(self, n, text, html):
+        result = re.sub(r'\s*\n+\s*', '\n', self.md(text))
+        expect = re.sub(r'\s*\n+\s*', '\n', html)
+        self.assertEqual(result, expect)
+
+
+TestDelimiterEmphasis.load_fixtures('commonmark.txt')
+
+
+class TestBracketLinks(BaseTestCase):
+    renderer = mistune.HTMLRenderer(escape=False)
+    md = mistune.Markdown(
+        renderer,
+        inline=mistune.InlineParser(
+            renderer, delimiter_emphasis=True, bracket_links=True),
+    )
+
+    @classmethod
+    def ignore_case(cls, n):
+        if n == 'links_033':
+            # the alt of an image is kept as it is
+            return True
+        if n in ('links_064', 'links_065'):
+            # the empty label is a definition in blocks
+            return True
+        return not n.startswith('links')
+
+    def assert_case(self, n, text, html):
+        result = re.sub(r'\s*\n+\s*', '\n', self.md(text))
+        expect = re.sub(r'\s*\n+\s*', '\n', html)
+        self.assertEqual(result, expect)
+
+
+TestBracketLinks.load_fixtures('commonmark.txt')
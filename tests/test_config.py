@@ -0,0 +1,47 @@
+import pickle
+import mistune
+from mistune import MarkdownConfig, render_many
+from mistune.directives import Admonition
+from unittest import TestCase
+
+
+class TestMarkdownConfig(TestCase):
+    def setUp(self):
+        self.config = MarkdownConfig(
+            escape=False,
+            plugins=['table', 'footnotes', Admonition()],
+            inline_options={'hard_wrap': True},
+        )
+        self.texts = [
+            '# {}\n\n|a|\n|-|\n|{}|\n\nb[^1]\nc\n\n[^1]: d\n'.format(i, i)
+            for i in range(20)
+        ]
+
+    def test_create(self):
+        config = MarkdownConfig(plugins=['table'])
+        self.assertEqual(pickle.loads(pickle.dumps(config)), config)
+        self.assertNotEqual(config, MarkdownConfig())
+
+        config = pickle.loads(pickle.dumps(self.config))
+        md = config.create()
+        self.assertIn('<br />', md('a\nb'))
+        self.assertIn('<table>', md(self.texts[0]))
+
+        config = MarkdownConfig(renderer='ast', plugins=['strikethrough'])
+        self.assertEqual(config.create()('~~a~~'), mistune.markdown(
+            '~~a~~', renderer='ast', plugins=['strikethrough']))
+
+    def test_pickle_markdown(self):
+        md = self.config.create()
+        expected = md(self.texts[0])
+        self.assertEqual(pickle.loads(pickle.dumps(md))(self.texts[0]),
+                         expected)
+
+    def test_render_many(self):
+        md = self.config.create()
+        expected = [md(s) for s in self.texts]
+        self.assertEqual(
+            list(render_many(self.config, self.texts, workers=1)), expected)
+        outputs = render_many(
+            self.config, iter(self.texts), workers=2, chunksize=3)
+        self.assertEqual(list(outputs), expected)
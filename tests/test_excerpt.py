@@ -0,0 +1,79 @@
+from mistune import create_markdown
+from mistune.excerpt import truncate_html, text_length
+from unittest import TestCase
+
+
+class TestExcerpt(TestCase):
+    def setUp(self):
+        self.md = create_markdown(plugins=['footnotes', 'table'])
+        self.text = (
+            '# Title\n\nSome **strong text** with a [link] & words.\n\n'
+            '- one\n- two\n\n> quote[^1]\n\n[link]: /url\n\n[^1]: note\n'
+        )
+
+    def test_text_length(self):
+        self.assertEqual(text_length('<p>a &amp; <b>b</b></p>\n'), 5)
+
+    def test_truncate_html(self):
+        html = '<p>Some <strong>strong text</strong> here</p>\n'
+        self.assertEqual(truncate_html(html, 100), html)
+        self.assertEqual(truncate_html(html, 13),
+                         '<p>Some <strong>strong…</strong></p>\n')
+        self.assertEqual(truncate_html(html, 14, '...'),
+                         '<p>Some <strong>strong...</strong></p>\n')
+        self.assertEqual(truncate_html('<p>a<br />b &amp; c</p>', 3),
+                         '<p>a<br />b…</p>')
+
+    def test_max_chars(self):
+        html = self.md.render_excerpt(self.text, max_chars=18)
+        self.assertEqual(
+            html,
+            '<h1>Title</h1>\n<p>Some <strong>strong…</strong></p>\n'
+        )
+        html = self.md.render_excerpt(self.text, max_chars=15)
+        self.assertEqual(
+            html, '<h1>Title</h1>\n<p>Some <strong>…</strong></p>\n')
+        self.assertEqual(self.md.render_excerpt(self.text, max_chars=0), '')
+
+    def test_max_blocks(self):
+        html = self.md.render_excerpt(self.text, max_blocks=2)
+        self.assertEqual(html, (
+            '<h1>Title</h1>\n<p>Some <strong>strong text</strong> with a '
+            '<a href="/url">link</a> &amp; words.</p>\n'
+        ))
+        html = self.md.render_excerpt(self.text, max_blocks=3)
+        self.assertTrue(html.endswith('<li>two</li>\n</ul>\n'))
+
+    def test_whole_document(self):
+        html = self.md(self.text)
+        excerpt = self.md.render_excerpt(self.text, max_chars=1000)
+        self.assertTrue(html.startswith(excerpt))
+        self.assertIn('fnref-1', excerpt)
+        self.assertNotIn('class="footnotes"', excerpt)
+
+    def test_long_list(self):
+        text = ''.join('- item {}\n'.format(i) for i in range(1000))
+        html = self.md.render_excerpt(text, max_chars=20)
+        self.assertEqual(html, (
+            '<ul>\n<li>item 0</li>\n<li>item 1</li>\n<li>item 2…</li>\n'
+            '</ul>\n'
+        ))
+        # a cut item is closed with the new lines of the renderer, as a
+        # pruned list
+        html = self.md.render_excerpt(text, max_chars=22)
+        self.assertTrue(
+            html.endswith('<li>item 2</li>\n<li>item…</li>\n</ul>\n'))
+
+    def test_long_links(self):
+        # the text of links is shorter than their source
+        text = ''.join(
+            '- [a{}](http://example.com/a/very/long/path/name)\n'.format(i)
+            for i in range(5)
+        ) + '\nNext paragraph here.\n'
+        html = self.md.render_excerpt(text, max_chars=20)
+        self.assertIn('>a4</a></li>\n</ul>\n', html)
+        self.assertTrue(html.endswith('<p>Next…</p>\n'))
+
+    def test_ast_renderer(self):
+        md = create_markdown(renderer='ast')
+        self.assertRaises(ValueError, md.render_excerpt, 'a', max_chars=1)
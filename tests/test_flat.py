@@ -0,0 +1,62 @@
+import os
+import json
+import tempfile
+import mistune
+from mistune import flat
+from tests import fixtures
+from unittest import TestCase
+
+
+class TestFlatAST(TestCase):
+    def setUp(self):
+        self.md = mistune.create_markdown(
+            renderer='ast', plugins=['footnotes', 'table', 'task_lists'])
+
+    def test_round_trip(self):
+        for data in fixtures.load_json('ast.json'):
+            tokens = mistune.markdown(data['text'], renderer='ast')
+            ast = flat.loads(flat.dumps(tokens))
+            self.assertEqual(ast, tokens)
+            self.assertEqual(ast.to_list(), json.loads(json.dumps(tokens)))
+
+        text = '- [x] a[^1]\n\n|b|c|\n|-|-:|\n|d|e|\n\n[^1]: f\n'
+        tokens = self.md(text)
+        self.assertEqual(flat.loads(flat.dumps(tokens)), tokens)
+
+    def test_values(self):
+        tokens = [{
+            'type': 'toc', 'items': [('a', 'b', 1)], 'depth': 1.5,
+            'title': None, 'ok': True, 'node': {'type': 'text'},
+            'children': [],
+        }]
+        node = flat.loads(flat.dumps(tokens))[0]
+        self.assertEqual(node.type, 'toc')
+        self.assertEqual(node['items'], [['a', 'b', 1]])
+        self.assertEqual(node['depth'], 1.5)
+        self.assertIsNone(node['title'])
+        self.assertIs(node['ok'], True)
+        self.assertEqual(node['node'], {'type': 'text'})
+        self.assertEqual(node['children'], [])
+        self.assertRaises(KeyError, lambda: node['missing'])
+
+    def test_load(self):
+        tokens = self.md('# a\n\n> b *c*\n')
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                flat.dump(tokens, f)
+            with flat.load(path) as ast:
+                self.assertEqual(len(ast), 2)
+                quote = ast[-1]
+                self.assertEqual(quote['type'], 'block_quote')
+                emphasis = quote['children'][0]['children'][1]
+                self.assertEqual(emphasis['children'][0]['text'], 'c')
+                self.assertEqual(ast, tokens)
+        finally:
+            os.remove(path)
+
+    def test_version(self):
+        data = flat.dumps(self.md('a'))
+        self.assertRaises(flat.FormatError, flat.loads, b'{}' + data)
+        data = data[:6] + b'\xff\xff' + data[8:]
+        self.assertRaises(flat.FormatError, flat.loads, data)
@@ -0,0 +1,95 @@
+import pickle
+import threading
+from mistune import create_markdown, Markdown, HTMLRenderer
+from mistune import LineBlockParser, AstRenderer, PLUGINS
+from mistune.directives import Admonition, DirectiveToc
+from unittest import TestCase
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = None
+
+
+def _create_markdown(**kwargs):
+    plugins = list(PLUGINS) + [Admonition(), DirectiveToc()]
+    return create_markdown(escape=False, plugins=plugins, **kwargs)
+
+
+def _documents(count):
+    docs = []
+    for i in range(count):
+        docs.append(
+            '.. toc::\n\n# Title {0}\n\n> quote *{0}*\n> > - a\n> >   - b\n\n'
+            '.. note:: Note {0}\n\n   text [^{0}] and [link]\n\n'
+            '| a | b |\n|---|---|\n| {0} | ~~c~~ |\n\n'
+            '- [x] task https://example.com/{0}\n\n'
+            '[link]: /{0}\n\n[^{0}]: footnote {0}\n'.format(i)
+        )
+    return docs
+
+
+class TestFreeze(TestCase):
+    def test_output(self):
+        docs = _documents(5)
+        expected = [_create_markdown()(s) for s in docs]
+        md = _create_markdown().freeze()
+        self.assertTrue(md.frozen)
+        self.assertEqual([md(s) for s in docs], expected)
+
+        block = LineBlockParser()
+        md = Markdown(HTMLRenderer(escape=False), block=block)
+        expected = md(docs[0])
+        self.assertEqual(md.freeze()(docs[0]), expected)
+
+        md = create_markdown(renderer=AstRenderer(compact=True))
+        expected = md(docs[0])
+        self.assertEqual(md.freeze()(docs[0]), expected)
+
+    def test_scanners(self):
+        md = _create_markdown().freeze()
+        keys = set(md.block._cached_sc)
+        inline_keys = set(md.inline._cached_sc)
+        text = '> ' * 8 + 'quote\n\n' + ''.join(
+            '  ' * i + '- item\n' for i in range(8))
+        md(text + ''.join(_documents(2)))
+        self.assertEqual(set(md.block._cached_sc), keys)
+        self.assertEqual(set(md.inline._cached_sc), inline_keys)
+
+    def test_changes(self):
+        md = _create_markdown().freeze()
+        self.assertRaises(RuntimeError, md.use, PLUGINS['url'])
+        self.assertRaises(
+            RuntimeError, md.block.register_rule, 'a', r'a', None)
+        self.assertRaises(
+            RuntimeError, md.renderer.register, 'a', lambda: '')
+        self.assertIsInstance(md.block.rules, tuple)
+        self.assertIsInstance(md.after_render_hooks, tuple)
+
+    def test_pickle(self):
+        md = _create_markdown().freeze()
+        text = _documents(1)[0]
+        other = pickle.loads(pickle.dumps(md))
+        self.assertTrue(other.frozen)
+        self.assertTrue(other.block._cached_sc)
+        self.assertEqual(other(text), md(text))
+
+    def test_threads(self):
+        if ThreadPoolExecutor is None:  # pragma: no cover
+            return
+        docs = _documents(50)
+        expected = [_create_markdown()(s) for s in docs]
+        md = _create_markdown().freeze()
+
+        barrier = threading.Barrier(8)
+
+        def render(i):
+            if i < 8:
+                # start the threads at the same time
+                barrier.wait()
+            return md(docs[i % len(docs)])
+
+        with ThreadPoolExecutor(8) as executor:
+            outputs = list(executor.map(render, range(400)))
+        for i, output in enumerate(outputs):
+            self.assertEqual(output, expected[i % len(docs)])
@@ -0,0 +1,99 @@
+import mistune
+from unittest import TestCase
+from mistune import incremental
+from mistune.directives import DirectiveToc
+
+
+class TestIncremental(TestCase):
+    def setUp(self):
+        self.md = mistune.create_markdown(
+            escape=False, plugins=['footnotes', 'task_lists'])
+        self.text = (
+            '# a\n\nb *c*\n\n- [ ] d\n- e\n\nf[^1]\n\n'
+            '```\ng\n```\n\n[^1]: h\n'
+        )
+
+    def assert_edit(self, result, text, edit_range=None):
+        result = self.md.parse_incremental(text, result, edit_range)
+        self.assertEqual(result.output, self.md(text))
+        return result
+
+    def test_parse(self):
+        result = self.md.parse_incremental(self.text)
+        self.assertEqual(result.output, self.md(self.text))
+        self.assertEqual(len(result.blocks), 6)
+        self.assertEqual(result.blocks[3].footnotes, ['1'])
+
+    def test_edit(self):
+        result = self.md.parse_incremental(self.text)
+        text = self.text.replace('b *c*', 'b *x*\n===')
+        edited = self.assert_edit(result, text)
+        # blocks before and after the edit are reused
+        self.assertIs(edited.blocks[-1].output, result.blocks[-1].output)
+        self.assertIs(edited.blocks[-2].tokens, result.blocks[-2].tokens)
+
+        text = text.replace('```\ng', '```\ng\n\n  - i')
+        edited = self.assert_edit(edited, text, (41, 48))
+        text = text.replace('```\n\n', '\n\n', 1)
+        self.assert_edit(edited, text)
+
+    def test_definitions(self):
+        text = '[x]\n\n[x]: /a\n'
+        result = self.md.parse_incremental(text)
+        self.assertEqual(result.output, '<p><a href="/a">x</a></p>\n')
+        result = self.assert_edit(result, '[x]\n\n[x]: /b\n')
+        self.assertIn('/b', result.output)
+        result = self.assert_edit(result, '[x]\n\n[x]: /b\n\n[y]: /c\n')
+        self.assert_edit(result, '[x] [y]\n\n[x]: /b\n\n[y]: /c\n')
+
+    def test_nested_definitions(self):
+        result = self.md.parse_incremental('- a\n\n[r]\n')
+        result = self.assert_edit(result, '- [r]: /x\n\n[r]\n')
+        self.assertIn('href="/x"', result.output)
+        result = self.assert_edit(result, '> [r]: /y\n\n[r]\n')
+        self.assertIn('href="/y"', result.output)
+        result = self.assert_edit(result, '> a\n\n[r]\n')
+        self.assertNotIn('href', result.output)
+
+    def test_close_html(self):
+        result = self.md.parse_incremental('<!--\n- a\n\nb\n\nc\n')
+        self.assert_edit(result, '<!--\n- a\n\nb\n\nc\n-->\n')
+
+    def test_footnotes(self):
+        text = 'a[^1]\n\nb[^2]\n\n[^1]: c\n[^2]: d\n'
+        result = self.md.parse_incremental(text)
+        result = self.assert_edit(result, 'a\n\nb[^2]\n\n[^1]: c\n[^2]: d\n')
+        self.assertNotIn('c</p>', result.output)
+        self.assert_edit(result, 'a[^2]\n\nb[^1]\n\n[^1]: c\n[^2]: d\n')
+
+    def test_normalize(self):
+        result = self.md.parse_incremental('a\r\n\r\n\tb\r\n')
+        text = 'a\r\n  \r\n\tb\r\nc'
+        self.assert_edit(result, text, (11, 12))
+        self.assertEqual(
+            incremental._normalize_edit(text, (11, 12)),
+            ('a\n\n    b\nc\n', 9, 0),
+        )
+
+    def test_normalize_full_parse(self):
+        # the full parse of an edit normalizes the text once, a line of a
+        # tab is a blank line only after normalizing it twice
+        md = mistune.create_markdown()
+        result = md.parse_incremental("<!'\n\t\nv>")
+        text = '<!  x\n\t\nv>'
+        result = md.parse_incremental(text, result)
+        self.assertEqual(result.output, md(text))
+
+    def test_ast(self):
+        md = mistune.create_markdown(renderer='ast')
+        result = md.parse_incremental('a\n\nb\n')
+        result = md.parse_incremental('a\n\nc\n', result)
+        self.assertEqual(result.output, md('a\n\nc\n'))
+
+    def test_toc(self):
+        md = mistune.create_markdown(plugins=[DirectiveToc()])
+        text = '.. toc::\n\n# a\n\n# b\n'
+        result = md.parse_incremental(text)
+        self.assertIsNone(result.blocks)
+        result = md.parse_incremental(text + '\n# c\n', result)
+        self.assertEqual(result.output, md(text + '\n# c\n'))
@@ -0,0 +1,64 @@
+import mistune
+from unittest import TestCase
+from mistune import Limits, LimitExceeded
+
+
+class TestLimits(TestCase):
+    def setUp(self):
+        self.md = mistune.create_markdown(escape=False)
+
+    def test_no_limits(self):
+        text = '> *a [b](c)*\n\n- d\n'
+        self.assertEqual(self.md.parse(text, limits=Limits()), self.md(text))
+
+    def test_max_nesting(self):
+        text = '> *a <b>*\n'
+        self.assertEqual(
+            self.md.parse(text, limits=Limits(max_nesting=2)),
+            '<blockquote>\n<p><em>a &lt;b&gt;</em></p>\n</blockquote>\n'
+        )
+        limits = Limits(max_nesting=2, strict=True)
+        with self.assertRaises(LimitExceeded) as cm:
+            self.md.parse(text, limits=limits)
+        self.assertEqual(cm.exception.name, 'max_nesting')
+        self.assertEqual(cm.exception.limit, 2)
+
+    def test_max_tokens(self):
+        text = 'a *b*\n\n*c*\n\n*d*\n'
+        self.assertEqual(
+            self.md.parse(text, limits=Limits(max_tokens=4)),
+            '<p>a <em>b</em></p>\n<p>*c*</p>\n<p>*d*</p>\n'
+        )
+
+    def test_max_output(self):
+        text = '[x]: /' + 'u' * 1000 + '\n\n' + '[x] ' * 1000
+        html = self.md.parse(text, limits=Limits(max_output=10000))
+        self.assertLessEqual(len(html), 10000)
+        self.assertTrue(html.endswith('</a> </p>\n'))
+        self.assertEqual(html.count('<a '), html.count('</a>'))
+
+        limits = Limits(max_output=10000, strict=True)
+        self.assertRaises(LimitExceeded, self.md.parse, text, limits=limits)
+
+    def test_timeout(self):
+        text = '*a _b ' * 20000
+        html = self.md.parse(text, limits=Limits(timeout=0))
+        self.assertEqual(html, '<p>' + text.strip() + '</p>\n')
+
+        limits = Limits(timeout=0, strict=True)
+        with self.assertRaises(LimitExceeded) as cm:
+            self.md.parse(text, limits=limits)
+        self.assertEqual(cm.exception.name, 'timeout')
+
+    def test_ast(self):
+        md = mistune.create_markdown(renderer='ast')
+        self.assertEqual(md.parse('*a*', limits=Limits(max_nesting=1)), [{
+            'type': 'paragraph',
+            'children': [{'type': 'emphasis', 'children': [
+                {'type': 'text', 'text': 'a'},
+            ]}],
+        }])
+        self.assertEqual(md.parse('*a*', limits=Limits(max_nesting=0)), [{
+            'type': 'paragraph',
+            'children': [{'type': 'text', 'text': '*a*'}],
+        }])
@@ -0,0 +1,108 @@
+import re
+from unittest import TestCase, skipIf
+from mistune import Markdown, HTMLRenderer, LineBlockParser
+from mistune import line_parser
+from tests import BaseTestCase
+from tests.test_commonmark import TestCommonMark, DIFFERENCES
+
+#: cases which pass with the CommonMark rules of containers
+LINE_PASSED_CASES = {
+    'setext_headings_013',
+    'block_quotes_005',
+    'block_quotes_006',
+    'block_quotes_011',
+    'block_quotes_020',
+    'block_quotes_023',
+    'block_quotes_024',
+    'list_items_005',
+    'list_items_024',
+    'list_items_028',
+    'list_items_033',
+    'list_items_038',
+    'list_items_039',
+    'lists_007',
+    'lists_016',
+    'lists_017',
+}
+LINE_IGNORE_CASES = {
+    'lists_010',  # four spaces are always indented code
+    'lists_011',
+}
+
+
+def create_markdown(**kwargs):
+    return Markdown(HTMLRenderer(escape=False), block=LineBlockParser(**kwargs))
+
+
+class TestLineCommonMark(BaseTestCase):
+    md = create_markdown()
+
+    @classmethod
+    def ignore_case(cls, n):
+        if n in LINE_PASSED_CASES:
+            return False
+        if n in LINE_IGNORE_CASES:
+            return True
+        return TestCommonMark.ignore_case(n)
+
+    def assert_case(self, n, text, html):
+        result = self.md(text)
+        result = re.sub(r'\s*\n+\s*', '\n', result)
+        result = re.sub(r'>\n', '>', result)
+        result = re.sub(r'\n<', '<', result)
+        expect = re.sub(r'\s*\n+\s*', '\n', html)
+        expect = re.sub(r'>\n', '>', expect)
+        expect = re.sub(r'\n<', '<', expect)
+        if n in DIFFERENCES:
+            expect = DIFFERENCES[n](expect)
+        self.assertEqual(result, expect)
+
+
+class TestLineSyntax(BaseTestCase):
+    md = Markdown(HTMLRenderer(), block=LineBlockParser())
+
+    def assert_case(self, n, text, html):
+        self.assertEqual(self.md(text), html)
+
+
+TestLineCommonMark.load_fixtures('commonmark.txt')
+TestLineSyntax.load_fixtures('syntax.md')
+TestLineSyntax.load_fixtures('non-commonmark.txt')
+
+
+class TestLineBlockParser(TestCase):
+    def test_line_table(self):
+        s = 'a\n  b\n\t- c\n  \t> d\n\n'
+        lines, indents, firsts = line_parser.line_table(s)
+        self.assertEqual(lines, ['a', '  b', '\t- c', '  \t> d', '', ''])
+        self.assertEqual(indents, [0, 2, 4, 4, 0, 0])
+        self.assertEqual(firsts, 'ab->\n\n')
+
+    @skipIf(line_parser.load_numpy() is None, 'NumPy is not installed')
+    def test_line_table_numpy(self):
+        s = 'a\n  b\n\t- c\n  \t> d\n\n \t中\n'
+        self.assertEqual(
+            line_parser.line_table(s, True),
+            line_parser.line_table(s, False),
+        )
+        s = 'a\n  \ud800\n'
+        self.assertEqual(
+            line_parser.line_table(s, True),
+            line_parser.line_table(s, False),
+        )
+
+    def test_nested_containers(self):
+        md = create_markdown(use_numpy=False)
+        text = '> - a\n>   > b\n>   c\n> - d\n'
+        self.assertEqual(
+            md(text),
+            '<blockquote>\n<ul>\n<li>a<blockquote>\nb\nc</blockquote>\n'
+            '</li>\n<li>d</li>\n</ul>\n</blockquote>\n'
+        )
+
+    def test_max_depth(self):
+        md = create_markdown()
+        html = md('>' * 10 + ' a\n')
+        self.assertEqual(html.count('<blockquote>'), 6)
+        html = md(''.join('  ' * i + '- a\n' for i in range(10)))
+        self.assertEqual(html.count('<ul>'), 6)
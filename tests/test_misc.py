@@ -1,3 +1,4 @@
+import io
 import mistune
 from unittest import TestCase
 
@@ -59,3 +60,234 @@ class TestMiscCases(TestCase):
         from mistune.plugins import plugin_url
         md = mistune.Markdown(mistune.HTMLRenderer())
         md.use(plugin_url)
+
+    def test_share_compiled_scanners(self):
+        md1 = mistune.create_markdown()
+        md2 = mistune.create_markdown()
+        rules = md1.inline.rules
+        sc1 = md1.inline._create_scanner(rules)
+        sc2 = md2.inline._create_scanner(rules)
+        self.assertIsNot(sc1, sc2)
+        self.assertIs(sc1.scanner, sc2.scanner)
+
+        renderer = mistune.HTMLRenderer()
+        inline = mistune.InlineParser(renderer, hard_wrap=True)
+        sc3 = inline._create_scanner(rules)
+        self.assertIsNot(sc1.scanner, sc3.scanner)
+
+    def test_get_markdown(self):
+        mistune.markdown_cache.clear()
+        md1 = mistune.get_markdown(plugins=['table'])
+        md2 = mistune.get_markdown(escape=1, plugins=['table'])
+        self.assertIs(md1, md2)
+        self.assertIsNot(md1, mistune.get_markdown(plugins=['url']))
+        self.assertIsNot(md1, mistune.get_markdown(escape=False))
+
+        renderer = mistune.HTMLRenderer()
+        md3 = mistune.get_markdown(renderer=renderer)
+        self.assertIsNot(md3, mistune.get_markdown(renderer=renderer))
+
+        mistune.markdown_cache.clear()
+        self.assertIsNot(md1, mistune.get_markdown(plugins=['table']))
+
+    def test_markdown_cache_maxsize(self):
+        mistune.markdown_cache.clear()
+        mistune.markdown_cache.maxsize = 2
+        try:
+            mistune.markdown('a', plugins=['url'])
+            mistune.markdown('a', plugins=['table'])
+            mistune.markdown('a', renderer='ast')
+            self.assertEqual(len(mistune.markdown_cache), 2)
+        finally:
+            mistune.markdown_cache.maxsize = 32
+            mistune.markdown_cache.clear()
+
+    def test_get_start_chars(self):
+        from mistune.scanner import get_start_chars
+        self.assertEqual(get_start_chars(r'~~(?=\S)'), {'~'})
+        self.assertEqual(get_start_chars(r'(?<!\\)(?:\\\\)*<'), {'\\', '<'})
+        self.assertEqual(get_start_chars(r'\b(_{1,2})a|[0-2]'), {'_', '0', '1', '2'})
+        self.assertIsNone(get_start_chars(r'\w+'))
+        self.assertIsNone(get_start_chars(r'[^a]'))
+        self.assertIsNone(get_start_chars(r'a?'))
+
+    def test_rule_trigger(self):
+        def parse_wiki(inline, m, state):
+            return 'text', m.group(0).strip('[]').upper()
+
+        md = mistune.create_markdown()
+        md.inline.register_rule('wiki', r'\[\[(\w+)\]\]', parse_wiki, r'\[\[')
+        md.inline.rules.insert(0, 'wiki')
+        self.assertEqual(md('a [[b]] [c]'), '<p>a B [c]</p>\n')
+
+        md = mistune.create_markdown()
+        md.inline.register_rule('word', r'\w+!', parse_wiki)
+        md.inline.rules.insert(0, 'word')
+        self.assertEqual(md('a! *b* c!'), '<p>A! <em>b</em> C!</p>\n')
+
+    def test_empty_match_trigger(self):
+        def parse_mark(inline, m, state):
+            return 'text', '|'
+
+        for trigger in ('@', None):
+            md = mistune.create_markdown()
+            md.inline.register_rule('mark', r'(?=@)', parse_mark, trigger)
+            md.inline.rules.insert(0, 'mark')
+            self.assertEqual(md('a@b @'), '<p>a|@b |@</p>\n')
+
+            # the rules after an empty match are tried at its start
+            md.inline.register_rule(
+                'at', r'@', lambda inline, m, state: ('codespan', 'AT'),
+                trigger)
+            md.inline.rules.insert(1, 'at')
+            self.assertEqual(md('a@b'), '<p>a|<code>AT</code>b</p>\n')
+
+    def test_block_rule_trigger(self):
+        import re
+
+        def parse_note(block, m, state):
+            return {'type': 'block_html', 'raw': '<aside/>'}
+
+        pattern = re.compile(r' {0,3}!!! *([^\n]*)\n+')
+        md = mistune.create_markdown(escape=False)
+        md.block.register_rule('note', pattern, parse_note)
+        md.block.rules.append('note')
+        self.assertEqual(md('a\n!!! b'), '<p>a\n!!! b</p>\n')
+        self.assertEqual(md('  !!! b'), '<aside/>\n')
+
+        md = mistune.create_markdown(escape=False)
+        md.block.register_rule('note', pattern, parse_note, r' {0,3}!!!')
+        md.block.rules.append('note')
+        self.assertEqual(md('a\n!!! b'), '<p>a</p>\n<aside/>\n')
+
+    def test_delimiter_emphasis(self):
+        renderer = mistune.AstRenderer()
+        inline = mistune.InlineParser(renderer, delimiter_emphasis=True)
+        md = mistune.Markdown(renderer, inline=inline)
+        self.assertEqual(md('***a** b*'), [{
+            'type': 'paragraph',
+            'children': [{'type': 'emphasis', 'children': [
+                {'type': 'strong', 'children': [{'type': 'text', 'text': 'a'}]},
+                {'type': 'text', 'text': ' b'},
+            ]}],
+        }])
+
+        renderer = mistune.HTMLRenderer()
+        inline = mistune.InlineParser(renderer, delimiter_emphasis=True)
+        md = mistune.Markdown(renderer, inline=inline)
+        text = '*a _b ' * 5000
+        self.assertEqual(md(text), '<p>' + text.strip() + '</p>\n')
+
+    def test_bracket_links(self):
+        renderer = mistune.HTMLRenderer()
+        inline = mistune.InlineParser(renderer, bracket_links=True)
+        md = mistune.Markdown(
+            renderer, inline=inline, plugins=[mistune.PLUGINS['footnotes']])
+        text = (
+            '[a](/b "c") ![d](/e) [f][] [g][f] [![h](/i)](/j) [k] '
+            '[^1]\n\n[f]: /k\n[^1]: l\n'
+        )
+        self.assertEqual(md(text), mistune.create_markdown(
+            plugins=['footnotes'])(text))
+
+        text = '[a](b' * 5000
+        self.assertEqual(md(text), '<p>' + text + '</p>\n')
+        text = '[a\\]' * 5000
+        self.assertEqual(md(text), '<p>' + text.replace('\\', '') + '</p>\n')
+
+    def test_render_cache(self):
+        cache = mistune.LRUCache(maxsize=8)
+
+        def create_markdown(escape=True):
+            return mistune.Markdown(
+                mistune.HTMLRenderer(escape=escape),
+                block=mistune.BlockParser(render_cache=cache),
+                plugins=[mistune.PLUGINS['footnotes']],
+            )
+
+        md = create_markdown()
+        text = '# a\n\n*b* <c>\n\n[d]\n\n[d]: /e\n'
+        self.assertEqual(md(text), mistune.create_markdown()(text))
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(md(text), mistune.create_markdown()(text))
+        self.assertEqual(len(cache), 3)
+
+        # keyed by the renderer and the referred definitions
+        self.assertIn('<c>', create_markdown(escape=False)(text))
+        self.assertIn('/f', md(text.replace('/e', '/f')))
+        self.assertEqual(len(cache), 7)
+
+        # footnotes are numbered in the document
+        text = 'a[^1]\n\n[^1]: b\n'
+        self.assertEqual(md(text), mistune.create_markdown(
+            plugins=['footnotes'])(text))
+        self.assertEqual(len(cache), 8)
+
+        # instances of the same config share the keys, the methods of
+        # rules of the same name are a part of the keys
+        md1 = create_markdown()
+        md2 = create_markdown()
+        self.assertEqual(md1('*b*'), '<p><em>b</em></p>\n')
+        hits = cache.hits
+        self.assertEqual(md2('*b*'), '<p><em>b</em></p>\n')
+        self.assertEqual(cache.hits, hits + 1)
+
+        def parse_b(inline, m, state):
+            return 'text', 'b'
+
+        def parse_c(inline, m, state):
+            return 'text', 'c'
+
+        md1.inline.register_rule('x', r'~~', parse_b)
+        md1.inline.rules.insert(0, 'x')
+        md2.inline.register_rule('x', r'~~', parse_c)
+        md2.inline.rules.insert(0, 'x')
+        self.assertEqual(md1('~~'), '<p>b</p>\n')
+        self.assertEqual(md2('~~'), '<p>c</p>\n')
+
+    def test_iter_render(self):
+        md = mistune.create_markdown(plugins=['footnotes'])
+        text = '# a\n\nb[^1]\n\n- c\n\n[^1]: d\n'
+        chunks = md.iter_render(text)
+        self.assertEqual(next(chunks), '<h1>a</h1>\n')
+        chunks = list(chunks)
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[-1].startswith('<section class="footnotes">'))
+        self.assertEqual('<h1>a</h1>\n' + ''.join(chunks), md(text))
+
+        md = mistune.create_markdown(renderer='ast')
+        self.assertEqual(list(md.iter_render('a\n\nb')), [[
+            {'type': 'paragraph', 'children': [{'type': 'text', 'text': 'a'}]},
+        ], [
+            {'type': 'paragraph', 'children': [{'type': 'text', 'text': 'b'}]},
+        ]])
+
+    def test_render_to(self):
+        md = mistune.create_markdown(
+            plugins=['footnotes', 'table', 'task_lists', 'def_list'])
+        text = (
+            '> - a[^1]\n>   > b\n>\n> 1. [ ] c\n\n'
+            '| d | e |\n|---|---|\n| f | g |\n\nh\n: i\n\n[^1]: j\n'
+        )
+        out = []
+        md.render_to(text, out)
+        self.assertIn('<blockquote>\n', out)
+        self.assertEqual(''.join(out), md(text))
+
+        f = io.BytesIO()
+        md.render_to('# é', f, encoding='utf-8')
+        self.assertEqual(f.getvalue(), '<h1>é</h1>\n'.encode('utf-8'))
+
+        md = mistune.create_markdown(renderer='ast')
+        self.assertRaises(ValueError, md.render_to, 'a', io.StringIO())
+
+    def test_render_to_override(self):
+        class Renderer(mistune.HTMLRenderer):
+            def block_quote(self, text):
+                return text.upper()
+
+        md = mistune.Markdown(Renderer())
+        out = []
+        md.render_to('> hello\n', out)
+        self.assertEqual(''.join(out), '<P>HELLO</P>\n')
+        self.assertEqual(''.join(out), md('> hello\n'))
@@ -0,0 +1,61 @@
+from mistune import MarkdownConfig, render_sharded
+from mistune.sharding import split_shards
+from mistune.directives import DirectiveToc
+from unittest import TestCase
+
+
+class TestSharding(TestCase):
+    def setUp(self):
+        self.config = MarkdownConfig(
+            plugins=['footnotes', 'table', DirectiveToc()])
+        blocks = []
+        for i in range(30):
+            blocks.append(
+                '## Part {0}[^{0}]\n\nSee [link {0}] and [^n].\n\n'
+                '```\ncode {0}\n\n# not a heading\n```\n\n'
+                '- item\n\n  more\n\n[link {0}]: /{0}\n\n'
+                '[^{0}]: note {0}\n'.format(i)
+            )
+        self.text = (
+            '.. toc::\n\n# Top\n\n' + '\n'.join(blocks) +
+            '\n[^n]: the note\n\n[link 0]: /unused\n'
+        )
+
+    def test_split_shards(self):
+        s = 'a\n\n```\nb\n\nc\n```\n\n- d\n\n  e\n\n<pre>\n\n</pre>\n\nf\n'
+        shards = split_shards(s, 1)
+        self.assertEqual(''.join(shards), s)
+        self.assertEqual(shards, [
+            'a\n\n', '```\nb\n\nc\n```\n\n- d\n\n  e\n\n',
+            '<pre>\n\n</pre>\n\n', 'f\n',
+        ])
+        self.assertEqual(split_shards('a\n\n```\n\nb\n', 1),
+                         ['a\n\n', '```\n\nb\n'])
+        self.assertEqual(split_shards(s, 1000), [s])
+
+    def test_render_sharded(self):
+        expected = self.config.create()(self.text)
+        for size in (1, 200):
+            output = render_sharded(
+                self.config, self.text, workers=2, shard_size=size)
+            self.assertEqual(output, expected)
+        output = render_sharded(self.config, self.text, workers=1)
+        self.assertEqual(output, expected)
+
+    def test_join_wrong_split(self):
+        # the fence belongs to the list item, the second fence opens a
+        # code block until the end of the document
+        text = '- a\n\n\n  ```\nb\n\n  ```\n\nc\n\nd\n'
+        config = MarkdownConfig()
+        output = render_sharded(config, text, workers=2, shard_size=1)
+        self.assertEqual(output, config.create()(text))
+
+        # the pre tag is in an HTML block of the div, the processing
+        # instruction after it is closed in the last shard
+        text = '<div>\n<pre>\n\n<?php\n</pre>\n\n<?php\n?>\n'
+        output = render_sharded(config, text, workers=2, shard_size=1)
+        self.assertEqual(output, config.create()(text))
+
+    def test_ast_renderer(self):
+        config = MarkdownConfig(renderer='ast')
+        self.assertRaises(ValueError, render_sharded, config, 'a')
@@ -0,0 +1,151 @@
+import io
+import mistune
+from unittest import TestCase
+from mistune import StreamingMarkdown
+from mistune.streaming import parse_stream
+
+
+class TestStreamingMarkdown(TestCase):
+    def setUp(self):
+        self.md = mistune.create_markdown(escape=False, plugins=['footnotes'])
+
+    def test_feed(self):
+        stream = StreamingMarkdown(self.md)
+        self.assertEqual(
+            stream.feed('# a\n\nb'),
+            ('', '<h1>a</h1>\n<p>b</p>\n'),
+        )
+        # the blocks before an open fenced code are final, the complete
+        # lines of the code are final until the closing fence
+        self.assertEqual(
+            stream.feed(' c\n\n```py\nx'),
+            ('<h1>a</h1>\n<p>b c</p>\n<pre><code class="language-py">',
+             'x\n</code></pre>\n'),
+        )
+        self.assertEqual(
+            stream.feed('\n\ny\n'),
+            ('x\n\ny\n', '</code></pre>\n'),
+        )
+        final, provisional = stream.feed('```\n\n- d\n')
+        self.assertEqual(final, '</code></pre>\n')
+        final, provisional = stream.feed('- e\r')
+        self.assertEqual(final, '')
+        self.assertTrue(
+            provisional.endswith('<li>d</li>\n<li>e</li>\n</ul>\n'))
+        self.assertEqual(
+            stream.close(),
+            '<ul>\n<li>d</li>\n<li>e</li>\n</ul>\n',
+        )
+        self.assertRaises(ValueError, stream.feed, 'f')
+
+    def test_long_fence(self):
+        # the lines of an open fenced code are not parsed again for every
+        # line, which is quadratic
+        stream = StreamingMarkdown(self.md)
+        self.assertEqual(
+            stream.feed('~~~py\n  \n'),
+            ('<pre><code class="language-py">', '\n</code></pre>\n'),
+        )
+        lines = ['x < {}\n'.format(i) for i in range(20000)]
+        output = ''
+        for line in lines:
+            final, provisional = stream.feed(line)
+            self.assertEqual(provisional, '</code></pre>\n')
+            output += final
+        self.assertEqual(output, '\n' + mistune.escape(''.join(lines)))
+        # the blank line before the closing fence is a line of the code
+        self.assertEqual(
+            stream.feed('\n~~~~'),
+            ('', '\n</code></pre>\n'),
+        )
+        final, provisional = stream.feed('\n')
+        self.assertEqual(final, '\n</code></pre>\n')
+        output += final + stream.close()
+        text = '~~~py\n  \n' + ''.join(lines) + '\n~~~~\n'
+        self.assertEqual(
+            '<pre><code class="language-py">' + output, self.md(text))
+
+    def test_chunks(self):
+        text = (
+            '[x]: /a\n[^1]: i\n\n# a\r\n\r\n> b\n> [x]\n\n- c\n\n  d\n'
+            '- e\n\n    f\n\ng[^1]\n---\n\n```\nh\n```\n\nj\n\tk\n'
+        )
+        for size in (1, 2, 3, 7, 100):
+            stream = StreamingMarkdown(self.md)
+            output = ''
+            for i in range(0, len(text), size):
+                output += stream.feed(text[i:i + size])[0]
+            output += stream.close()
+            self.assertEqual(output, self.md(text))
+
+    def test_definitions(self):
+        stream = StreamingMarkdown(self.md)
+        self.assertEqual(
+            stream.feed('[x]: /a\n\n[x]\n\n[y]\n\nz\n\n[y]: /b\n'),
+            ('<p><a href="/a">x</a></p>\n<p>[y]</p>\n', '<p>z</p>\n'),
+        )
+        self.assertEqual(stream.state['def_links'], {'x': ('/a', None)})
+        # a definition does not change the final blocks before it
+        self.assertEqual(stream.feed('\n[y]\n'), ('<p>z</p>\n', (
+            '<p><a href="/b">y</a></p>\n'
+        )))
+        self.assertEqual(stream.close(), '<p><a href="/b">y</a></p>\n')
+
+    def test_ast(self):
+        md = mistune.create_markdown(renderer='ast')
+        stream = StreamingMarkdown(md)
+        final, provisional = stream.feed('a\n\nb\n\nc')
+        self.assertEqual(final, [
+            {'type': 'paragraph', 'children': [{'type': 'text', 'text': 'a'}]},
+        ])
+        self.assertEqual(len(provisional), 2)
+        self.assertEqual(final + stream.close(), md('a\n\nb\n\nc'))
+
+    def test_parse_stream(self):
+        text = (
+            '[x]\n\n- a\n- b\n\n> c[^1]\n\n```\nd\n```\n\n'
+            '[x]: /e\n[^1]: f\n'
+        )
+        for size in (1, 5, 100):
+            output = io.StringIO()
+            fileobj = io.BytesIO(text.encode('utf-8'))
+            parse_stream(self.md, fileobj, output, True, chunk_size=size)
+            self.assertEqual(output.getvalue(), self.md(text))
+
+        output = io.StringIO()
+        self.md.parse_stream(io.StringIO(text), output)
+        self.assertTrue(output.getvalue().startswith('<p>[x]</p>'))
+        # footnotes are defined after the reference
+        self.assertIn('<p>c[^1]</p>', output.getvalue())
+
+    def test_html_block(self):
+        text = '<!--\n\na\n\n- b\n-->\n\n<pre>\n\nc\n</pre>\n\nd\n'
+        stream = StreamingMarkdown(self.md)
+        html = ''
+        for line in text.splitlines(True):
+            final, provisional = stream.feed(line)
+            html += final
+        # the open comment keeps all of its lines pending
+        self.assertEqual(html, '<!--\n\na\n\n- b\n-->\n')
+        self.assertEqual(html + stream.close(), self.md(text))
+
+    def test_nested_definitions(self):
+        text = '- [x]: /a\n\n> [^1]: b\n\n[x] c[^1]\n\nd\n\ne\n'
+        stream = StreamingMarkdown(self.md)
+        html = ''
+        for line in text.splitlines(True):
+            html += stream.feed(line)[0]
+        self.assertIn('<a href="/a">x</a>', html)
+        self.assertEqual(html + stream.close(), self.md(text))
+
+        text = '[x] c[^1]\n\n- [x]: /a\n\n> [^1]: b\n'
+        output = io.StringIO()
+        parse_stream(self.md, io.StringIO(text), output, True, chunk_size=3)
+        self.assertEqual(output.getvalue(), self.md(text))
+
+    def test_parse_stream_utf8(self):
+        text = '中文 *a*\n\n' * 10
+        output = io.StringIO()
+        fileobj = io.BytesIO(text.encode('utf-8'))
+        parse_stream(self.md, fileobj, output, chunk_size=1)
+        self.assertEqual(output.getvalue(), self.md(text))